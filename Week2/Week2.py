@@ -1,16 +1,29 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import datasets
+from stats import describe, DESCRIBE_ROWS
+from render import Report, layer
+from tracing import phase
 
-df = pd.read_csv("user_behavior_dataset.csv")
+report = Report('Week2')
+
+phase('load')
+df = datasets.load('user_behavior')
+phase('clean', rows=len(df))
 df.dropna(inplace=True)
 df = df[df['Screen_On_Time'] > 0]
 
-mean_screen = df['Screen_On_Time'].mean()
-median_screen = df['Screen_On_Time'].median()
-mode_screen = df['Screen_On_Time'].mode()[0]
-std_screen = df['Screen_On_Time'].std()
-range_screen = df['Screen_On_Time'].max() - df['Screen_On_Time'].min()
+phase('transform', rows=len(df))
+# One pass over every numeric column - reused for the summary table at the end
+summary = describe(df)
+
+mean_screen = summary.at['mean', 'Screen_On_Time']
+median_screen = summary.at['median', 'Screen_On_Time']
+mode_screen = summary.at['mode', 'Screen_On_Time']
+std_screen = summary.at['std', 'Screen_On_Time']
+range_screen = summary.at['range', 'Screen_On_Time']
 
 print("📊 Descriptive Statistics for Screen-On Time")
 print(f"Mean: {mean_screen:.2f} hours/day")
@@ -19,34 +32,28 @@ print(f"Mode: {mode_screen:.2f}")
 print(f"Standard Deviation: {std_screen:.2f}")
 print(f"Range: {range_screen:.2f}\n")
 
-plt.figure(figsize=(8,5))
-sns.histplot(df['Screen_On_Time'], bins=20, kde=True, color='teal')
-plt.title("Distribution of Screen-On Time")
-plt.xlabel("Hours per Day")
-plt.ylabel("Frequency")
-plt.tight_layout()
-plt.show()
-
-plt.figure(figsize=(8,5))
-sns.boxplot(x=df['App_Usage_Time'], color='orange')
-plt.title("Boxplot of App Usage Time")
-plt.xlabel("Minutes per Day")
-plt.tight_layout()
-plt.show()
-
-plt.figure(figsize=(10,6))
-sns.heatmap(df[['App_Usage_Time','Screen_On_Time','Battery_Drain','Number_of_Apps_Installed','Data_Usage','Age','User_Behavior_Class']].corr(), annot=True, cmap='coolwarm')
-plt.title("Correlation Between Variables")
-plt.tight_layout()
-plt.show()
-
-os_group = df.groupby('Operating_System')['Screen_On_Time'].mean()
-os_group.plot(kind='bar', color=['skyblue', 'salmon'])
-plt.title("Average Screen-On Time by Operating System")
-plt.ylabel("Hours per Day")
-plt.xticks(rotation=0)
-plt.tight_layout()
-plt.show()
+phase('render')
+report.figure('screen_on_time_hist',
+              layer('histplot', df['Screen_On_Time'], bins=20, kde=True, color='teal'),
+              figsize=(8,5), title="Distribution of Screen-On Time",
+              xlabel="Hours per Day", ylabel="Frequency", tight_layout=True)
+
+report.figure('app_usage_boxplot',
+              layer('boxplot', x=df['App_Usage_Time'], color='orange'),
+              figsize=(8,5), title="Boxplot of App Usage Time", xlabel="Minutes per Day", tight_layout=True)
+
+corr = df[['App_Usage_Time','Screen_On_Time','Battery_Drain','Number_of_Apps_Installed','Data_Usage','Age','User_Behavior_Class']].corr()
+report.figure('correlation_heatmap',
+              layer('heatmap', corr, annot=True, cmap='coolwarm'),
+              figsize=(10,6), title="Correlation Between Variables", tight_layout=True)
+
+os_group = df.groupby('Operating_System', observed=True)['Screen_On_Time'].mean()
+report.figure('screen_on_time_by_os',
+              layer('series', os_group, kind='bar', color=['skyblue', 'salmon']),
+              title="Average Screen-On Time by Operating System", ylabel="Hours per Day",
+              xticks_rotation=0, tight_layout=True)
 
 print("📋 Summary Table of Dataset")
-print(df.describe())
\ No newline at end of file
+print(summary.loc[DESCRIBE_ROWS])
+
+report.finish()
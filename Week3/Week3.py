@@ -1,114 +1,116 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import datasets
+from clean_pipeline import run_pipelines
+from binned import scatter_layer
+from missing import MissingProfile, heatmap_layer
+from render import Report, layer
+from tracing import annotate, phase
 
-sns.set_theme(style="whitegrid")  # For clean plots
+report = Report('Week3', theme={'style': 'whitegrid'})  # For clean plots
 
 # Load and Inspect the Dataset --------------------------------------------------------------------
-df = pd.read_csv('retail_sales_final.csv')
+phase('load')
+df = datasets.load('retail_sales')
+annotate(rows=len(df))
 print("First 5 rows:\n", df.head())
 print("\nData Summary Info:\n")
 df.info()
 print("\nSummary Statistics:\n", df.describe(include='all'))
 
 # Visualise Missing Data --------------------------------------------------------------------------
+# One pass over the null masks gives the counts, totals and heatmap below
+phase('transform', rows=len(df))
+missing = MissingProfile.of(df)
+
+phase('render')
+
 # Bar Chart - Missing per column
-df.isnull().sum().plot(kind='bar', color='orange')
-plt.title("Missing Values per Column")
-plt.ylabel("Count")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
+report.figure('missing_per_column',
+              layer('series', missing.counts, kind='bar', color='orange'),
+              title="Missing Values per Column", ylabel="Count", xticks_rotation=45, tight_layout=True)
 
 # Histogram - Distribution of Sales
-df['Sales'].plot(kind='hist', bins=20, color='skyblue')
-plt.title("Sales Distribution (Messy)")
-plt.xlabel("Sales")
-plt.tight_layout()
-plt.show()
+report.figure('sales_hist_messy',
+              layer('series', df['Sales'], kind='hist', bins=20, color='skyblue'),
+              title="Sales Distribution (Messy)", xlabel="Sales", tight_layout=True)
 
 # Pie chart - Proportion of missing vs non-missing
-missing_total = df.isnull().sum().sum()
-non_missing_total = df.size - missing_total
-plt.pie([missing_total, non_missing_total], labels=['Missing', 'Non-Missing'], autopct='%1.1f%%', colors=['red', 'green'])
-plt.title("Overall Missing Data Proportion")
-plt.show()
+missing_total = missing.total
+non_missing_total = missing.size - missing_total
+report.figure('missing_proportion',
+              layer('pie', [missing_total, non_missing_total], labels=['Missing', 'Non-Missing'], autopct='%1.1f%%', colors=['red', 'green']),
+              title="Overall Missing Data Proportion")
 
 # Heatmap & Boxplot -------------------------------------------------------------------------------
-sns.heatmap(df.isnull(), cbar=False, cmap='viridis')
-plt.title("Missing Values Heatmap")
-plt.show()
+report.figure('missing_heatmap',
+              heatmap_layer(missing),
+              title="Missing Values Heatmap")
 
-sns.boxplot(x=df['Sales'])
-plt.title("Sales Boxplot (Messy)")
-plt.show()
+report.figure('sales_boxplot_messy',
+              layer('boxplot', x=df['Sales']),
+              title="Sales Boxplot (Messy)")
 
 # Cleaning the Dataset ----------------------------------------------------------------------------
-# Remove duplicates
-print("Duplicates found:", df.duplicated().sum())
-df = df.drop_duplicates()
-
-# Drop rows with missing values
-df_cleaned = df.dropna()
-
-# Clean column names
-df_cleaned.columns = df_cleaned.columns.str.strip().str.lower().str.replace(' ', '_')
+# Both cleaned outputs are written from a single chunked read of the messy file
+phase('clean')
+clean_steps = [
+    ('dedupe', {'normalise': True}),        # Remove duplicates (ignoring whitespace and case)
+    ('dropna', {}),                         # Drop rows with missing values
+    ('rename', {'normalise': True}),        # Clean column names
+]
+fill_steps = [
+    ('fill', {'column': 'Sales', 'value': 'mean'}),         # Example 1: Fill 'Sales' with mean
+    ('fill', {'column': 'Profit', 'value': 0}),             # Example 2: Fill 'Profit' with 0
+    ('fill', {'column': 'Country', 'value': 'Unknown'}),    # Example 3: Fill 'Country' with 'Unknown'
+    ('ffill', {'column': 'Sales'}),                         # Example 4: Forward Fill
+    ('bfill', {'column': 'Sales'}),                         # Example 5: Backward Fill
+]
+reports = run_pipelines(datasets.path('retail_sales'), {
+    'retail_sales_clean.csv': clean_steps,
+    'retail_sales_filled.csv': fill_steps,
+})
+print("Duplicates found:", reports['retail_sales_clean.csv']['steps']['dedupe'])
+annotate(rows=reports['retail_sales_clean.csv']['rows_in'])
+df_cleaned = pd.read_csv('retail_sales_clean.csv')
 
 # Central Tendency (Sales) ------------------------------------------------------------------------
+phase('transform', rows=len(df_cleaned))
 print("Mean Sales:", df_cleaned['sales'].mean())
 print("Median Sales:", df_cleaned['sales'].median())
 print("Mode Sales:", df_cleaned['sales'].mode()[0])
 
 # Full EDA on Cleaned Dataset ---------------------------------------------------------------------
+phase('render')
 # Uni variate: Histogram
-df_cleaned['sales'].plot(kind='hist', bins=20, color='green')
-plt.title("Sales Distribution (Clean)")
-plt.xlabel("Sales")
-plt.tight_layout()
-plt.show()
+report.figure('sales_hist_clean',
+              layer('series', df_cleaned['sales'], kind='hist', bins=20, color='green'),
+              title="Sales Distribution (Clean)", xlabel="Sales", tight_layout=True)
 
 # Uni variate: Boxplot
-sns.boxplot(x=df_cleaned['sales'])
-plt.title("Sales Boxplot (Clean)")
-plt.show()
+report.figure('sales_boxplot_clean',
+              layer('boxplot', x=df_cleaned['sales']),
+              title="Sales Boxplot (Clean)")
 
 # Multivariate: Correlation Heatmap
-plt.figure(figsize=(8,6))
-sns.heatmap(df_cleaned[['sales','profit']].corr(), annot=True, cmap='coolwarm')
-plt.title("Correlation Heatmap")
-plt.show()
+report.figure('correlation_heatmap',
+              layer('heatmap', df_cleaned[['sales','profit']].corr(), annot=True, cmap='coolwarm'),
+              figsize=(8,6), title="Correlation Heatmap")
 
 # Multivariate: Scatterplot
-sns.scatterplot(x='sales', y='profit', data=df_cleaned)
-plt.title("Sales vs Profit")
-plt.show()
+report.figure('sales_vs_profit',
+              scatter_layer('sales', 'profit', data=df_cleaned[['sales', 'profit']]),
+              title="Sales vs Profit")
 
 # Export Cleaned Dataset --------------------------------------------------------------------------
-df_cleaned.to_csv('retail_sales_clean.csv', index=False)
 print("Cleaned data exported to retail_sales_clean.csv")
 
 # Fill Missing Values -----------------------------------------------------------------------------
-# Reload original messy data
-df = pd.read_csv('retail_sales_final.csv')
-
-# Example 1: Fill 'Sales' with mean
-df['Sales'] = df['Sales'].fillna(df['Sales'].mean())
-
-# Example 2: Fill 'Profit' with 0
-df['Profit'] = df['Profit'].fillna(0)
-
-# Example 3: Fill 'Country' with 'Unknown'
-df['Country'] = df['Country'].fillna('Unknown')
-
-# Example 4: Forward Fill
-df['Sales'] = df['Sales'].ffill()
-
-# Example 5: Backward Fill
-df['Sales'] = df['Sales'].bfill()
-
 # Final check for missing values
-print("\nMissing values after filling:\n", df.isnull().sum())
+print("\nMissing values after filling:\n", reports['retail_sales_filled.csv']['nulls'])
+print("Filled data exported to retail_sales_filled.csv")
 
-# Save this version too
-df.to_csv('retail_sales_filled.csv', index=False)
+report.finish()
@@ -1,29 +1,39 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+import datasets
+from binned import scatter_layer
+from render import Report, layer
+from tracing import phase
 
-df = pd.read_csv('salary_data.csv')
+report = Report('Week4.1')
 
-sns.scatterplot(x='YearsExperience', y='Salary', data=df)
-plt.title("Years of Experience vs Salary")
-plt.xlabel("Years of Experience")
-plt.ylabel("Salary (£)")
-plt.show()
+phase('load')
+df = datasets.load('salary')
 
+phase('render')
+report.figure('experience_vs_salary',
+              scatter_layer('YearsExperience', 'Salary', data=df),
+              title="Years of Experience vs Salary", xlabel="Years of Experience", ylabel="Salary (£)")
+
+phase('transform', rows=len(df))
 X = df[['YearsExperience']]
 y = df['Salary']
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
+phase('fit', rows=len(X_train))
 model = LinearRegression()
 model.fit(X_train, y_train)
 
 print("Intercept:", model.intercept_)
 print("Slope:", model.coef_[0])
 
+phase('predict', rows=len(X_test))
 y_pred = model.predict(X_test)
 comparison = pd.DataFrame({'Actual': y_test, 'Predicted': y_pred})
 print(comparison)
@@ -33,16 +43,15 @@ r2 = r2_score(y_test, y_pred)
 print("Mean Squared Error:", mse)
 print("R-squared:", r2)
 
-plt.scatter(X_train, y_train, color='blue', label='Training data')
-plt.plot(X_train, model.predict(X_train), color='red', label='Regression line')
-plt.title("Linear Regression Fit")
-plt.xlabel("Years of Experience")
-plt.ylabel("Salary (£)")
-plt.legend()
-plt.show()
+phase('render')
+report.figure('regression_fit',
+              scatter_layer(X_train, y_train, color='blue', label='Training data'),
+              layer('plot', X_train, model.predict(X_train), color='red', label='Regression line'),
+              title="Linear Regression Fit", xlabel="Years of Experience", ylabel="Salary (£)", legend=True)
 
 residuals = y_test - y_pred
-sns.histplot(residuals, kde=True)
-plt.title("Residuals Distribution")
-plt.xlabel("Residuals")
-plt.show()
\ No newline at end of file
+report.figure('residuals',
+              layer('histplot', residuals, kde=True),
+              title="Residuals Distribution", xlabel="Residuals")
+
+report.finish()
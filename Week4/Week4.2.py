@@ -1,32 +1,47 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+import datasets
+from binned import pairplot_layer, scatter_layer
+from render import Report, layer
+from tracing import phase
 
-df = pd.read_csv('USA_Housing.csv')
+report = Report('Week4.2')
+
+# Address isn't used, so it's never loaded
+phase('load')
+df = datasets.load('usa_housing', columns=['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms',
+                                           'Avg. Area Number of Bedrooms', 'Area Population', 'Price'])
 print(df.head())
 print(df.info())
 
-sns.pairplot(df)
-plt.suptitle("Pairwise Relationships", y=1.02)
-plt.show()
+phase('render', rows=len(df))
+# Binned past 20,000 rows instead of drawing every point in every panel
+report.figure('pairplot',
+              pairplot_layer(df),
+              suptitle="Pairwise Relationships")
 
-sns.heatmap(df[['Avg. Area Income','Avg. Area House Age','Avg. Area Number of Rooms','Avg. Area Number of Bedrooms','Area Population','Price']].corr(), annot=True, cmap='coolwarm')
-plt.title("Correlation Heatmap")
-plt.show()
+report.figure('correlation_heatmap',
+              layer('heatmap', df[['Avg. Area Income','Avg. Area House Age','Avg. Area Number of Rooms','Avg. Area Number of Bedrooms','Area Population','Price']].corr(), annot=True, cmap='coolwarm'),
+              title="Correlation Heatmap")
 
+phase('transform', rows=len(df))
 X = df[['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms', 'Avg. Area Number of Bedrooms', 'Area Population']]
 y = df['Price']
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
+phase('fit', rows=len(X_train))
 model = LinearRegression()
 model.fit(X_train, y_train)
 print("Intercept:", model.intercept_)
 print("Coefficients:", model.coef_)
 
+phase('predict', rows=len(X_test))
 y_pred = model.predict(X_test)
 comparison = pd.DataFrame({'Actual': y_test, 'Predicted': y_pred})
 print(comparison.head())
@@ -36,8 +51,9 @@ r2 = r2_score(y_test, y_pred)
 print("Mean Squared Error:", mse)
 print("R-squared:", r2)
 
-plt.scatter(y_test, y_pred, color='purple')
-plt.xlabel("Actual Prices")
-plt.ylabel("Predicted Prices")
-plt.title("Actual vs Predicted House Prices")
-plt.show()
\ No newline at end of file
+phase('render')
+report.figure('actual_vs_predicted',
+              scatter_layer(y_test, y_pred, color='purple'),
+              title="Actual vs Predicted House Prices", xlabel="Actual Prices", ylabel="Predicted Prices")
+
+report.finish()
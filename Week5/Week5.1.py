@@ -1,9 +1,16 @@
 # IMPORT LIBRARIES --------------------------------------------------------------------------------------
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
+import datasets
+from polynomial import PolynomialRegression
+from render import Report, layer
+from tracing import phase
+
+report = Report('Week5.1')
 
 # SIMPLE LINEAR REGRESSION -----------------------------------------------------------------------------
 # Provide data ------------------------------------------------------------------------------------------
@@ -11,6 +18,7 @@ x = np.array([5, 15, 25, 35, 45, 55]).reshape((-1, 1))   # X must be 2D
 y = np.array([5, 20, 14, 32, 22, 38])
 
 # Create and fit the model -----------------------------------------------------------------------------
+phase('fit', model='linear', rows=len(x))
 model = LinearRegression()
 model.fit(x, y)
 
@@ -22,49 +30,44 @@ print(f"Intercept: {model.intercept_}")
 print(f"Slope: {model.coef_}")
 
 # Predict response --------------------------------------------------------------------------------------
+phase('predict', model='linear', rows=len(x))
 y_pred = model.predict(x)
 print("Predicted response (Linear):", y_pred, sep="\n")
 
 # Plot results ------------------------------------------------------------------------------------------
-plt.title("Linear Regression: Actual vs Predicted")
-plt.xlabel("X")
-plt.ylabel("Y")
-plt.scatter(x, y, color="red", label="Actual")
-plt.plot(x, y_pred, color="blue", label="Predicted")
-plt.legend()
-plt.show()
+phase('render')
+report.figure('linear_regression',
+              layer('scatter', x, y, color="red", label="Actual"),
+              layer('plot', x, y_pred, color="blue", label="Predicted"),
+              title="Linear Regression: Actual vs Predicted", xlabel="X", ylabel="Y", legend=True)
 
 # POLYNOMIAL REGRESSION ---------------------------------------------------------------------------------
 # Provide new data --------------------------------------------------------------------------------------
 x = np.array([5, 15, 25, 35, 45, 55]).reshape((-1, 1))
 y = np.array([15, 11, 2, 8, 25, 32])
 
-# Transform input data to polynomial features (degree 2) ------------------------------------------------
-poly = PolynomialFeatures(degree=2, include_bias=False)
-x_poly = poly.fit_transform(x)
-
-# Create and fit the model ------------------------------------------------------------------------------
-model = LinearRegression().fit(x_poly, y)
+# Fit on polynomial features (degree 2) - expanded a tile at a time, never as a full matrix -------------
+phase('fit', model='polynomial', rows=len(x))
+model = PolynomialRegression(degree=2).fit(x, y)
 
 # Get regression results --------------------------------------------------------------------------------
-r_sq = model.score(x_poly, y)
+r_sq = model.score(x, y)
 print("\n=== Polynomial Regression (Degree 2) ===")
 print(f"Coefficient of determination (R²): {r_sq}")
 print(f"Intercept: {model.intercept_}")
 print(f"Coefficients: {model.coef_}")
 
 # Predict response --------------------------------------------------------------------------------------
-y_pred = model.predict(x_poly)
+phase('predict', model='polynomial', rows=len(x))
+y_pred = model.predict(x)
 print("Predicted response (Polynomial):", y_pred, sep="\n")
 
 # Plot results ------------------------------------------------------------------------------------------
-plt.title("Polynomial Regression: Actual vs Predicted")
-plt.xlabel("X")
-plt.ylabel("Y")
-plt.scatter(x, y, color="red", label="Actual")
-plt.plot(x, y_pred, color="green", label="Predicted")
-plt.legend()
-plt.show()
+phase('render')
+report.figure('polynomial_regression',
+              layer('scatter', x, y, color="red", label="Actual"),
+              layer('plot', x, y_pred, color="green", label="Predicted"),
+              title="Polynomial Regression: Actual vs Predicted", xlabel="X", ylabel="Y", legend=True)
 
 # MULTIPLE REGRESSION (with Polynomial Terms) ------------------------------------------------------------
 # Provide data (two features) ---------------------------------------------------------------------------
@@ -74,54 +77,52 @@ x = np.array([
 ])
 y = np.array([4, 5, 20, 14, 32, 22, 38, 43])
 
-# Transform input data to polynomial features (degree 2) -------------------------------------------------
-poly = PolynomialFeatures(degree=2, include_bias=False)
-x_poly = poly.fit_transform(x)
-
-# Create and fit model ----------------------------------------------------------------------------------
-model = LinearRegression().fit(x_poly, y)
+# Fit on polynomial features (degree 2) -----------------------------------------------------------------
+phase('fit', model='multiple polynomial', rows=len(x))
+model = PolynomialRegression(degree=2).fit(x, y)
 
 # Get regression results --------------------------------------------------------------------------------
-r_sq = model.score(x_poly, y)
+r_sq = model.score(x, y)
 print("\n=== Multiple Polynomial Regression ===")
 print(f"Coefficient of determination (R²): {r_sq}")
 print(f"Intercept: {model.intercept_}")
 print(f"Coefficients: {model.coef_}")
 
 # Predict response --------------------------------------------------------------------------------------
-y_pred = model.predict(x_poly)
+phase('predict', model='multiple polynomial', rows=len(x))
+y_pred = model.predict(x)
 print("Predicted response (Multiple Polynomial):", y_pred, sep="\n")
 
 # CAR CO2 EMISSION EXAMPLE -------------------------------------------------------------------------------
 # Load dataset ------------------------------------------------------------------------------------------
-df = pd.read_csv("cars.csv")
+phase('load')
+df = datasets.load('cars', columns=['Weight', 'Volume', 'CO2'])
 
 # Define features (Weight, Volume) and target (CO2) -----------------------------------------------------
 x = df[['Weight', 'Volume']]
 y = df['CO2']
 
-# Transform features to polynomial features -------------------------------------------------------------
-poly = PolynomialFeatures(degree=2, include_bias=False)
-x_poly = poly.fit_transform(x)
-
-# Create and fit model ----------------------------------------------------------------------------------
-model = LinearRegression().fit(x_poly, y)
+# Fit on polynomial features (degree 2) -----------------------------------------------------------------
+phase('fit', model='cars', rows=len(x))
+model = PolynomialRegression(degree=2).fit(x, y)
 
 # Get results -------------------------------------------------------------------------------------------
-r_sq = model.score(x_poly, y)
+r_sq = model.score(x, y)
 print("\n=== Car CO₂ Emission Model ===")
 print(f"Coefficient of determination (R²): {r_sq}")
 print(f"Intercept: {model.intercept_}")
 print(f"Coefficients: {model.coef_}")
 
 # Predict CO₂ for all cars in dataset -------------------------------------------------------------------
-y_pred = model.predict(x_poly)
+phase('predict', model='cars', rows=len(x))
+y_pred = model.predict(x)
 print("Predicted CO₂ emissions:", y_pred, sep="\n")
 
 # Predict CO₂ for a specific car ------------------------------------------------------------------------
 # Weight = 2300 kg, Volume = 1300 cm³
-# Must transform input using the same polynomial transformer
+# The polynomial is evaluated directly from the raw features
 new_data = pd.DataFrame([[2300, 1300]], columns=['Weight', 'Volume'])
-new_data_poly = poly.transform(new_data)
-predicted_CO2 = model.predict(new_data_poly)
+predicted_CO2 = model.predict(new_data)
 print("\nPredicted CO₂ for car (2300kg, 1300cm³):", predicted_CO2)
+
+report.finish()
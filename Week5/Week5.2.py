@@ -7,18 +7,22 @@
 # ------------------------------------------------------------------------------------------------------
 
 # IMPORT LIBRARIES --------------------------------------------------------------------------------------
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import pandas as pd
 import numpy as np
-from sklearn import preprocessing
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import (
-    MinMaxScaler, Normalizer, Binarizer, StandardScaler,
-    LabelEncoder, OrdinalEncoder, OneHotEncoder
-)
+import datasets
+from preprocess import FusedPreprocessor
+from encoding import CategoricalEncoder
+from tracing import annotate, phase
 
 # A. HANDLING MISSING DATA -----------------------------------------------------------------------------
 # Load the 'pima_indians_diabetes_2.csv' dataset -------------------------------------------------------
-pima = pd.read_csv("pima_indians_diabetes_2.csv")
+# The file has no header row - the registry reads it with numbered columns
+phase('load')
+pima = datasets.load('pima')
+annotate(rows=len(pima))
 
 # Check data dimensions and preview --------------------------------------------------------------------
 print("=== Data Overview ===")
@@ -35,6 +39,7 @@ print("\n=== Rows with Missing Values ===")
 print(pima[pima.isna().any(axis=1)])
 
 # Drop rows with missing values ------------------------------------------------------------------------
+phase('clean', rows=len(pima))
 pima_dropped = pima.dropna()
 print("\n=== After Dropping Rows with Missing Values ===")
 print("Shape:", pima_dropped.shape)
@@ -44,89 +49,106 @@ print("\nRows with nulls after dropna():")
 print(pima_dropped[pima_dropped.isna().any(axis=1)])
 
 # B. MISSING DATA WITH REPLACEMENT ---------------------------------------------------------------------
-# Replace missing values using SimpleImputer ------------------------------------------------------------
-imputer_mean = SimpleImputer(missing_values=np.nan, strategy='mean')
-imputer_median = SimpleImputer(missing_values=np.nan, strategy='median')
+# Replace missing values - mean and median come from the same single pass over the data ----------------
+phase('fit', step='impute', rows=len(pima))
+imputer = FusedPreprocessor().fit(pima)
+phase('transform', step='impute', rows=len(pima))
+imputed = imputer.transform(pima, ['impute_mean', 'impute_median'])
 
 # Apply imputer with mean -------------------------------------------------------------------------------
-pima_mean = pd.DataFrame(imputer_mean.fit_transform(pima), columns=pima.columns)
+pima_mean = pd.DataFrame(imputed['impute_mean'], columns=pima.columns)
 print("\n=== Missing Values Replaced with Mean ===")
 print(pima_mean.loc[[440, 661, 770]])
 
 # Apply imputer with median -----------------------------------------------------------------------------
-pima_median = pd.DataFrame(imputer_median.fit_transform(pima), columns=pima.columns)
+pima_median = pd.DataFrame(imputed['impute_median'], columns=pima.columns)
 print("\n=== Missing Values Replaced with Median ===")
 print(pima_median.loc[[440, 661, 770]])
 
 # C. FEATURE SCALING -----------------------------------------------------------------------------------
+# Every scaled version is produced from one fit on the complete rows -----------------------------------
+phase('fit', step='scale', rows=len(pima_dropped))
+scaler = FusedPreprocessor(feature_range=(0, 1), threshold=0.5).fit(pima_dropped)
+phase('transform', step='scale', rows=len(pima_dropped))
+scaled = scaler.transform(pima_dropped, {
+    'minmax': ['minmax'],
+    'l1': ['l1'],
+    'l2': ['l2'],
+    'binarized': ['minmax', 'binarize'],    # binarize the min-max scaled values
+    'standardized': ['standard'],
+})
+
 # Using Min-Max Scaler ---------------------------------------------------------------------------------
-scaler = MinMaxScaler(feature_range=(0, 1))
-pima_scaled = pd.DataFrame(scaler.fit_transform(pima_dropped), columns=pima.columns)
+pima_scaled = pd.DataFrame(scaled['minmax'], columns=pima.columns)
 print("\n=== Min-Max Scaled Data ===")
 print(pima_scaled.head())
 
 # L1 Normalization -------------------------------------------------------------------------------------
-normalizer_l1 = Normalizer(norm='l1')
-pima_l1 = pd.DataFrame(normalizer_l1.fit_transform(pima_dropped), columns=pima.columns)
+pima_l1 = pd.DataFrame(scaled['l1'], columns=pima.columns)
 print("\n=== L1 Normalized Data (rows sum to 1) ===")
 print(pima_l1.head())
 
 # L2 Normalization -------------------------------------------------------------------------------------
-normalizer_l2 = Normalizer(norm='l2')
-pima_l2 = pd.DataFrame(normalizer_l2.fit_transform(pima_dropped), columns=pima.columns)
+pima_l2 = pd.DataFrame(scaled['l2'], columns=pima.columns)
 print("\n=== L2 Normalized Data (sum of squares per row = 1) ===")
 print(pima_l2.head())
 
 # Binarization -----------------------------------------------------------------------------------------
-binarizer = Binarizer(threshold=0.5)
-pima_bin = pd.DataFrame(binarizer.fit_transform(pima_scaled), columns=pima.columns)
+pima_bin = pd.DataFrame(scaled['binarized'], columns=pima.columns)
 print("\n=== Binarized Data (Threshold=0.5) ===")
 print(pima_bin.tail())
 
 # Standardization --------------------------------------------------------------------------------------
-scaler_std = StandardScaler()
-pima_standardized = pd.DataFrame(scaler_std.fit_transform(pima_dropped), columns=pima.columns)
+pima_standardized = pd.DataFrame(scaled['standardized'], columns=pima.columns)
 print("\n=== Standardized Data (Mean=0, Std=1) ===")
 print(pima_standardized.head())
 
 # D. ENCODING CATEGORICAL DATA -------------------------------------------------------------------------
 # Load the temperature dataset -------------------------------------------------------------------------
-temp = pd.read_csv("temperature.csv")
+phase('load')
+temp = datasets.load('temperature')
 print("\n=== Temperature Dataset ===")
 print(temp.head())
 
 # Label Encoding ---------------------------------------------------------------------------------------
-label_encoder = LabelEncoder()
-temp["Temperature_LabelEncoded"] = label_encoder.fit_transform(temp["Temperature"])
+phase('transform', step='encode', rows=len(temp))
+label_encoder = CategoricalEncoder().fit(temp["Temperature"])
+temp["Temperature_LabelEncoded"] = label_encoder.encode(temp["Temperature"])
 print("\n=== Label Encoded Temperature ===")
 print(temp[["Temperature", "Temperature_LabelEncoded"]])
 
 # Try label encoding with iris dataset -----------------------------------------------------------------
-iris = pd.read_csv("iris_data.csv")
-label_encoder_iris = LabelEncoder()
-iris["iris_class_encoded"] = label_encoder_iris.fit_transform(iris["iris_class"])
+# No header row in this file either - the registry names the columns as listed in iris_names.csv
+phase('load')
+iris = datasets.load('iris')
+phase('transform', step='encode', rows=len(iris))
+label_encoder_iris = CategoricalEncoder().fit(iris["iris_class"])
+iris["iris_class_encoded"] = label_encoder_iris.encode(iris["iris_class"])
 print("\n=== Iris Dataset Label Encoded ===")
 print(iris[["iris_class", "iris_class_encoded"]].head(3))
 print(iris[["iris_class", "iris_class_encoded"]].tail(3))
 
 # Ordinal Encoding -------------------------------------------------------------------------------------
 # Define category order for Temperature ----------------------------------------------------------------
-ordinal_map = [["Cold", "Warm", "Hot", "Very Hot"]]
-ordinal_encoder = OrdinalEncoder(categories=ordinal_map)
-temp["Temperature_OrdinalEncoded"] = ordinal_encoder.fit_transform(temp[["Temperature"]])
-print("\n=== Ordinal Encoded Temperature (Cold=1, Warm=2, Hot=3, Very Hot=4) ===")
+phase('transform', step='encode', rows=len(temp))
+ordinal_map = {"Temperature": ["Cold", "Warm", "Hot", "Very hot"]}
+ordinal_encoder = CategoricalEncoder(categories=ordinal_map)
+temp["Temperature_OrdinalEncoded"] = ordinal_encoder.encode(temp["Temperature"])
+print("\n=== Ordinal Encoded Temperature (Cold=0, Warm=1, Hot=2, Very hot=3) ===")
 print(temp[["Temperature", "Temperature_OrdinalEncoded"]])
 
-# One-Hot Encoding -------------------------------------------------------------------------------------
-onehot_encoder = OneHotEncoder(sparse_output=False)
-temp_onehot = pd.DataFrame(onehot_encoder.fit_transform(temp[["Temperature"]]),
-                           columns=onehot_encoder.get_feature_names_out(["Temperature"]))
+# One-Hot Encoding (sparse) ----------------------------------------------------------------------------
+onehot_encoder = CategoricalEncoder().fit(temp[["Temperature"]])
+temp_onehot = pd.DataFrame.sparse.from_spmatrix(onehot_encoder.one_hot(temp[["Temperature"]]),
+                                                columns=onehot_encoder.feature_names_out())
 print("\n=== One-Hot Encoded Temperature ===")
 print(temp_onehot.head())
 
 # One-Hot Encoding for iris dataset --------------------------------------------------------------------
-iris_onehot = pd.DataFrame(onehot_encoder.fit_transform(iris[["iris_class"]]),
-                           columns=onehot_encoder.get_feature_names_out(["iris_class"]))
+# Separate encoder so the temperature vocabulary isn't thrown away
+onehot_encoder_iris = CategoricalEncoder().fit(iris[["iris_class"]])
+iris_onehot = pd.DataFrame.sparse.from_spmatrix(onehot_encoder_iris.one_hot(iris[["iris_class"]]),
+                                                columns=onehot_encoder_iris.feature_names_out())
 print("\n=== One-Hot Encoded Iris Classes ===")
 print(iris_onehot.head())
 
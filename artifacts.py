@@ -0,0 +1,204 @@
+# MODEL ARTIFACTS --------------------------------------------------------------------------------------
+# Fitted models saved as one small .npz file each - coefficients, scaler parameters and a JSON header -
+# and loaded back as predictors that only need numpy, so serving one doesn't mean re-reading the CSV,
+# refitting, or importing sklearn / matplotlib.
+#
+#   export_model(model, 'artifacts/co2.npz', features=['Weight', 'Volume'])
+#   predictor = load_model('artifacts/co2.npz')
+#   predictor.predict(np.array([[2300, 1300]]))
+#
+# Supported models:
+#   linear      - LinearRegression, regression.IncrementalLinearRegression
+#   polynomial  - polynomial.PolynomialRegression, or a PolynomialFeatures + LinearRegression pipeline
+#   logistic    - binary LogisticRegression; predict() gives class labels and predict_proba() the
+#                 positive-class odds
+#
+# Any of them may come after a StandardScaler (pass scaler= or use a pipeline), and the sklearn ones after
+# PolynomialFeatures too. Pipelines must be in the order the predictor applies them: scaler, expansion, model.
+# ------------------------------------------------------------------------------------------------------
+import json
+import os
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_VERSION = 1
+ARTIFACT_DIR = os.path.join(ROOT, 'artifacts')     # next to the code, wherever it's run from
+
+
+# Export -----------------------------------------------------------------------------------------------
+def _unpack(model, scaler):
+    # Pipelines -> (final model, scaler, (degree, include_bias, n_features) of a PolynomialFeatures step)
+    poly = None
+    steps = getattr(model, 'steps', None)
+    if steps:
+        for _, step in steps[:-1]:
+            name = type(step).__name__
+            if name == 'StandardScaler' and scaler is None and poly is None:
+                scaler = step
+            elif name == 'PolynomialFeatures' and poly is None and not step.interaction_only:
+                poly = (step.degree, step.include_bias, step.n_features_in_)
+            elif name in ('StandardScaler', 'PolynomialFeatures'):
+                raise TypeError("Can only export pipelines of StandardScaler, then PolynomialFeatures "
+                                "(full, not interaction_only), then the model - one of each at most")
+            else:
+                raise TypeError(f"Can't export pipeline step {name}")
+        model = steps[-1][1]
+    return model, scaler, poly
+
+
+def export_model(model, path, features=None, scaler=None):
+    model, scaler, poly = _unpack(model, scaler)
+    name = type(model).__name__
+    arrays = {'coef': np.ravel(np.asarray(model.coef_, dtype=np.float64)),
+              'intercept': np.float64(np.ravel(model.intercept_)[0])}
+    meta = {'version': ARTIFACT_VERSION, 'model': name, 'features': list(features) if features is not None else None}
+
+    if name == 'PolynomialRegression':
+        if poly is not None:
+            raise TypeError("PolynomialRegression already expands its inputs; drop the PolynomialFeatures step")
+        poly = (model.degree, model.include_bias, model.expansion.n_features)
+    if name == 'LogisticRegression':
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary LogisticRegression can be exported")
+        meta.update(kind='logistic', classes=[c.item() if hasattr(c, 'item') else c for c in model.classes_],
+                    n_features=len(arrays['coef']))
+    else:
+        meta.update(kind='linear' if poly is None else 'polynomial', n_features=len(arrays['coef']))
+    # A logistic model on expanded inputs stays logistic and keeps the expansion alongside
+    if poly is not None:
+        meta.update(degree=poly[0], include_bias=poly[1], n_features=poly[2])
+
+    if scaler is not None:
+        arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+    return path
+
+
+# Predictors -------------------------------------------------------------------------------------------
+class Predictor:
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta['kind']
+        self.features = meta['features']
+        self.coef = arrays['coef']
+        self.intercept = float(arrays['intercept'])
+        self.scaler = (arrays['scaler_mean'], arrays['scaler_scale']) if 'scaler_mean' in arrays else None
+        self.n_features = meta['n_features']
+        self.expansion = None
+        if 'degree' in meta:
+            from polynomial import PolynomialExpansion
+            self.expansion = PolynomialExpansion(self.n_features, meta['degree'], meta['include_bias'])
+
+    def decision(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        if self.scaler is not None:
+            X = (X - self.scaler[0]) / self.scaler[1]
+        if self.expansion is not None:
+            return self.expansion.expand(X) @ self.coef + self.intercept
+        return X @ self.coef + self.intercept
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def predict_proba(self, X):
+        if self.kind != 'logistic':
+            raise ValueError(f"{self.kind} models don't give probabilities")
+        return self.predict_with_proba(X)[1]
+
+    def predict_with_proba(self, X):
+        # (predictions, positive-class probabilities or None) from a single evaluation
+        z = self.decision(X)
+        if self.kind != 'logistic':
+            return z, None
+        labels = np.asarray(self.meta['classes'])[(z > 0).astype(np.intp)]
+        return labels, 1.0 / (1.0 + np.exp(-z))
+
+
+def load_model(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    if meta.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"{path}: unsupported artifact version {meta.get('version')}")
+    return Predictor(meta, arrays)
+
+
+def load_models(directory=ARTIFACT_DIR):
+    # {name: predictor} for every artifact in a folder
+    return {os.path.splitext(name)[0]: load_model(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory)) if name.endswith('.npz')}
+
+
+# The Week4 / Week5.1 models ---------------------------------------------------------------------------
+def export_week_models(directory=ARTIFACT_DIR):
+    # Fitted exactly as the scripts fit them
+    from sklearn.linear_model import LinearRegression, LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    import datasets
+    from polynomial import PolynomialRegression
+
+    paths = []
+    salary = datasets.load('salary')
+    X_train, _, y_train, _ = train_test_split(salary[['YearsExperience']], salary['Salary'],
+                                              test_size=0.2, random_state=42)
+    paths.append(export_model(LinearRegression().fit(X_train, y_train), os.path.join(directory, 'salary.npz'),
+                              features=['YearsExperience']))
+
+    features = ['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms',
+                'Avg. Area Number of Bedrooms', 'Area Population']
+    housing = datasets.load('usa_housing', columns=features + ['Price'])
+    X_train, _, y_train, _ = train_test_split(housing[features], housing['Price'], test_size=0.2, random_state=42)
+    paths.append(export_model(LinearRegression().fit(X_train, y_train), os.path.join(directory, 'housing.npz'),
+                              features=features))
+
+    ads = datasets.load('social_ads', columns=['Age', 'EstimatedSalary', 'Purchased'])
+    X_train, _, y_train, _ = train_test_split(ads[['Age', 'EstimatedSalary']], ads['Purchased'],
+                                              test_size=0.25, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    model = LogisticRegression().fit(scaler.transform(X_train), y_train)
+    paths.append(export_model(model, os.path.join(directory, 'social_ads.npz'),
+                              features=['Age', 'EstimatedSalary'], scaler=scaler))
+
+    cars = datasets.load('cars', columns=['Weight', 'Volume', 'CO2'])
+    model = PolynomialRegression(degree=2).fit(cars[['Weight', 'Volume']], cars['CO2'])
+    paths.append(export_model(model, os.path.join(directory, 'co2.npz'), features=['Weight', 'Volume']))
+    return paths
+
+
+if __name__ == "__main__":
+    for path in export_week_models():
+        predictor = load_model(path)
+        print(f"{path}: {predictor.kind}, features {predictor.features}, {os.path.getsize(path):,} bytes")
+    print("Predicted CO₂ for car (2300kg, 1300cm³):", load_model('artifacts/co2.npz').predict([[2300, 1300]]))
+
+    # Pipelines round-trip, a logistic model on polynomial features included; scaling after the
+    # expansion is refused rather than exported in the wrong order
+    import tempfile
+
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+    import datasets
+
+    ads = datasets.load('social_ads', columns=['Age', 'EstimatedSalary', 'Purchased'])
+    X, y = ads[['Age', 'EstimatedSalary']].to_numpy(), ads['Purchased']
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = make_pipeline(StandardScaler(), PolynomialFeatures(2), LogisticRegression()).fit(X, y)
+        predictor = load_model(export_model(pipeline, os.path.join(tmp, 'ads.npz')))
+        assert predictor.kind == 'logistic'
+        assert (predictor.predict(X) == pipeline.predict(X)).all()
+        assert np.allclose(predictor.predict_proba(X), pipeline.predict_proba(X)[:, 1])
+        try:
+            export_model(make_pipeline(PolynomialFeatures(2), StandardScaler(), LogisticRegression()).fit(X, y),
+                         os.path.join(tmp, 'wrong.npz'))
+            raise AssertionError("pipeline in the wrong order was exported")
+        except TypeError:
+            pass
+    print("Scaler + PolynomialFeatures + LogisticRegression pipeline: same predictions and probabilities")
@@ -0,0 +1,332 @@
+# BENCHMARK SUITE --------------------------------------------------------------------------------------
+# Times the core computation of every Week script (no plotting) on the registered datasets and on
+# copies scaled up 10x, 100x and 1000x by repeating their rows.
+#
+#   python benchmark.py                              # all cases, all scales
+#   python benchmark.py --cases week2_stats --scales 1 10
+#   python benchmark.py --save-baseline              # record the current numbers as the baseline
+#
+# Each case runs in a fresh process so peak RSS isn't polluted by earlier cases. For each one we
+# record the best wall time over --repeat runs, peak RSS, and peak/total Python allocations from
+# tracemalloc (measured in a separate run, as tracing slows things down). Results go to JSON and are
+# compared against the baseline file; anything slower or hungrier than --tolerance allows is
+# reported as a regression and the exit code is 1. So is a case that raises, dies (out of memory, a
+# signal) or runs past --timeout, and a baseline case missing from the results.
+# ------------------------------------------------------------------------------------------------------
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+DEFAULT_SCALES = [1, 10, 100, 1000]
+CASE_TIMEOUT = 1800         # seconds, per case and scale
+POLL_SECONDS = 1
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+
+def scaled(name, scale, columns=None):
+    import datasets
+    df = datasets.load(name, columns)
+    return pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+
+
+# Cases ------------------------------------------------------------------------------------------------
+# Each case is setup(scale, tmpdir) -> state (not timed) and run(state) (timed)
+def setup_week2(scale, tmpdir):
+    df = scaled('user_behavior', scale).dropna()
+    return df[df['Screen_On_Time'] > 0]
+
+
+def run_week2(df):
+    from stats import describe
+    describe(df)
+
+
+def setup_week3(scale, tmpdir):
+    path = os.path.join(tmpdir, 'retail_sales.csv')
+    scaled('retail_sales', scale).to_csv(path, index=False)
+    return path, tmpdir
+
+
+def run_week3(state):
+    from clean_pipeline import run_pipelines
+    path, tmpdir = state
+    run_pipelines(path, {
+        os.path.join(tmpdir, 'clean.csv'): [('dedupe', {}), ('dropna', {}), ('rename', {'normalise': True})],
+        os.path.join(tmpdir, 'filled.csv'): [('fill', {'column': 'Sales', 'value': 'mean'}),
+                                             ('fill', {'column': 'Profit', 'value': 0}),
+                                             ('fill', {'column': 'Country', 'value': 'Unknown'}),
+                                             ('ffill', {'column': 'Sales'}),
+                                             ('bfill', {'column': 'Sales'})],
+    })
+
+
+def _split(X, y, test_size):
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=test_size, random_state=42)
+
+
+def setup_week4_linear(scale, tmpdir):
+    salary = scaled('salary', scale)
+    features = ['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms',
+                'Avg. Area Number of Bedrooms', 'Area Population']
+    housing = scaled('usa_housing', scale, features + ['Price'])
+    return [_split(salary[['YearsExperience']], salary['Salary'], 0.2),
+            _split(housing[features], housing['Price'], 0.2)]
+
+
+def run_week4_linear(splits):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error, r2_score
+    for X_train, X_test, y_train, y_test in splits:
+        model = LinearRegression().fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        mean_squared_error(y_test, y_pred), r2_score(y_test, y_pred)
+
+
+def setup_week4_logistic(scale, tmpdir):
+    df = scaled('social_ads', scale, ['Age', 'EstimatedSalary', 'Purchased'])
+    return _split(df[['Age', 'EstimatedSalary']], df['Purchased'], 0.25)
+
+
+def run_week4_logistic(split):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report, confusion_matrix
+    from sklearn.preprocessing import StandardScaler
+    X_train, X_test, y_train, y_test = split
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+    y_pred = LogisticRegression().fit(X_train, y_train).predict(X_test)
+    confusion_matrix(y_test, y_pred), classification_report(y_test, y_pred, zero_division=0)
+
+
+def setup_week5_poly(scale, tmpdir):
+    df = scaled('cars', scale, ['Weight', 'Volume', 'CO2'])
+    return df[['Weight', 'Volume']], df['CO2']
+
+
+def run_week5_poly(state):
+    from polynomial import PolynomialRegression
+    x, y = state
+    model = PolynomialRegression(degree=2).fit(x, y)
+    model.score(x, y), model.predict(x)
+
+
+def setup_week5_preprocess(scale, tmpdir):
+    return scaled('pima', scale), scaled('temperature', scale), scaled('iris', scale)
+
+
+def run_week5_preprocess(state):
+    from encoding import CategoricalEncoder
+    from preprocess import FusedPreprocessor
+    pima, temp, iris = state
+    FusedPreprocessor().fit_transform(pima, ['impute_mean', 'impute_median'])
+    dropped = pima.dropna()
+    FusedPreprocessor().fit_transform(dropped, {'minmax': ['minmax'], 'l1': ['l1'], 'l2': ['l2'],
+                                                'binarized': ['minmax', 'binarize'], 'standard': ['standard']})
+    for frame, col in [(temp, 'Temperature'), (iris, 'iris_class')]:
+        enc = CategoricalEncoder().fit(frame[[col]])
+        enc.encode(frame[col]), enc.one_hot(frame[[col]])
+
+
+CASES = {
+    'week2_stats': (setup_week2, run_week2),
+    'week3_clean_fill': (setup_week3, run_week3),
+    'week4_linear': (setup_week4_linear, run_week4_linear),
+    'week4_logistic': (setup_week4_logistic, run_week4_logistic),
+    'week5_poly': (setup_week5_poly, run_week5_poly),
+    'week5_preprocess': (setup_week5_preprocess, run_week5_preprocess),
+}
+
+
+# Measuring --------------------------------------------------------------------------------------------
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(name, scale, repeat, results):
+    sys.path.insert(0, ROOT)
+    setup, run = CASES[name]
+    tmpdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    try:
+        state = setup(scale, tmpdir)
+        run(state)                                      # warm-up: imports, caches
+        rss_before = _peak_rss_mb()
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(state)
+            times.append(time.perf_counter() - start)
+        rss_after = _peak_rss_mb()
+
+        tracemalloc.start()
+        run(state)
+        _, alloc_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+
+        results.put({
+            'wall_s': min(times),
+            'wall_mean_s': float(np.mean(times)),
+            'peak_rss_mb': rss_after,
+            'rss_growth_mb': None if rss_before is None else rss_after - rss_before,
+            'alloc_peak_mb': alloc_peak / 1e6,
+            'alloc_live_blocks': blocks,
+        })
+    except Exception as e:
+        results.put({'error': f'{type(e).__name__}: {e}'})
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def measure(name, scale, repeat, timeout=CASE_TIMEOUT):
+    # The child may be killed (out of memory, a signal) before it reports, so poll rather than wait
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(name, scale, repeat, results))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if not proc.is_alive():
+                # One last look, in case it reported just before exiting
+                try:
+                    result = results.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    result = {'error': f'exit code {proc.exitcode}'}
+            elif time.monotonic() > deadline:
+                proc.terminate()
+                result = {'error': f'timed out after {timeout:g}s'}
+    proc.join()
+    return result
+
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+# Comparing --------------------------------------------------------------------------------------------
+def compare(results, baseline, tolerance):
+    # Errors are reported by main(); here only cases that ran both times are compared
+    regressions = []
+    for key, now in results.items():
+        before = baseline.get(key)
+        if not before or 'error' in now or 'error' in before:
+            continue
+        for metric in ('wall_s', 'alloc_peak_mb'):
+            if before[metric] > 0 and now[metric] > before[metric] * (1 + tolerance):
+                regressions.append((key, metric, before[metric], now[metric]))
+    return regressions
+
+
+def _selected(key, cases, scales):
+    name, _, scale = key.rpartition('@')
+    if name not in CASES:
+        return True
+    return name in cases and scale.rstrip('x').isdigit() and int(scale.rstrip('x')) in scales
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Week scripts' hot paths")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--scales', nargs='+', type=int, default=DEFAULT_SCALES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'latest.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument('--timeout', type=float, default=CASE_TIMEOUT, help="seconds allowed per case and scale")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'case':32s} {'wall (ms)':>10s} {'RSS (MB)':>10s} {'alloc (MB)':>11s}")
+    for name in args.cases:
+        for scale in args.scales:
+            key = f'{name}@{scale}x'
+            result = measure(name, scale, args.repeat, args.timeout)
+            results[key] = result
+            if 'error' in result:
+                print(f"{key:32s} ERROR {result['error']}")
+                continue
+            rss = result['peak_rss_mb']
+            print(f"{key:32s} {result['wall_s'] * 1000:10.1f} {rss if rss is not None else float('nan'):10.1f} "
+                  f"{result['alloc_peak_mb']:11.1f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    print(f"\nResults saved as: {args.output}")
+
+    errors = {key: result['error'] for key, result in results.items() if 'error' in result}
+    if errors:
+        print(f"\n❌ {len(errors)} case(s) FAILED{'' if not args.save_baseline else ' - baseline not saved'}:")
+        for key, error in errors.items():
+            print(f"   {key:32s} {error}")
+        return 1
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved as: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline to create one)")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    # Baseline cases this run should have covered but didn't (renamed or removed cases included)
+    missing = [key for key in baseline if key not in results and _selected(key, args.cases, args.scales)]
+    if missing:
+        print(f"\n❌ {len(missing)} baseline case(s) missing from the results: {', '.join(missing)}")
+        return 1
+
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 0
+
+    print(f"\n❌ {len(regressions)} REGRESSION(S) against {args.baseline}:")
+    for key, metric, before, now in regressions:
+        print(f"   {key:32s} {metric:14s} {before:10.4f} -> {now:10.4f} ({now / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# BINNED SCATTER AND PAIR PLOTS ------------------------------------------------------------------------
+# Drop-in layers for scatter plots and pairplots that stay cheap however many rows there are:
+#
+#   report.figure('pairplot', pairplot_layer(df), suptitle="Pairwise Relationships")
+#   report.figure('fit', scatter_layer(y_test, y_pred, color='purple'), title=...)
+#
+# Up to max_points rows the layer is the ordinary one (sns.pairplot / plt.scatter / sns.scatterplot),
+# so small course datasets look exactly as before. Past that the points are counted into a grid
+# here, in the script, and only the counts reach the figure: a pairplot of p columns draws p x p
+# small images instead of n·p² markers, and the figure spec that render pickles and hashes is a few
+# kilobytes rather than the whole frame.
+#
+#   - Each column is binned once: its edges (evenly spaced over its range) and every row's bin number
+#     are cached and shared by all the panels that use the column, so each 2D panel is a single
+#     np.bincount over the two columns' bin numbers. Columns of datasets.load() frames are read-only,
+#     so their bins are also reused across figures.
+#   - kind='hex' bins scatters into hexagons instead (same two-lattice rule as plt.hexbin); only the
+#     occupied cells are handed to hexbin to draw.
+#   - sample=n draws an exact plot of n rows picked with random_state instead, reproducibly.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+from render import layer
+
+MAX_POINTS = 20_000
+BINS = 60
+HEX_GRIDSIZE = 60
+
+
+# Column bins ------------------------------------------------------------------------------------------
+class ColumnBins:
+    def __init__(self, values, bins=BINS):
+        values = np.asarray(values, dtype=np.float64)
+        lo, hi = (np.nanmin(values), np.nanmax(values)) if np.isfinite(values).any() else (0.0, 1.0)
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        self.bins = bins
+        self.edges = np.linspace(lo, hi, bins + 1)
+        with np.errstate(invalid='ignore'):
+            index = ((values - lo) * (bins / (hi - lo))).astype(np.intp, copy=False)
+        index = np.minimum(index, bins - 1)                   # the maximum goes in the last bin
+        index[~np.isfinite(values)] = -1
+        self.index = index
+        self.counts = np.bincount(index[index >= 0], minlength=bins)
+
+
+_bins = {}          # (id of a read-only array, bins) -> (array, ColumnBins)
+
+
+def column_bins(values, bins=BINS):
+    array = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if array.flags.writeable:
+        return ColumnBins(array, bins)
+    key = (id(array), bins)
+    cached = _bins.get(key)
+    if cached is None or cached[0] is not array:
+        cached = _bins[key] = (array, ColumnBins(array, bins))
+    return cached[1]
+
+
+def counts_2d(x_bins, y_bins):
+    # [i, j] = rows in x bin i and y bin j
+    valid = (x_bins.index >= 0) & (y_bins.index >= 0)
+    flat = x_bins.index[valid] * y_bins.bins + y_bins.index[valid]
+    return np.bincount(flat, minlength=x_bins.bins * y_bins.bins).reshape(x_bins.bins, y_bins.bins)
+
+
+def hex_counts(x, y, gridsize=HEX_GRIDSIZE):
+    # (cell centres x, y, counts, extent) for the occupied cells of plt.hexbin's grid
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    # No finite pairs gives no cells, over the same unit fallback range as ColumnBins
+    extent = (x.min(), x.max(), y.min(), y.max()) if len(x) else (0.0, 1.0, 0.0, 1.0)
+    nx, ny = gridsize, int(gridsize / np.sqrt(3))
+    padding = 1e-9 * (extent[1] - extent[0])                 # as hexbin pads the x range
+    xmin, ymin = extent[0] - padding, extent[2]
+    sx = (extent[1] + padding - xmin) / nx or 1.0
+    sy = (extent[3] - ymin) / ny or 1.0
+    ix, iy = (x - xmin) / sx, (y - ymin) / sy
+
+    # Nearest centre on the main lattice (integers) or the offset one (half-integers)
+    ix1, iy1 = np.round(ix).astype(np.intp), np.round(iy).astype(np.intp)
+    ix2, iy2 = np.floor(ix).astype(np.intp), np.floor(iy).astype(np.intp)
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    on_main = d1 < d2
+    # Centres in half-steps, as one integer per cell so the count is a flat unique
+    cx = np.where(on_main, 2 * ix1, 2 * ix2 + 1)
+    cy = np.where(on_main, 2 * iy1, 2 * iy2 + 1)
+    width = 2 * ny + 2
+    cells, counts = np.unique(cx * width + cy, return_counts=True)
+    cx, cy = np.divmod(cells, width)
+    return xmin + cx * sx / 2, ymin + cy * sy / 2, counts, extent
+
+
+def _sample(n, sample, random_state):
+    return np.sort(np.random.default_rng(random_state).choice(n, size=min(sample, n), replace=False))
+
+
+# Layers -----------------------------------------------------------------------------------------------
+def pairplot_layer(df, max_points=MAX_POINTS, bins=BINS, sample=None, random_state=42, **kwargs):
+    if sample is not None:
+        df = df.iloc[_sample(len(df), sample, random_state)]
+    if len(df) <= max_points:
+        return layer('pairplot', df, **kwargs)
+
+    # Column by column rather than select_dtypes(), which would copy the arrays (and lose the cache)
+    columns = [name for name in df.columns if pd.api.types.is_numeric_dtype(df[name])]
+    binned = {name: column_bins(df[name], bins) for name in columns}
+    panels = {(a, b): counts_2d(binned[columns[a]], binned[columns[b]])
+              for a in range(len(columns)) for b in range(a + 1, len(columns))}
+    return layer('binned_pairplot', columns, {name: (b.edges, b.counts) for name, b in binned.items()},
+                 panels, rows=len(df))
+
+
+def scatter_layer(x, y, data=None, max_points=MAX_POINTS, kind='hist', bins=BINS, gridsize=HEX_GRIDSIZE,
+                  sample=None, random_state=42, **kwargs):
+    # x / y are arrays, or column names in `data` like sns.scatterplot
+    names = (x, y) if data is not None else (None, None)
+    xs, ys = (data[x], data[y]) if data is not None else (x, y)
+    n = len(xs)
+    if sample is not None and sample < n:
+        rows = _sample(n, sample, random_state)
+        xs, ys = np.asarray(xs)[rows], np.asarray(ys)[rows]
+        n = len(rows)
+        if data is not None:
+            data = pd.DataFrame({x: xs, y: ys})
+    if n <= max_points:
+        if data is not None:
+            return layer('scatterplot', x=x, y=y, data=data, **kwargs)
+        return layer('scatter', xs, ys, **kwargs)
+
+    xs, ys = (v.iloc[:, 0] if isinstance(v, pd.DataFrame) else v for v in (xs, ys))   # e.g. X[['col']]
+    options = {key: kwargs[key] for key in ('cmap', 'label') if key in kwargs}
+    if kind == 'hex':
+        cx, cy, counts, extent = hex_counts(xs, ys, gridsize)
+        return layer('binned_hexbin', cx, cy, counts, extent, gridsize, names=names, **options)
+    x_bins, y_bins = column_bins(xs, bins), column_bins(ys, bins)
+    return layer('binned_scatter', x_bins.edges, y_bins.edges, counts_2d(x_bins, y_bins), names=names, **options)
+
+
+# Drawing (called by render.draw) ----------------------------------------------------------------------
+def _mesh(ax, x_edges, y_edges, counts, cmap='viridis', label=None):
+    from matplotlib.colors import LogNorm
+    masked = np.ma.masked_equal(counts.T, 0)                 # empty cells stay background
+    norm = LogNorm(vmin=1, vmax=max(counts.max(), 1))        # explicit, so an empty panel still draws
+    return ax.pcolormesh(x_edges, y_edges, masked, cmap=cmap, norm=norm, label=label)
+
+
+def draw_binned_scatter(x_edges, y_edges, counts, names=(None, None), cmap='viridis', label=None):
+    import matplotlib.pyplot as plt
+    ax = plt.gca()
+    mesh = _mesh(ax, x_edges, y_edges, counts, cmap, label)
+    if counts.any():                                         # a log colour bar needs at least one cell
+        plt.colorbar(mesh, ax=ax, label='rows')
+    if names[0] is not None:
+        ax.set_xlabel(names[0])
+        ax.set_ylabel(names[1])
+
+
+def draw_binned_hexbin(cx, cy, counts, extent, gridsize, names=(None, None), cmap='viridis', label=None):
+    import matplotlib.pyplot as plt
+    # One weighted point per occupied cell; same grid, so each lands back in its own hexagon
+    hexes = plt.hexbin(cx, cy, C=counts, reduce_C_function=np.sum, gridsize=gridsize, extent=extent,
+                       cmap=cmap, bins='log', label=label)
+    if len(counts):                                          # a log colour bar needs at least one cell
+        plt.colorbar(hexes, label='rows')
+    if names[0] is not None:
+        plt.xlabel(names[0])
+        plt.ylabel(names[1])
+
+
+def draw_binned_pairplot(columns, histograms, panels, rows, cmap='Blues', height=2.5):
+    import matplotlib.pyplot as plt
+    p = len(columns)
+    fig, axes = plt.subplots(p, p, figsize=(height * p, height * p), squeeze=False)
+    for a in range(p):
+        for b in range(p):
+            ax = axes[b, a]                                   # column a on x, column b on y
+            if a == b:
+                edges, counts = histograms[columns[a]]
+                ax.stairs(counts, edges, fill=True, alpha=0.7)
+            elif a < b:
+                _mesh(ax, histograms[columns[a]][0], histograms[columns[b]][0], panels[a, b], cmap)
+            else:
+                _mesh(ax, histograms[columns[a]][0], histograms[columns[b]][0], panels[b, a].T, cmap)
+            ax.set_xlabel(columns[a] if b == p - 1 else '')
+            ax.set_ylabel(columns[b] if a == 0 else '')
+            if b != p - 1:
+                ax.set_xticklabels([])
+            if a != 0:
+                ax.set_yticklabels([])
+    fig.text(0.99, 0.005, f"{rows:,} rows, binned", ha='right', va='bottom', fontsize=8, color='grey')
+    fig.tight_layout()
+    return fig
+
+
+# Timings against drawing every point ------------------------------------------------------------------
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    import datasets
+    from render import draw
+
+    housing = datasets.load('usa_housing', columns=['Avg. Area Income', 'Avg. Area House Age',
+                                                    'Avg. Area Number of Rooms', 'Area Population', 'Price'])
+    rng = np.random.default_rng(0)
+    for copies in (1, 40, 200):
+        df = pd.concat([housing] * copies, ignore_index=True)
+        df = df + rng.normal(scale=0.01, size=df.shape) * df.std().to_numpy()
+        timings = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, spec in [('binned', pairplot_layer(df, max_points=0)),
+                               ('sample 5,000', pairplot_layer(df, sample=5000)),
+                               ('every point', layer('pairplot', df))]:
+                if name == 'every point' and len(df) > 200_000:
+                    continue
+                start = time.perf_counter()
+                fig = draw({'layers': (spec,), 'options': {}, 'theme': None})
+                fig.savefig(os.path.join(tmp, 'pairplot.png'))
+                plt.close('all')
+                timings[name] = time.perf_counter() - start
+        print(f"{len(df):>9,} rows: " + ", ".join(f"{name} {t:.1f}s" for name, t in timings.items()))
+
+    # Bins are shared: the second pairplot over the same loaded columns reuses them
+    start = time.perf_counter()
+    pairplot_layer(housing, max_points=0)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    pairplot_layer(housing, max_points=0)
+    print(f"\nBinning USA_Housing: {first * 1000:.1f} ms first time, {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"with the cached column bins")
+    x, y = rng.normal(size=(2, 1_000_000))
+    start = time.perf_counter()
+    spec = scatter_layer(x, x + y, kind='hex')
+    print(f"Hexbin of 1,000,000 points: {len(spec[1][2]):,} occupied cells in {time.perf_counter() - start:.2f}s")
+
+    # A column with no finite values gives an empty layer that still draws, rather than an error
+    for kind in ('hex', 'grid'):
+        spec = scatter_layer(np.full(30_000, np.nan), np.arange(30_000.0), kind=kind)
+        draw = draw_binned_hexbin if kind == 'hex' else draw_binned_scatter
+        plt.figure()
+        draw(*spec[1], **spec[2])
+        plt.close('all')
+    print("All-NaN column: empty hex and grid layers")
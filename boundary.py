@@ -0,0 +1,222 @@
+# DECISION BOUNDARY RENDERING --------------------------------------------------------------------------
+# Faster ways to draw a 2-feature classifier's decision regions than calling model.predict on a full
+# np.meshgrid:
+#
+#   decision_grid()      - label grid computed a few rows (a tile) at a time into preallocated
+#                          buffers. Linear models use w·x + b directly; anything else uses predict.
+#   adaptive_grid()      - same grid, but only cells that straddle the boundary are worked out at
+#                          full resolution (quadtree refinement from a coarse grid).
+#   boundary_line()      - the exact boundary of a linear model, w0*x + w1*y + b = 0.
+#   boundary_polygons()  - the two class regions of a linear model as polygons, for plt.fill.
+#                          No grid at all, so the cost doesn't depend on resolution.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+
+
+def linear_decision(model):
+    # (w, b) of a fitted binary linear model (LogisticRegression, LinearSVC, ...), or None
+    coef = getattr(model, 'coef_', None)
+    intercept = getattr(model, 'intercept_', None)
+    if coef is None or intercept is None:
+        return None
+    coef = np.atleast_2d(coef)
+    if coef.shape != (1, 2):
+        return None
+    return coef[0].astype(np.float64), float(np.ravel(intercept)[0])
+
+
+def grid_axes(x_range, y_range, step):
+    xs = np.arange(x_range[0], x_range[1], step)
+    ys = np.arange(y_range[0], y_range[1], step)
+    return xs, ys
+
+
+# Tiled grid -------------------------------------------------------------------------------------------
+def decision_grid(model, x_range, y_range, step=0.01, tile_rows=128, out=None):
+    xs, ys = grid_axes(x_range, y_range, step)
+    nx, ny = len(xs), len(ys)
+    labels = out if out is not None else np.empty((ny, nx), dtype=np.uint8)
+    linear = linear_decision(model)
+
+    if linear is not None:
+        (w0, w1), b = linear
+        wx = w0 * xs                                  # shared by every row
+        buf = np.empty((tile_rows, nx))
+        for start in range(0, ny, tile_rows):
+            rows = min(tile_rows, ny - start)
+            tile = buf[:rows]
+            np.add(wx[None, :], (w1 * ys[start:start + rows] + b)[:, None], out=tile)
+            np.greater(tile, 0, out=labels[start:start + rows])
+        return xs, ys, labels
+
+    # Generic model - reuse one (tile_rows * nx, 2) point buffer for every predict call
+    points = np.empty((tile_rows * nx, 2))
+    for start in range(0, ny, tile_rows):
+        rows = min(tile_rows, ny - start)
+        pts = points[:rows * nx]
+        pts[:, 0] = np.tile(xs, rows)
+        pts[:, 1] = np.repeat(ys[start:start + rows], nx)
+        labels[start:start + rows] = model.predict(pts).reshape(rows, nx)
+    return xs, ys, labels
+
+
+# Adaptive grid ----------------------------------------------------------------------------------------
+def _labels_at(model, linear, xs, ys, ii, jj):
+    if linear is not None:
+        (w0, w1), b = linear
+        return (w0 * xs[ii] + w1 * ys[jj] + b > 0).astype(np.uint8)
+    return np.asarray(model.predict(np.column_stack([xs[ii], ys[jj]]))).astype(np.uint8)
+
+
+def adaptive_grid(model, x_range, y_range, step=0.01, coarse=32, out=None):
+    # Assumes regions are not thinner than a coarse cell - always true for linear models
+    xs, ys = grid_axes(x_range, y_range, step)
+    nx, ny = len(xs), len(ys)
+    labels = out if out is not None else np.empty((ny, nx), dtype=np.uint8)
+    linear = linear_decision(model)
+
+    size = 1 << int(np.ceil(np.log2(max(coarse, 1))))
+    j0, i0 = np.meshgrid(np.arange(0, ny, size), np.arange(0, nx, size), indexing='ij')
+    cells_j, cells_i = j0.ravel(), i0.ravel()
+    first = True
+
+    while len(cells_i):
+        # Corners of every cell (clipped to the grid)
+        i1 = np.minimum(cells_i + size - 1, nx - 1)
+        j1 = np.minimum(cells_j + size - 1, ny - 1)
+        corners = np.stack([
+            _labels_at(model, linear, xs, ys, cells_i, cells_j),
+            _labels_at(model, linear, xs, ys, i1, cells_j),
+            _labels_at(model, linear, xs, ys, cells_i, j1),
+            _labels_at(model, linear, xs, ys, i1, j1),
+        ])
+        uniform = (corners == corners[0]).all(axis=0)
+
+        if first:
+            # Paint the whole grid from the coarse cells; mixed cells get overwritten below
+            coarse_labels = corners[0].reshape(j0.shape)
+            labels[:] = np.repeat(np.repeat(coarse_labels, size, axis=0), size, axis=1)[:ny, :nx]
+            first = False
+        elif uniform.any():
+            dj, di = np.divmod(np.arange(size * size), size)
+            jj = (cells_j[uniform][:, None] + dj).ravel()
+            ii = (cells_i[uniform][:, None] + di).ravel()
+            inside = (ii < nx) & (jj < ny)
+            labels[jj[inside], ii[inside]] = np.repeat(corners[0][uniform], size * size)[inside]
+
+        cells_i, cells_j = cells_i[~uniform], cells_j[~uniform]
+        if size == 1 or not len(cells_i):
+            break
+
+        # Split the mixed cells into quarters and go again
+        size //= 2
+        cells_i = np.concatenate([cells_i, cells_i + size, cells_i, cells_i + size])
+        cells_j = np.concatenate([cells_j, cells_j, cells_j + size, cells_j + size])
+        keep = (cells_i < nx) & (cells_j < ny)
+        cells_i, cells_j = cells_i[keep], cells_j[keep]
+
+    return xs, ys, labels
+
+
+# Analytic boundary (linear models only) ---------------------------------------------------------------
+def _line(model):
+    # (w0, w1, b) of a linear model's boundary, or a ValueError saying what to use instead
+    linear = linear_decision(model)
+    if linear is None:
+        raise ValueError(f"{type(model).__name__} is not a binary linear model on 2 features, so it has no "
+                         f"analytic boundary; use decision_grid() or adaptive_grid()")
+    (w0, w1), b = linear
+    if w0 == 0 and w1 == 0:
+        raise ValueError(f"{type(model).__name__} has all-zero weights, so it predicts one class everywhere and "
+                         f"has no boundary line; use decision_grid() or adaptive_grid()")
+    return w0, w1, b
+
+
+def boundary_line(model, x_range, y_range):
+    w0, w1, b = _line(model)
+    if abs(w1) > abs(w0):
+        x = np.array(x_range, dtype=np.float64)
+        return x, -(w0 * x + b) / w1
+    y = np.array(y_range, dtype=np.float64)
+    return -(w1 * y + b) / w0, y
+
+
+def _clip(corners, values, keep_positive):
+    # Cut the rectangle along the line: keep the corners on one side plus the crossing points
+    poly = []
+    for k in range(len(corners)):
+        p, q = corners[k], corners[(k + 1) % len(corners)]
+        fp, fq = values[k], values[(k + 1) % len(corners)]
+        inside_p = fp > 0 if keep_positive else fp <= 0
+        inside_q = fq > 0 if keep_positive else fq <= 0
+        if inside_p:
+            poly.append(p)
+        if inside_p != inside_q:
+            t = fp / (fp - fq)
+            poly.append(p + t * (q - p))
+    return np.array(poly).reshape(-1, 2)
+
+
+def boundary_polygons(model, x_range, y_range):
+    # ((xs, ys) of class 0, (xs, ys) of class 1) - ready for plt.fill(*polygon)
+    w0, w1, b = _line(model)
+    corners = np.array([[x_range[0], y_range[0]], [x_range[1], y_range[0]],
+                        [x_range[1], y_range[1]], [x_range[0], y_range[1]]], dtype=np.float64)
+    values = corners @ np.array([w0, w1]) + b
+    negative = _clip(corners, values, keep_positive=False)
+    positive = _clip(corners, values, keep_positive=True)
+    return (negative[:, 0], negative[:, 1]), (positive[:, 0], positive[:, 1])
+
+
+# Benchmark --------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.read_csv('Data/social_ads.csv')
+    X = StandardScaler().fit_transform(df[['Age', 'EstimatedSalary']])
+    model = LogisticRegression().fit(X, df['Purchased'])
+    x_range = (X[:, 0].min() - 1, X[:, 0].max() + 1)
+    y_range = (X[:, 1].min() - 1, X[:, 1].max() + 1)
+
+    def meshgrid_predict(step):
+        X1, X2 = np.meshgrid(np.arange(*x_range, step), np.arange(*y_range, step))
+        return model.predict(np.array([X1.ravel(), X2.ravel()]).T).reshape(X1.shape)
+
+    methods = {
+        'meshgrid + predict': meshgrid_predict,
+        'decision_grid': lambda step: decision_grid(model, x_range, y_range, step)[2],
+        'adaptive_grid': lambda step: adaptive_grid(model, x_range, y_range, step)[2],
+        'boundary_polygons': lambda step: boundary_polygons(model, x_range, y_range),
+    }
+    for step in [0.01, 0.0025]:
+        reference = meshgrid_predict(step)
+        print(f"step={step} ({reference.size:,} cells)")
+        for name, fn in methods.items():
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = fn(step)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if name in ('decision_grid', 'adaptive_grid'):
+                # Points lying exactly on the boundary can go either way
+                assert (result != reference).mean() < 1e-4
+            print(f"  {name:20s} {elapsed * 1000:8.1f} ms   peak {peak / 1e6:7.1f} MB")
+
+    # Models without a line are refused with a pointer to the grids, not an unpacking error
+    from sklearn.tree import DecisionTreeClassifier
+    zero = LogisticRegression().fit(X, df['Purchased'])
+    zero.coef_[:] = 0
+    for other in (DecisionTreeClassifier(max_depth=3).fit(X, df['Purchased']), zero):
+        for fn in (boundary_line, boundary_polygons):
+            try:
+                fn(other, x_range, y_range)
+                raise AssertionError(f"{fn.__name__} accepted {type(other).__name__}")
+            except ValueError as e:
+                assert 'decision_grid' in str(e)
+    print("boundary_line / boundary_polygons refuse non-linear and all-zero models")
@@ -0,0 +1,283 @@
+# CHUNKED CLEANING PIPELINE ----------------------------------------------------------------------------
+# Runs a list of cleaning steps over a CSV in chunks so the file never has to fit in memory.
+# Several pipelines can share the same read: every chunk is handed to each pipeline in turn and
+# each one appends its result to its own output file.
+#
+# Steps are written as (name, options) tuples, e.g.
+#     [('dedupe', {}), ('dropna', {}), ('rename', {'normalise': True})]
+#     [('fill', {'column': 'Sales', 'value': 'mean'}), ('ffill', {'column': 'Sales'})]
+#
+# 'mean' / 'median' fill values are worked out in a first, light pass that only reads the columns
+# that need them (see stats.describe_csv), over the raw input file.
+#
+# 'dedupe' has its duplicates found before the main read, by dedup.DuplicateScan with the row hashes
+# spilled to disk partitions, so no set of every row seen is held in memory. That pass sees the raw
+# rows, so 'dedupe' has to be a pipeline's first step (ValueError otherwise).
+# ('dedupe', {'normalise': True}) also treats rows differing only in whitespace or case as duplicates.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+from dedup import DuplicateScan, row_keys
+from stats import describe_csv
+
+
+# Helpers ----------------------------------------------------------------------------------------------
+def normalise_name(name):
+    return name.strip().lower().replace(' ', '_')
+
+
+# Steps ------------------------------------------------------------------------------------------------
+# Each step takes a chunk and returns the chunk to pass on. finish() returns any rows the step was
+# still holding back when the input ran out (only bfill needs this).
+class Step:
+    stat_columns = ()
+
+    def prepare(self, stats):
+        pass
+
+    def apply(self, chunk):
+        return chunk
+
+    def finish(self):
+        return None
+
+
+class Dedupe(Step):
+    def __init__(self, subset=None, normalise=False):
+        self.subset = subset
+        self.normalise = normalise
+        self.removed = 0
+        self.duplicates = None          # dedup.DuplicateReport, set by run_pipelines before the main read
+        self.row = 0
+
+    def keys(self, chunk):
+        return row_keys(chunk, self.subset, self.normalise)
+
+    def apply(self, chunk):
+        if self.duplicates is None:
+            raise RuntimeError("dedupe runs inside run_pipelines(), which finds the duplicates first")
+        dup = self.duplicates.is_duplicate(self.row, self.row + len(chunk))
+        self.row += len(chunk)
+        self.removed += int(dup.sum())
+        return chunk[~dup]
+
+
+class DropNa(Step):
+    def __init__(self, subset=None, how='any'):
+        self.subset = subset
+        self.how = how
+        self.removed = 0
+
+    def apply(self, chunk):
+        out = chunk.dropna(subset=self.subset, how=self.how)
+        self.removed += len(chunk) - len(out)
+        return out
+
+
+class Rename(Step):
+    def __init__(self, mapping=None, normalise=False):
+        self.mapping = mapping or {}
+        self.normalise = normalise
+
+    def apply(self, chunk):
+        chunk = chunk.rename(columns=self.mapping)
+        if self.normalise:
+            chunk.columns = [normalise_name(name) for name in chunk.columns]
+        return chunk
+
+
+class Fill(Step):
+    def __init__(self, column, value):
+        self.column = column
+        self.value = value
+        self.filled = 0
+        if value in ('mean', 'median'):
+            self.stat_columns = (column,)
+
+    def prepare(self, stats):
+        if self.value in ('mean', 'median'):
+            self.value = stats.at[self.value, self.column]
+
+    def apply(self, chunk):
+        missing = chunk[self.column].isna()
+        if missing.any():
+            chunk = chunk.copy()
+            chunk[self.column] = chunk[self.column].fillna(self.value)
+            self.filled += int(missing.sum())
+        return chunk
+
+
+class FFill(Step):
+    def __init__(self, column):
+        self.column = column
+        self.last = np.nan
+
+    def apply(self, chunk):
+        col = chunk[self.column]
+        if not len(col):
+            return chunk
+        # Carry the last value from the previous chunk into this one
+        filled = col.ffill().fillna(self.last)
+        if pd.notna(filled.iloc[-1]):
+            self.last = filled.iloc[-1]
+        chunk = chunk.copy()
+        chunk[self.column] = filled
+        return chunk
+
+
+class BFill(Step):
+    def __init__(self, column):
+        self.column = column
+        self.pending = None
+
+    def apply(self, chunk):
+        if self.pending is not None:
+            chunk = pd.concat([self.pending, chunk])
+            self.pending = None
+        valid = chunk[self.column].notna().to_numpy()
+        if not valid.any():
+            # Nothing to fill from yet - hold the rows until a value turns up
+            self.pending = chunk
+            return chunk.iloc[:0]
+
+        last_valid = len(valid) - 1 - np.argmax(valid[::-1])
+        chunk = chunk.copy()
+        chunk[self.column] = chunk[self.column].bfill()
+        self.pending = chunk.iloc[last_valid + 1:]
+        return chunk.iloc[:last_valid + 1]
+
+    def finish(self):
+        # Trailing gaps have nothing after them, so they stay empty (same as DataFrame.bfill)
+        pending, self.pending = self.pending, None
+        return pending
+
+
+STEP_TYPES = {
+    'dedupe': Dedupe,
+    'dropna': DropNa,
+    'rename': Rename,
+    'fill': Fill,
+    'ffill': FFill,
+    'bfill': BFill,
+}
+
+
+# Pipeline ---------------------------------------------------------------------------------------------
+class Pipeline:
+    def __init__(self, output_file, steps):
+        self.output_file = output_file
+        self.steps = [STEP_TYPES[name](**options) for name, options in steps]
+        if any(isinstance(step, Dedupe) for step in self.steps[1:]):
+            # Its duplicates are found on the raw rows, which later steps may have dropped or changed
+            raise ValueError(f"{output_file}: 'dedupe' must be the first step of a pipeline")
+        self.rows_in = 0
+        self.rows_out = 0
+        self.nulls = None
+        self._file = None
+
+    def stat_columns(self):
+        return {col for step in self.steps for col in step.stat_columns}
+
+    def prepare(self, stats):
+        for step in self.steps:
+            step.prepare(stats)
+
+    def _run(self, chunk, start=0):
+        for step in self.steps[start:]:
+            chunk = step.apply(chunk)
+        return chunk
+
+    def _write(self, chunk):
+        if chunk is None:
+            return
+        if self._file is None:
+            self._file = open(self.output_file, 'w', newline='', encoding='utf-8')
+            chunk.to_csv(self._file, index=False)
+            self.nulls = chunk.isnull().sum()
+        else:
+            chunk.to_csv(self._file, index=False, header=False)
+            self.nulls += chunk.isnull().sum()
+        self.rows_out += len(chunk)
+
+    def process(self, chunk):
+        self.rows_in += len(chunk)
+        self._write(self._run(chunk))
+
+    def close(self):
+        # Flush held-back rows through the steps that come after the one holding them
+        for i, step in enumerate(self.steps):
+            tail = step.finish()
+            if tail is not None and len(tail):
+                self._write(self._run(tail, start=i + 1))
+        if self._file is not None:
+            self._file.close()
+
+    def report(self):
+        steps = {}
+        for step in self.steps:
+            name = type(step).__name__.lower()
+            if hasattr(step, 'removed'):
+                steps[name] = steps.get(name, 0) + step.removed
+            elif hasattr(step, 'filled'):
+                steps[f'{name}:{step.column}'] = step.filled
+        return {'rows_in': self.rows_in, 'rows_out': self.rows_out, 'steps': steps, 'nulls': self.nulls}
+
+
+def run_pipelines(input_file, pipelines, chunksize=100_000, **read_csv_kwargs):
+    pipelines = [Pipeline(output_file, steps) for output_file, steps in pipelines.items()]
+
+    # Pass 1 - only the columns that need a mean/median
+    stat_columns = sorted(set().union(*(p.stat_columns() for p in pipelines)))
+    stats = None
+    if stat_columns:
+        stats = describe_csv(input_file, chunksize=chunksize, usecols=stat_columns, **read_csv_kwargs)
+    for p in pipelines:
+        p.prepare(stats)
+
+    # Leading dedupe steps see the raw rows, so their duplicates can be found up front
+    dedupes = [p.steps[0] for p in pipelines if p.steps and isinstance(p.steps[0], Dedupe)]
+    if dedupes:
+        # Each scan holds a temp dir and its partition files open, so all of them go on any error
+        scans = []
+        try:
+            for _ in dedupes:
+                scans.append(DuplicateScan())
+            for chunk in pd.read_csv(input_file, chunksize=chunksize, **read_csv_kwargs):
+                for step, scan in zip(dedupes, scans):
+                    scan.add(step.keys(chunk))
+            for step, scan in zip(dedupes, scans):
+                step.duplicates = scan.finish()
+        finally:
+            for scan in scans:
+                scan.close()
+
+    # Pass 2 - one read of the file feeds every pipeline
+    try:
+        for chunk in pd.read_csv(input_file, chunksize=chunksize, **read_csv_kwargs):
+            for p in pipelines:
+                p.process(chunk)
+    finally:
+        for p in pipelines:
+            p.close()
+
+    return {p.output_file: p.report() for p in pipelines}
+
+
+if __name__ == "__main__":
+    reports = run_pipelines('Data/retail_sales_final.csv', {
+        'Data/retail_sales_clean.csv': [('dedupe', {}), ('dropna', {}), ('rename', {'normalise': True})],
+        'Data/retail_sales_filled.csv': [('fill', {'column': 'Sales', 'value': 'mean'}),
+                                         ('fill', {'column': 'Profit', 'value': 0}),
+                                         ('fill', {'column': 'Country', 'value': 'Unknown'})],
+    }, chunksize=5)
+    for output_file, report in reports.items():
+        print(output_file, report['rows_in'], '->', report['rows_out'], report['steps'])
+
+    # A dedupe after other steps would be judged on rows it never sees, so it's refused up front
+    try:
+        run_pipelines('Data/retail_sales_final.csv', {'unused.csv': [('dropna', {}), ('dedupe', {})]})
+    except ValueError as e:
+        print("Refused:", e)
+    else:
+        raise AssertionError("a dedupe step that isn't first should be rejected")
@@ -0,0 +1,367 @@
+# CUSTOMER SEGMENTATION (K-MEANS) ----------------------------------------------------------------------
+# Mini-batch k-means that scales from Mall_Customers' 200 rows to tens of millions:
+#
+#   model = MiniBatchKMeans(5, random_state=42).fit(X)        # X: rows x features, standardised
+#   model.labels_, model.cluster_centers_, model.inertia_
+#   model.predict(new_rows)
+#
+#   stream = MiniBatchKMeans(5, random_state=42)
+#   stream.partial_fit(chunk)                                 # for each chunk, e.g. from read_csv
+#
+#   scores = evaluate_k(X, range(2, 11))                      # inertia and sampled silhouette per k
+#   k = elbow(scores)
+#
+#   - Seeding is k-means++ (with a few candidates per centre, as sklearn does) on init_size rows.
+#   - Each step moves the centres towards the mean of a random batch_size rows, weighted by how many
+#     rows each centre has taken so far; a centre that hardly gets any is moved onto a badly-fitted
+#     row. A run stops when the smoothed batch inertia hasn't improved for a few steps. Data no bigger
+#     than one batch gets ordinary (Lloyd) k-means steps instead.
+#   - Distances are ||x||² - 2x·c + ||c||² in float32, a block of rows at a time, so nothing bigger
+#     than block x k is ever held - standardise X first, float32 is only accurate for modest norms.
+#   - The n_init restarts run in a process pool over one shared-memory copy of X; they're compared
+#     on the same sample of rows, and only the winner labels the full data.
+#   - Silhouette is computed on a sample: sample x sample distances, again in blocks, instead of the
+#     n x n matrix.
+# ------------------------------------------------------------------------------------------------------
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sweep import _attach, _share
+from tracing import span
+
+BATCH_SIZE = 1024
+BLOCK_ROWS = 65_536
+EVAL_ROWS = 100_000
+SILHOUETTE_SAMPLE = 5000
+MAX_NO_IMPROVEMENT = 10
+EWA_WINDOW = 10                  # batches averaged in the smoothed inertia
+REASSIGN_EVERY = 10
+
+
+# Distances --------------------------------------------------------------------------------------------
+def _sq_norms(X):
+    return np.einsum('ij,ij->i', X, X)
+
+
+def _sq_distances(X, centres, centre_norms):
+    d = X @ centres.T
+    d *= -2
+    d += centre_norms
+    d += _sq_norms(X)[:, None]
+    return np.maximum(d, 0, out=d)
+
+
+def assign(X, centres, block=BLOCK_ROWS):
+    # (nearest centre, squared distance to it) for every row
+    centres = np.asarray(centres, dtype=np.float32)
+    centre_norms = _sq_norms(centres)
+    labels = np.empty(len(X), dtype=np.intp)
+    distances = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), block):
+        d = _sq_distances(np.asarray(X[start:start + block], dtype=np.float32), centres, centre_norms)
+        labels[start:start + len(d)] = d.argmin(axis=1)
+        distances[start:start + len(d)] = d[np.arange(len(d)), labels[start:start + len(d)]]
+    return labels, distances
+
+
+def kmeans_plusplus(X, k, rng, trials=None):
+    # Each new centre is the best of a few rows drawn with probability ∝ squared distance
+    X = np.asarray(X, dtype=np.float32)
+    if len(X) < k:
+        raise ValueError(f"Need at least {k} rows to seed {k} clusters, got {len(X)}")
+    trials = trials or 2 + int(np.log(k))
+    norms = _sq_norms(X)
+    centres = np.empty((k, X.shape[1]), dtype=np.float32)
+    centres[0] = X[rng.integers(len(X))]
+    closest = _sq_distances(X, centres[:1], _sq_norms(centres[:1]))[:, 0]
+    for i in range(1, k):
+        weights = np.cumsum(closest, dtype=np.float64)
+        if weights[-1] > 0:
+            candidates = np.minimum(np.searchsorted(weights, rng.random(trials) * weights[-1]), len(X) - 1)
+        else:
+            candidates = rng.integers(len(X), size=trials)         # every row already sits on a centre
+        d = _sq_distances(X, X[candidates], norms[candidates])
+        np.minimum(d, closest[:, None], out=d)
+        best = d.sum(axis=0, dtype=np.float64).argmin()
+        centres[i] = X[candidates[best]]
+        closest = d[:, best]
+    return centres
+
+
+# Model ------------------------------------------------------------------------------------------------
+class MiniBatchKMeans:
+    def __init__(self, n_clusters=8, batch_size=BATCH_SIZE, max_iter=100, n_init=3, init_size=None, tol=1e-4,
+                 reassignment_ratio=0.01, random_state=None, n_jobs=None):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.max_iter = max_iter                    # passes over the data, at most
+        self.n_init = n_init
+        self.init_size = init_size or 3 * batch_size
+        self.tol = tol
+        self.reassignment_ratio = reassignment_ratio
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def _params(self):
+        return {name: getattr(self, name) for name in ('n_clusters', 'batch_size', 'max_iter', 'n_init',
+                                                       'init_size', 'tol', 'reassignment_ratio')}
+
+    # Steps --------------------------------------------------------------------------------------------
+    def _start(self, X, rng):
+        sample = X if len(X) <= self.init_size else X[np.sort(rng.choice(len(X), self.init_size, replace=False))]
+        self.cluster_centers_ = kmeans_plusplus(sample, self.n_clusters, rng).astype(np.float64)
+        self.counts_ = np.zeros(self.n_clusters, dtype=np.int64)
+        self.n_steps_ = 0
+        self._rng = rng
+        # Centre moves are judged against the spread of the data
+        self._tol = self.tol * float(np.asarray(sample, dtype=np.float64).var(axis=0).mean())
+
+    def _step(self, batch, lloyd=False):
+        # One update from a batch; returns (batch inertia, squared centre shift)
+        k = self.n_clusters
+        labels, distances = assign(batch, self.cluster_centers_)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.column_stack([np.bincount(labels, weights=batch[:, j], minlength=k)
+                                for j in range(batch.shape[1])])
+        hit = counts > 0
+        centres = self.cluster_centers_.copy()
+        if lloyd:
+            centres[hit] = sums[hit] / counts[hit, None]
+            self.counts_ = counts.astype(np.int64)
+        else:
+            total = self.counts_ + counts
+            centres[hit] = (centres[hit] * self.counts_[hit, None] + sums[hit]) / total[hit, None]
+            self.counts_ = total
+        shift = float(((centres - self.cluster_centers_) ** 2).sum())
+        self.cluster_centers_ = centres
+        self.n_steps_ += 1
+
+        if not lloyd and self.n_steps_ % REASSIGN_EVERY == 0:
+            self._reassign(batch, distances)
+        return float(distances.sum(dtype=np.float64)), shift
+
+    def _reassign(self, batch, distances):
+        # Centres that have taken almost no rows restart on rows the model fits badly
+        low = self.counts_ < self.reassignment_ratio * self.counts_.max()
+        n_low = int(low.sum())
+        if not n_low or n_low == self.n_clusters:
+            return
+        p = distances.astype(np.float64) / distances.sum(dtype=np.float64) if distances.sum() > 0 else None
+        rows = self._rng.choice(len(batch), size=min(n_low, len(batch)), replace=False, p=p)
+        low_ids = np.flatnonzero(low)[:len(rows)]
+        self.cluster_centers_[low_ids] = batch[rows]
+        self.counts_[low_ids] = self.counts_[~low].min()
+
+    def _run(self, X, rng):
+        # One restart: seed, then steps until the smoothed inertia stops improving
+        self._start(X, rng)
+        n = len(X)
+        if n <= self.batch_size:
+            for _ in range(self.max_iter):
+                _, shift = self._step(X, lloyd=True)
+                if shift <= self._tol:
+                    break
+            return self
+
+        alpha = 2 / (EWA_WINDOW + 1)
+        smoothed, best, stale = None, np.inf, 0
+        for _ in range(self.max_iter * -(-n // self.batch_size)):
+            batch = X[rng.integers(n, size=self.batch_size)]
+            inertia, shift = self._step(batch)
+            inertia /= self.batch_size
+            smoothed = inertia if smoothed is None else (1 - alpha) * smoothed + alpha * inertia
+            if shift <= self._tol:
+                break
+            if smoothed < best:
+                best, stale = smoothed, 0
+            else:
+                stale += 1
+                if stale >= MAX_NO_IMPROVEMENT:
+                    break
+        return self
+
+    # Fitting ------------------------------------------------------------------------------------------
+    def fit(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n = len(X)
+        seeds = np.random.SeedSequence(self.random_state).spawn(self.n_init + 1)
+        # Restarts are compared on the same rows; below EVAL_ROWS that's all of them
+        evaluation = None if n <= EVAL_ROWS else np.sort(np.random.default_rng(seeds[0]).choice(n, EVAL_ROWS, replace=False))
+        workers = min(self.n_jobs or os.cpu_count() or 1, self.n_init)
+
+        with span('kmeans', k=self.n_clusters, rows=n, restarts=self.n_init):
+            if workers == 1:
+                runs = [_restart(X, self._params(), seed, evaluation) for seed in seeds[1:]]
+            else:
+                shm, spec = _share(X)
+                try:
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+                        runs = list(pool.map(_restart_worker, [self._params()] * self.n_init, seeds[1:],
+                                             [evaluation] * self.n_init))
+                finally:
+                    shm.close()
+                    shm.unlink()
+
+            centres, counts, steps, _ = min(runs, key=lambda run: run[3])
+            self.cluster_centers_, self.counts_, self.n_steps_ = centres, counts, steps
+            self._rng = np.random.default_rng(seeds[0])
+            self.labels_, distances = assign(X, centres)
+            self.inertia_ = float(distances.sum(dtype=np.float64))
+        return self
+
+    def partial_fit(self, X):
+        # One step on a chunk; the first chunk also seeds the centres
+        X = np.asarray(X, dtype=np.float32)
+        if not hasattr(self, 'cluster_centers_'):
+            self._start(X, np.random.default_rng(self.random_state))
+        self._step(X)
+        return self
+
+    # Using --------------------------------------------------------------------------------------------
+    def predict(self, X):
+        return assign(X, self.cluster_centers_)[0]
+
+    def inertia(self, X):
+        return float(assign(X, self.cluster_centers_)[1].sum(dtype=np.float64))
+
+    def score(self, X):
+        return -self.inertia(X)
+
+
+def _restart(X, params, seed, evaluation):
+    # (centres, counts, steps, inertia on the evaluation rows) - module-level for worker processes
+    model = MiniBatchKMeans(**params)._run(X, np.random.default_rng(seed))
+    rows = X if evaluation is None else X[evaluation]
+    return model.cluster_centers_, model.counts_, model.n_steps_, model.inertia(rows)
+
+
+_worker = {}
+
+
+def _init_worker(spec):
+    _worker['shm'], _worker['X'] = _attach(spec)
+
+
+def _restart_worker(params, seed, evaluation):
+    return _restart(_worker['X'], params, seed, evaluation)
+
+
+# Choosing k -------------------------------------------------------------------------------------------
+def silhouette(X, labels, sample_size=SILHOUETTE_SAMPLE, random_state=None, block=1024):
+    # Mean silhouette over a sample of rows (all of them when there are fewer than sample_size)
+    X = np.asarray(X, dtype=np.float32)
+    labels = np.asarray(labels)
+    if len(X) > sample_size:
+        rows = np.random.default_rng(random_state).choice(len(X), sample_size, replace=False)
+        X, labels = X[rows], labels[rows]
+    clusters, labels = np.unique(labels, return_inverse=True)
+    if len(clusters) < 2:
+        return np.nan
+    members = np.bincount(labels).astype(np.float64)
+    onehot = np.zeros((len(X), len(clusters)), dtype=np.float32)
+    onehot[np.arange(len(X)), labels] = 1
+    norms = _sq_norms(X)
+
+    scores = np.empty(len(X))
+    for start in range(0, len(X), block):
+        stop = min(start + block, len(X))
+        d = np.sqrt(_sq_distances(X[start:stop], X, norms))
+        d[np.arange(stop - start), np.arange(start, stop)] = 0          # exactly, despite float32
+        sums = (d @ onehot).astype(np.float64)                          # rows x clusters
+        own = labels[start:stop]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = sums[np.arange(len(own)), own] / (members[own] - 1)
+            sums /= members
+            sums[np.arange(len(own)), own] = np.inf
+            b = sums.min(axis=1)
+            s = (b - a) / np.maximum(a, b)
+        s[members[own] == 1] = 0                                        # singletons score 0, as in sklearn
+        scores[start:stop] = s
+    return float(scores.mean())
+
+
+def evaluate_k(X, ks, sample_size=SILHOUETTE_SAMPLE, random_state=42, **kmeans_options):
+    # One fit per k: inertia over all rows, silhouette over a sample
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    rows = []
+    for k in ks:
+        model = MiniBatchKMeans(k, random_state=random_state, **kmeans_options).fit(X)
+        rows.append({'k': k, 'inertia': model.inertia_,
+                     'silhouette': silhouette(X, model.labels_, sample_size, random_state)})
+    return pd.DataFrame(rows)
+
+
+def elbow(scores):
+    # The k whose (k, inertia) point lies furthest below the line from the first k to the last
+    k = scores['k'].to_numpy(dtype=np.float64)
+    inertia = scores['inertia'].to_numpy(dtype=np.float64)
+    x = (k - k[0]) / (k[-1] - k[0])
+    y = (inertia - inertia[-1]) / (inertia[0] - inertia[-1])
+    return int(scores['k'].iloc[np.argmax((1 - x) - y)])
+
+
+# Mall_Customers segments, checked against sklearn, then a large synthetic population -------------------
+if __name__ == "__main__":
+    import time
+
+    from sklearn.cluster import KMeans
+    from sklearn.cluster import MiniBatchKMeans as SklearnMiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
+    import datasets
+
+    pd.set_option('display.width', 150)
+    features = ['Age', 'Annual Income (k$)', 'Spending Score (1-100)']
+    mall = datasets.load('mall_customers')
+    raw = mall[features].to_numpy(dtype=np.float64)
+    mean, std = raw.mean(axis=0), raw.std(axis=0)
+    X = (raw - mean) / std
+
+    scores = evaluate_k(X, range(2, 11), n_init=10)
+    for row in scores.itertuples():
+        labels = MiniBatchKMeans(row.k, n_init=10, random_state=42).fit(X).labels_
+        assert np.isclose(row.silhouette, silhouette_score(X, labels), atol=1e-5)
+    reference = {k: KMeans(k, n_init=10, random_state=42).fit(X).inertia_ for k in scores['k']}
+    scores['sklearn KMeans inertia'] = scores['k'].map(reference)
+    print("Mall_Customers, standardised age / income / spending score "
+          "(silhouette matches sklearn's silhouette_score):")
+    print(scores.round(3).to_string(index=False))
+
+    k = int(scores.loc[scores['silhouette'].idxmax(), 'k'])
+    print(f"\nElbow at k={elbow(scores)}, best silhouette at k={k}")
+    model = MiniBatchKMeans(k, n_init=10, random_state=42).fit(X)
+    segments = mall[features].assign(segment=model.labels_).groupby('segment')
+    profile = segments.mean().round(1).assign(customers=segments.size())
+    print(profile.sort_values('Annual Income (k$)').to_string())
+
+    # Tens of millions of customers drawn around the Mall_Customers segments
+    n = 20_000_000
+    rng = np.random.default_rng(0)
+    big = X[rng.integers(len(X), size=n)].astype(np.float32)
+    big += rng.normal(scale=0.15, size=big.shape).astype(np.float32)
+    start = time.perf_counter()
+    model = MiniBatchKMeans(k, n_init=3, random_state=42).fit(big)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    sampled = silhouette(big, model.labels_, random_state=0)
+    silhouette_time = time.perf_counter() - start
+    centres = model.cluster_centers_ * std + mean
+    print(f"\n{n:,} rows: fit in {fit_time:.1f}s ({model.n_steps_} steps), inertia per row "
+          f"{model.inertia_ / n:.3f}; silhouette on {SILHOUETTE_SAMPLE:,} rows {sampled:.3f} in {silhouette_time:.2f}s")
+    print("Centres (age, income, score):", np.round(centres[np.argsort(centres[:, 1])], 1).tolist())
+
+    # Streaming: the same population a million rows at a time
+    stream = MiniBatchKMeans(k, random_state=42)
+    start = time.perf_counter()
+    for chunk in range(0, n, 1_000_000):
+        stream.partial_fit(big[chunk:chunk + 1_000_000])
+    print(f"partial_fit over {n // 1_000_000} chunks: {time.perf_counter() - start:.1f}s, "
+          f"inertia per row {stream.inertia(big) / n:.3f}")
+
+    sample = big[:1_000_000]
+    start = time.perf_counter()
+    SklearnMiniBatchKMeans(k, n_init=3, random_state=42).fit(sample)
+    print(f"(sklearn MiniBatchKMeans on 1,000,000 of the rows: {time.perf_counter() - start:.1f}s)")
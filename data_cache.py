@@ -0,0 +1,153 @@
+# COLUMNAR CSV CACHE -----------------------------------------------------------------------------------
+# The first read of a CSV parses it with pandas and saves every column as its own .npy file in a
+# .csv_cache folder next to the source. Later reads memory-map those files instead of parsing again.
+# The cache is rebuilt when the source changes: mtime/size are checked first (cheap), and if they
+# differ the SHA-256 of the file decides whether the contents really changed.
+# ------------------------------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR_NAME = '.csv_cache'
+CACHE_VERSION = 1
+
+
+# Helpers ----------------------------------------------------------------------------------------------
+def _file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_dir(path, read_csv_kwargs):
+    # Different read_csv options give different frames, so they get their own cache entry
+    key = os.path.basename(path)
+    if read_csv_kwargs:
+        options = repr(sorted(read_csv_kwargs.items())).encode()
+        key += '-' + hashlib.sha1(options).hexdigest()[:10]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME, key)
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+def _write_meta(cache_dir, meta):
+    tmp = os.path.join(cache_dir, 'meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, 'meta.json'))
+
+
+def _is_fresh(path, cache_dir, meta):
+    st = os.stat(path)
+    if meta['mtime_ns'] == st.st_mtime_ns and meta['size'] == st.st_size:
+        return True
+    if meta['size'] != st.st_size or meta['sha256'] != _file_hash(path):
+        return False
+    # Touched but not changed - remember the new mtime so we skip hashing next time
+    meta['mtime_ns'] = st.st_mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+# Build ------------------------------------------------------------------------------------------------
+def _build(path, cache_dir, read_csv_kwargs):
+    df = pd.read_csv(path, **read_csv_kwargs)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        values = df[name].to_numpy()
+        entry = {'name': name, 'file': f'{i}.npy', 'mask': None, 'kind': values.dtype.kind}
+
+        if values.dtype == object:
+            # Strings are stored fixed-width so they can still be memory-mapped; NaNs go in a mask
+            mask = pd.isna(values)
+            values = np.where(mask, '', values).astype(str)
+            if mask.any():
+                entry['mask'] = f'{i}.mask.npy'
+                np.save(os.path.join(cache_dir, entry['mask']), mask)
+
+        np.save(os.path.join(cache_dir, entry['file']), np.ascontiguousarray(values))
+        columns.append(entry)
+
+    st = os.stat(path)
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(path),
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'sha256': _file_hash(path),
+        'rows': len(df),
+        'columns': columns,
+    }
+    # meta.json is written last, so a half-built cache is never picked up
+    _write_meta(cache_dir, meta)
+    return meta
+
+
+# Load -------------------------------------------------------------------------------------------------
+def _load_column(cache_dir, entry, mmap):
+    values = np.load(os.path.join(cache_dir, entry['file']), mmap_mode='c' if mmap else None)
+    if entry['kind'] != 'O':
+        # Plain ndarray view over the mapped file - no copy
+        return values.view(np.ndarray)
+
+    # Strings have to become Python objects for pandas, so this is the one column type that copies
+    values = values.astype(object)
+    if entry['mask']:
+        values[np.load(os.path.join(cache_dir, entry['mask']))] = np.nan
+    return values
+
+
+def read_columns_cached(path, columns=None, mmap=True, rebuild=False, **read_csv_kwargs):
+    # {column name: array} - only the requested columns are loaded from the cache
+    cache_dir = _cache_dir(path, read_csv_kwargs)
+
+    meta = None if rebuild else _read_meta(cache_dir)
+    if meta is None or not _is_fresh(path, cache_dir, meta):
+        meta = _build(path, cache_dir, read_csv_kwargs)
+
+    entries = {entry['name']: entry for entry in meta['columns']}
+    if columns is None:
+        columns = [entry['name'] for entry in meta['columns']]
+    return {name: _load_column(cache_dir, entries[name], mmap) for name in columns}
+
+
+def read_csv_cached(path, columns=None, mmap=True, rebuild=False, **read_csv_kwargs):
+    data = read_columns_cached(path, columns, mmap, rebuild, **read_csv_kwargs)
+    return pd.DataFrame(data, columns=list(data), copy=False)
+
+
+def clear_cache(path):
+    shutil.rmtree(os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import time
+
+    for name in ['Data/Global-Power-Plant.csv', 'Data/london_bike_sharing.csv']:
+        start = time.perf_counter()
+        pd.read_csv(name)
+        parse_time = time.perf_counter() - start
+
+        read_csv_cached(name)
+        start = time.perf_counter()
+        read_csv_cached(name)
+        cached_time = time.perf_counter() - start
+
+        print(f"{name}: read_csv {parse_time * 1000:.1f} ms, cached {cached_time * 1000:.1f} ms")
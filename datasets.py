@@ -0,0 +1,227 @@
+# DATASET REGISTRY -------------------------------------------------------------------------------------
+# Every dataset the Week scripts use, by name, with its one canonical file in Data/ and its schema:
+#
+#   df = datasets.load('social_ads', columns=['Age', 'EstimatedSalary', 'Purchased'])
+#
+# Columns come back with the compact dtypes recorded here (smallest int that fits, float32 where
+# that's exact, category for repeated strings, datetime64 for the time-series stamps) instead of
+# int64/float64/object, and only the requested columns are loaded. Files go through data_cache, so after the first parse each column is
+# memory-mapped from its own .npy file.
+#
+# Within a process every column is loaded once and then shared: load() hands out a new DataFrame
+# over the same arrays each time. Adding or replacing columns on it is fine, but the numeric and
+# category values are read-only, so writing into them (df.loc[...] = ...) raises - take a .copy()
+# first if you need to.
+# ------------------------------------------------------------------------------------------------------
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_cache import read_columns_cached
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data')
+
+# Floats stay float64 where float32 can't hold the values exactly or would change printed statistics
+DATASETS = {
+    'user_behavior': {
+        'file': 'user_behavior_dataset.csv',
+        'dtypes': {
+            'User_ID': 'int16',
+            'Device_Model': 'category',
+            'Operating_System': 'category',
+            'App_Usage_Time': 'int16',
+            'Screen_On_Time': 'float64',
+            'Battery_Drain': 'int16',
+            'Number_of_Apps_Installed': 'int8',
+            'Data_Usage': 'int16',
+            'Age': 'int8',
+            'Gender': 'category',
+            'User_Behavior_Class': 'int8',
+        },
+    },
+    'retail_sales': {
+        'file': 'retail_sales_final.csv',
+        'dtypes': {
+            'Name': 'object',
+            'Email': 'object',
+            'Country': 'category',
+            'Job Title': 'category',
+            'Sales': 'float64',         # summarised in float64 by Week3
+            'Profit': 'float64',
+        },
+    },
+    'usa_housing': {
+        'file': 'USA_Housing.csv',
+        'dtypes': {
+            'Avg. Area Income': 'float64',
+            'Avg. Area House Age': 'float64',
+            'Avg. Area Number of Rooms': 'float64',
+            'Avg. Area Number of Bedrooms': 'float64',
+            'Area Population': 'float64',
+            'Price': 'float64',
+            'Address': 'object',
+        },
+    },
+    'salary': {
+        'file': 'salary_data.csv',
+        'dtypes': {'YearsExperience': 'float64', 'Salary': 'float32'},
+    },
+    'social_ads': {
+        'file': 'social_ads.csv',
+        'dtypes': {
+            'User ID': 'int32',
+            'Gender': 'category',
+            'Age': 'int8',
+            'EstimatedSalary': 'int32',
+            'Purchased': 'int8',
+        },
+    },
+    'cars': {
+        'file': 'cars.csv',
+        'dtypes': {'Car': 'category', 'Model': 'object', 'Volume': 'int16', 'Weight': 'int16', 'CO2': 'int16'},
+    },
+    'pima': {
+        # No header row - columns are numbered
+        'file': 'pima_indians_diabetes_2.csv',
+        'read_csv': {'header': None},
+        'dtypes': {0: 'int8', 1: 'float32', 2: 'float32', 3: 'int8', 4: 'float32',
+                   5: 'float64', 6: 'float64', 7: 'float32', 8: 'int8'},
+    },
+    'temperature': {
+        'file': 'temperature.csv',
+        'dtypes': {
+            'Rec-No': 'int8',
+            'Temperature': pd.CategoricalDtype(['Cold', 'Warm', 'Hot', 'Very hot'], ordered=True),
+            'Color': 'category',
+            'Target': 'int8',
+        },
+    },
+    'bike_sharing': {
+        # Hourly, with a few gaps
+        'file': 'london_bike_sharing.csv',
+        'dates': {'timestamp': '%Y-%m-%d %H:%M:%S'},
+        'dtypes': {'timestamp': 'datetime64[ns]', 'cnt': 'int16', 't1': 'float64', 't2': 'float64',
+                   'hum': 'float32', 'wind_speed': 'float64', 'weather_code': 'float32',
+                   'is_holiday': 'float32', 'is_weekend': 'float32', 'season': 'float32'},
+    },
+    'min_temperatures': {
+        'file': 'daily-minimum-temperatures.csv',
+        'dates': {'Date': '%Y-%m-%d'},
+        'dtypes': {'Date': 'datetime64[ns]', 'Temp': 'float64'},
+    },
+    'stock': {
+        # Trading days only
+        'file': 'stock_data.csv',
+        'dates': {'Date': '%m/%d/%Y'},
+        'dtypes': {'Date': 'datetime64[ns]', 'Open': 'float64', 'High': 'float64', 'Low': 'float64',
+                   'Close': 'float64', 'Volume': 'int32', 'Name': 'category'},
+    },
+    'air_passengers': {
+        'file': 'AirPassengers.csv',
+        'dates': {'Month': '%Y-%m'},
+        'dtypes': {'Month': 'datetime64[ns]', '#Passengers': 'int16'},
+    },
+    'power_plants': {
+        'file': 'Global-Power-Plant.csv',
+        'dtypes': {'Country': 'category', 'Powerplant Name': 'object', 'gppd_idnr': 'object',
+                   'Capacity (MW)': 'float64', 'Latitude': 'float64', 'Longitude': 'float64',
+                   'Primary Fuel': 'category', 'Owner': 'object', 'Source': 'category'},
+    },
+    'mall_customers': {
+        'file': 'Mall_Customers.csv',
+        'dtypes': {'CustomerID': 'int16', 'Genre': 'category', 'Age': 'int8', 'Annual Income (k$)': 'int16',
+                   'Spending Score (1-100)': 'int8'},
+    },
+    'iris': {
+        # No header row either - names as listed in iris_names.csv
+        'file': 'iris_data.csv',
+        'read_csv': {'header': None,
+                     'names': ['sepal_length', 'sepal_width', 'petal_length', 'petal_width', 'iris_class']},
+        'dtypes': {'sepal_length': 'float64', 'sepal_width': 'float64', 'petal_length': 'float64',
+                   'petal_width': 'float64', 'iris_class': 'category'},
+    },
+}
+
+_loaded = {}        # (dataset, column) -> array / Categorical
+
+
+def path(name):
+    return os.path.join(DATA_DIR, DATASETS[name]['file'])
+
+
+def schema(name):
+    return dict(DATASETS[name]['dtypes'])
+
+
+def _is_category(dtype):
+    return isinstance(dtype, pd.CategoricalDtype) or dtype == 'category'
+
+
+def _read_options(spec):
+    # Numeric dtypes are applied by the parser, so they're what the column cache stores.
+    # Same options every time, whichever columns are asked for, so every load shares one cache entry.
+    numeric = {col: dtype for col, dtype in spec['dtypes'].items()
+               if not _is_category(dtype) and dtype not in ('object', 'datetime64[ns]')}
+    return {**spec.get('read_csv', {}), 'dtype': numeric}
+
+
+def _read_only(values, dtype, date_format=None):
+    if dtype == 'datetime64[ns]':
+        values = pd.to_datetime(values, format=date_format).to_numpy()
+        values.flags.writeable = False
+        return values
+    if _is_category(dtype):
+        categorical = pd.Categorical(values, dtype=dtype if isinstance(dtype, pd.CategoricalDtype) else None)
+        codes = np.array(categorical.codes)
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, dtype=categorical.dtype)
+    values = np.asarray(values)
+    if values.dtype != object:
+        # Object columns stay writable - pandas' object routines (memory_usage, str ops) need that
+        values.flags.writeable = False
+    return values
+
+
+def load(name, columns=None):
+    spec = DATASETS[name]
+    columns = list(spec['dtypes']) if columns is None else list(columns)
+    unknown = [col for col in columns if col not in spec['dtypes']]
+    if unknown:
+        raise KeyError(f"{unknown} not in the {name!r} schema (columns: {list(spec['dtypes'])})")
+
+    missing = [col for col in columns if (name, col) not in _loaded]
+    if missing:
+        for col, values in read_columns_cached(path(name), missing, **_read_options(spec)).items():
+            _loaded[name, col] = _read_only(values, spec['dtypes'][col], spec.get('dates', {}).get(col))
+
+    return pd.DataFrame({col: _loaded[name, col] for col in columns}, columns=columns, copy=False)
+
+
+def clear():
+    _loaded.clear()
+
+
+# Memory and time against plain read_csv ---------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+
+    for name, columns in [('social_ads', ['Age', 'EstimatedSalary', 'Purchased']),
+                          ('user_behavior', None), ('usa_housing', None)]:
+        start = time.perf_counter()
+        full = pd.read_csv(path(name), **DATASETS[name].get('read_csv', {}))
+        read_time = time.perf_counter() - start
+
+        load(name, columns)                               # first load fills the cache
+        clear()
+        start = time.perf_counter()
+        df = load(name, columns)
+        load_time = time.perf_counter() - start
+        start = time.perf_counter()
+        load(name, columns)
+        shared_time = time.perf_counter() - start
+
+        full_mb = full.memory_usage(deep=True).sum() / 1e6
+        df_mb = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{name}: read_csv {read_time * 1000:.1f} ms / {full_mb:.2f} MB, "
+              f"load {load_time * 1000:.1f} ms / {df_mb:.2f} MB, shared {shared_time * 1000:.2f} ms")
@@ -1,37 +1,108 @@
 import csv
+import time
 
-def fix_csv(input_file, output_file):
-    fixed_rows = []
-
-    with open(input_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    # First line is header
-    header = lines[0].strip()
-    fixed_rows.append(header.split(','))
-
-    # Now process every two lines at a time
-    i = 1
-    while i < len(lines):
-        # Join line i and line i+1 (assuming they form one row)
-        if i + 1 < len(lines):
-            combined = lines[i].strip() + ' ' + lines[i+1].strip()
-            i += 2
-        else:
-            # In case there's an odd line left at the end
-            combined = lines[i].strip()
-            i += 1
-
-        # Use CSV reader to parse the line correctly
-        for row in csv.reader([combined]):
-            fixed_rows.append(row)
-
-    # Write to new clean CSV
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerows(fixed_rows)
+from tracing import annotate, traced
+
+# Safety limit so a stray unbalanced quote can't swallow the rest of the file
+MAX_LINES_PER_RECORD = 1000
+
+
+def _parse(parts):
+    # Join the physical lines of one record and let the CSV reader split it
+    combined = ' '.join(parts)
+    return next(csv.reader([combined]), [])
+
+
+@traced('fix_csv')
+def fix_csv(input_file, output_file, progress_every=1_000_000):
+    rows = 0
+    bytes_read = 0
+    start = time.perf_counter()
+
+    # Read and write in one pass - only the current record is held in memory
+    with open(input_file, 'rb') as f_in, open(output_file, 'w', newline='', encoding='utf-8') as f_out:
+        writer = csv.writer(f_out)
+
+        # First line is header - its field count tells us when a record is complete
+        raw = f_in.readline()
+        bytes_read += len(raw)
+        header = next(csv.reader([raw.decode('utf-8-sig').strip()]))
+        n_fields = len(header)
+        writer.writerow(header)
+
+        parts = []
+        quotes = 0
+        for raw in f_in:
+            bytes_read += len(raw)
+            line = raw.decode('utf-8').strip()
+            # Blank lines between records are dropped, not glued onto the next record
+            if not line and not parts:
+                continue
+            parts.append(line)
+            quotes += line.count('"')
+
+            # Odd number of quotes means we're still inside a quoted field
+            if quotes % 2 and len(parts) < MAX_LINES_PER_RECORD:
+                continue
+
+            row = _parse(parts)
+            if len(row) < n_fields and len(parts) < MAX_LINES_PER_RECORD:
+                # Record broken outside of quotes - keep reading
+                continue
+
+            if len(row) > n_fields and len(parts) > 1:
+                # The last line belongs to the next record, so flush what came before it
+                writer.writerow(_parse(parts[:-1]))
+                rows += 1
+                parts = [line]
+                quotes = line.count('"')
+                if quotes % 2:
+                    continue
+                row = _parse(parts)
+                if len(row) < n_fields:
+                    continue
+
+            writer.writerow(row)
+            rows += 1
+            parts = []
+            quotes = 0
+
+            if progress_every and rows % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {rows:,} rows, {bytes_read / 1e6:,.1f} MB ({rows / elapsed:,.0f} rows/sec)")
+
+        # In case there's an incomplete record left at the end
+        if parts:
+            writer.writerow(_parse(parts))
+            rows += 1
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'bytes': bytes_read,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'bytes_per_sec': bytes_read / elapsed if elapsed else 0.0,
+    }
+    annotate(rows=rows, bytes=bytes_read)
 
     print(f"✅ Fixed CSV saved as: {output_file}")
+    print(f"   {rows:,} rows, {bytes_read / 1e6:,.1f} MB in {elapsed:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec, {stats['bytes_per_sec'] / 1e6:,.1f} MB/sec)")
+    return stats
+
 
 if __name__ == "__main__":
+    import os
+    import tempfile
+
+    # Blank lines between records and at the end don't turn into rows
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, 'in.csv'), os.path.join(tmp, 'out.csv')
+        with open(src, 'w') as f:
+            f.write('a,b,c\n1,2,3\n\n  \n4,5,6\n\n')
+        assert fix_csv(src, dst)['rows'] == 2
+        with open(dst, newline='') as f:
+            assert list(csv.reader(f)) == [['a', 'b', 'c'], ['1', '2', '3'], ['4', '5', '6']]
+
     fix_csv('Data/USA_Housing.csv', 'Data/FIXED_USA_Housing.csv')
@@ -0,0 +1,254 @@
+# POWER PLANT SPATIAL INDEX ----------------------------------------------------------------------------
+# Nearest / radius / bounding-box queries over Data/Global-Power-Plant.csv (~30k plants):
+#
+#   index = PlantIndex.load()
+#   index.within(51.5, -0.13, 50)                  # plants within 50 km of London (row positions)
+#   index.nearest(51.5, -0.13, k=5)                # (km, rows) of the 5 closest
+#   index.capacity_in_box(35, 60, -10, 30)         # MW per fuel inside lat 35-60, lon -10-30
+#
+# Distance queries go through a haversine BallTree. Bounding boxes use a 1° grid: plants are sorted
+# by grid cell, and each fuel has a summed-area table of capacity, so the cells wholly inside a box
+# cost four lookups per fuel whatever their size. Only plants in the cells along the box's edges are
+# tested one by one. Boxes whose lon_min > lon_max wrap across the 180° meridian.
+#
+# The built index is pickled to .geo_cache/ next to the CSV and reused until the CSV changes (same
+# mtime / size / SHA-256 check as data_cache) or cell_deg changes, so loading it doesn't re-read the
+# CSV or rebuild. Rows refer to datasets.load('power_plants'), or to the rows of another CSV with the
+# same Latitude / Longitude / Capacity (MW) / Primary Fuel columns given as PlantIndex.load(source=...).
+# ------------------------------------------------------------------------------------------------------
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+import datasets
+from data_cache import _file_hash
+
+CACHE_DIR_NAME = '.geo_cache'
+INDEX_VERSION = 1
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 1.0
+COLUMNS = ['Latitude', 'Longitude', 'Capacity (MW)', 'Primary Fuel']
+
+
+# Grid -------------------------------------------------------------------------------------------------
+def _cells(lat, lon, cell_deg):
+    rows, cols = int(round(180 / cell_deg)), int(round(360 / cell_deg))
+    r = np.minimum(((np.asarray(lat) + 90) // cell_deg).astype(np.intp), rows - 1)
+    c = np.minimum(((np.asarray(lon) + 180) // cell_deg).astype(np.intp), cols - 1)
+    return r, c
+
+
+class PlantIndex:
+    def __init__(self, lat, lon, capacity, fuel_codes, fuels, cell_deg=CELL_DEG):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.fuels = list(fuels)
+        self.cell_deg = cell_deg
+        self.tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric='haversine')
+
+        # Plants in row-major cell order, so a run of cells along a grid row is one slice
+        self.rows, self.cols = int(round(180 / cell_deg)), int(round(360 / cell_deg))
+        r, c = _cells(self.lat, self.lon, cell_deg)
+        cell = r * self.cols + c
+        self.order = np.argsort(cell, kind='stable')
+        self.cell_start = np.searchsorted(cell[self.order], np.arange(self.rows * self.cols + 1))
+        self.sorted_lat = self.lat[self.order]
+        self.sorted_lon = self.lon[self.order]
+        self.sorted_capacity = self.capacity[self.order]
+        self.sorted_fuel = np.asarray(fuel_codes, dtype=np.intp)[self.order]
+
+        # table[f, i, j] = capacity of fuel f in cells [0, i) x [0, j)
+        grid = np.zeros((len(self.fuels), self.rows, self.cols))
+        np.add.at(grid, (np.asarray(fuel_codes), r, c), self.capacity)
+        self.table = np.zeros((len(self.fuels), self.rows + 1, self.cols + 1))
+        self.table[:, 1:, 1:] = grid.cumsum(axis=1).cumsum(axis=2)
+
+    @classmethod
+    def from_frame(cls, plants, cell_deg=CELL_DEG):
+        fuel = plants['Primary Fuel'].astype('category').cat
+        return cls(plants['Latitude'], plants['Longitude'], plants['Capacity (MW)'], fuel.codes,
+                   fuel.categories, cell_deg)
+
+    @classmethod
+    def from_dataset(cls, cell_deg=CELL_DEG):
+        return cls.from_frame(datasets.load('power_plants', columns=COLUMNS), cell_deg)
+
+    @classmethod
+    def from_csv(cls, path, cell_deg=CELL_DEG):
+        return cls.from_frame(pd.read_csv(path, usecols=COLUMNS, dtype={'Primary Fuel': 'category'}), cell_deg)
+
+    # Persistence --------------------------------------------------------------------------------------
+    @classmethod
+    def load(cls, source=None, cache_dir=None, rebuild=False, cell_deg=CELL_DEG):
+        # The pickled index for the power-plant CSV (or source), built and saved first if missing or stale
+        registry = datasets.path('power_plants')
+        source = source or registry
+        cache_dir = cache_dir or os.path.join(os.path.dirname(source), CACHE_DIR_NAME)
+        cache_path = os.path.join(cache_dir, os.path.basename(source) + '.pkl')
+        st = os.stat(source)
+
+        if not rebuild and os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                meta, state = pickle.load(f)
+            if (meta['version'] == INDEX_VERSION and meta.get('cell_deg') == cell_deg and meta['size'] == st.st_size
+                    and (meta['mtime_ns'] == st.st_mtime_ns or meta['sha256'] == _file_hash(source))):
+                index = cls.__new__(cls)
+                index.__dict__.update(state)
+                return index
+
+        if os.path.abspath(source) == os.path.abspath(registry):
+            index = cls.from_dataset(cell_deg)
+        else:
+            index = cls.from_csv(source, cell_deg)
+        meta = {'version': INDEX_VERSION, 'cell_deg': cell_deg, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                'sha256': _file_hash(source)}
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = cache_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            # Attributes only, so the file doesn't depend on the module name this ran under
+            pickle.dump((meta, vars(index)), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+        return index
+
+    # Distance queries ---------------------------------------------------------------------------------
+    def within(self, lat, lon, km):
+        # Rows of the plants within km of a point; for arrays of points, one array of rows per point
+        points = np.radians(np.column_stack([np.ravel(lat), np.ravel(lon)]))
+        found = self.tree.query_radius(points, r=km / EARTH_RADIUS_KM)
+        return found[0] if np.ndim(lat) == 0 else found
+
+    def nearest(self, lat, lon, k=1):
+        # (distances in km, rows) of the k closest plants, nearest first
+        points = np.radians(np.column_stack([np.ravel(lat), np.ravel(lon)]))
+        distances, rows = self.tree.query(points, k=k)
+        distances *= EARTH_RADIUS_KM
+        return (distances[0], rows[0]) if np.ndim(lat) == 0 else (distances, rows)
+
+    # Bounding boxes -----------------------------------------------------------------------------------
+    def capacity_in_box(self, lat_min, lat_max, lon_min, lon_max):
+        # MW of each fuel (in self.fuels order) for plants with lat_min <= lat <= lat_max and lon
+        # between lon_min and lon_max
+        if lon_min > lon_max:
+            return (self.capacity_in_box(lat_min, lat_max, lon_min, 180.0)
+                    + self.capacity_in_box(lat_min, lat_max, -180.0, lon_max))
+        d = self.cell_deg
+        # Cells the box touches, and the ones it covers completely
+        r0, c0 = _cells(lat_min, lon_min, d)
+        r1, c1 = _cells(lat_max, lon_max, d)
+        i0, j0 = int(np.ceil((lat_min + 90) / d)), int(np.ceil((lon_min + 180) / d))
+        i1, j1 = int((lat_max + 90) // d), int((lon_max + 180) // d)
+        i1, j1 = min(i1, self.rows), min(j1, self.cols)
+
+        total = np.zeros(len(self.fuels))
+        if i0 < i1 and j0 < j1:
+            t = self.table
+            total += t[:, i1, j1] - t[:, i0, j1] - t[:, i1, j0] + t[:, i0, j0]
+        else:
+            i0 = i1 = j0 = j1 = None
+
+        # Plants in touched cells outside the covered block: whole grid-row runs above and below it,
+        # the cells to its left and right on the rows in between
+        rows = np.arange(r0, r1 + 1) * self.cols
+        if i0 is None:
+            starts, stops = rows + c0, rows + c1 + 1
+        else:
+            outer = (rows < i0 * self.cols) | (rows >= i1 * self.cols)
+            inner = rows[~outer]
+            starts = np.concatenate([rows[outer] + c0, inner + c0, inner + j1])
+            stops = np.concatenate([rows[outer] + c1 + 1, inner + j0, inner + c1 + 1])
+        starts, stops = self.cell_start[starts], self.cell_start[stops]
+        lengths = stops - starts
+        if lengths.sum():
+            # Concatenated ranges: starts[k], starts[k] + 1, ... for each run
+            offsets = np.cumsum(lengths) - lengths
+            edge = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+            lat, lon = self.sorted_lat[edge], self.sorted_lon[edge]
+            inside = edge[(lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)]
+            total += np.bincount(self.sorted_fuel[inside], weights=self.sorted_capacity[inside],
+                                 minlength=len(self.fuels))
+        return total
+
+
+# Check against brute force, then time the queries -----------------------------------------------------
+def _haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    index = PlantIndex.load(rebuild=True)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index = PlantIndex.load()
+    load_time = time.perf_counter() - start
+    print(f"{len(index.lat):,} plants: index built in {build_time * 1000:.0f} ms, loaded from disk in "
+          f"{load_time * 1000:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    queries = rng.integers(len(index.lat), size=200)
+    q_lat = index.lat[queries] + rng.normal(scale=2, size=200)
+    q_lon = index.lon[queries] + rng.normal(scale=2, size=200)
+    for lat, lon in zip(q_lat, q_lon):
+        km = _haversine_km(lat, lon, index.lat, index.lon)
+        assert set(index.within(lat, lon, 100)) == set(np.flatnonzero(km <= 100))
+        distances, rows = index.nearest(lat, lon, k=5)
+        assert np.allclose(distances, np.sort(km)[:5])
+
+    plants = datasets.load('power_plants', columns=COLUMNS)
+    boxes = [(35, 60, -10, 30), (-90, 90, -180, 180), (51.2, 51.8, -0.6, 0.3), (-10, 10, 170, -170),
+             (24.5, 49.5, -125, -66.9), (0, 0.5, 0, 0.5)]
+    boxes += [tuple(np.sort(rng.uniform(-60, 70, 2))) + tuple(np.sort(rng.uniform(-180, 180, 2))) for _ in range(200)]
+    lat, lon = plants['Latitude'], plants['Longitude']
+    for lat_min, lat_max, lon_min, lon_max in boxes:
+        in_lon = (lon >= lon_min) & (lon <= lon_max) if lon_min <= lon_max else (lon >= lon_min) | (lon <= lon_max)
+        inside = plants[(lat >= lat_min) & (lat <= lat_max) & in_lon]
+        expected = inside.groupby('Primary Fuel', observed=False)['Capacity (MW)'].sum().reindex(index.fuels)
+        assert np.allclose(index.capacity_in_box(lat_min, lat_max, lon_min, lon_max), expected)
+    print(f"within / nearest / capacity_in_box match brute force on {len(q_lat) + len(boxes)} queries")
+
+    # Another CSV, on a finer grid: built from that file, cached under its own name and cell size
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        subset = os.path.join(tmp, 'plants_uk.csv')
+        uk = plants[(lat > 49) & (lat < 61) & (lon > -11) & (lon < 2)]
+        uk.to_csv(subset, index=False)
+        for cell_deg in (0.5, 0.5, 0.25):
+            local = PlantIndex.load(source=subset, cell_deg=cell_deg)
+            assert len(local.lat) == len(uk) and local.cell_deg == cell_deg
+        expected = uk[uk['Latitude'] <= 52].groupby('Primary Fuel', observed=False)['Capacity (MW)'].sum()
+        assert np.allclose(local.capacity_in_box(-90, 52, -180, 180), expected.reindex(local.fuels).fillna(0))
+    print(f"source=: {len(uk):,} UK plants indexed from their own CSV at cell_deg 0.5 and 0.25")
+
+    europe = index.capacity_in_box(35, 60, -10, 30)
+    print("\nCapacity (GW) in lat 35-60, lon -10-30:")
+    for fuel, mw in sorted(zip(index.fuels, europe), key=lambda x: -x[1])[:6]:
+        print(f"  {fuel:<10} {mw / 1000:8.1f}")
+
+    timings = {
+        'within 50 km': lambda i: index.within(q_lat[i], q_lon[i], 50),
+        'nearest k=10': lambda i: index.nearest(q_lat[i], q_lon[i], k=10),
+        'capacity_in_box': lambda i: index.capacity_in_box(*boxes[i]),
+    }
+    print()
+    for name, query in timings.items():
+        start = time.perf_counter()
+        for repeat in range(5):
+            for i in range(200):
+                query(i)
+        print(f"{name:<24} {(time.perf_counter() - start) / 1000 * 1e6:7.1f} µs per query")
+
+    # Many points per call share the BallTree's per-call overhead
+    for name, query in [('within 50 km', lambda: index.within(q_lat, q_lon, 50)),
+                        ('nearest k=10', lambda: index.nearest(q_lat, q_lon, k=10))]:
+        start = time.perf_counter()
+        for repeat in range(5):
+            query()
+        print(f"{name + ' (batch)':<24} {(time.perf_counter() - start) / 1000 * 1e6:7.1f} µs per point")
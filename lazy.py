@@ -0,0 +1,24 @@
+# LAZY IMPORTS -----------------------------------------------------------------------------------------
+# Heavy modules that only some code paths need are bound with lazy_import() instead of import:
+#
+#   sparse = lazy_import('scipy.sparse')      # nothing loaded yet
+#   sparse.csr_matrix(...)                    # scipy.sparse is imported here, on first use
+#
+# The module is registered in sys.modules straight away, so a later plain import gets the same object.
+# ------------------------------------------------------------------------------------------------------
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,178 @@
+# MISSING-DATA PROFILE ---------------------------------------------------------------------------------
+# Everything the missing-value charts need, from one pass over the data and without an n x columns
+# boolean frame:
+#
+#   profile = MissingProfile.of(df)                    # or profile_csv(path) for files read in chunks
+#   profile.counts                                     # missing per column (Series)
+#   profile.total                                      # missing cells overall
+#   profile.patterns()                                 # which columns go missing together, and how often
+#   profile.co_missing()                               # columns x columns: rows missing both
+#   profile.density(buckets=200)                       # buckets x columns: fraction missing per row band
+#
+# Each column's null mask is packed 8 rows to a byte as it's read, and each row's set of missing
+# columns is kept as a bitmask (one uint64 word per 64 columns), so the distinct patterns are a
+# np.unique over integers. Counts and densities are popcounts over the packed bytes.
+#
+# heatmap_layer() draws density() instead of df.isnull(): at most `buckets` rows x columns cells,
+# however long the file is.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+from render import layer
+
+DENSITY_BUCKETS = 200
+
+
+class MissingProfile:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.words = max(1, -(-len(self.columns) // 64))
+        self.n_rows = 0
+        self.packed = []                 # per chunk: (columns, bytes) packed null masks
+        self.pattern_counts = {}         # row bitmask (tuple of words) -> rows
+
+    @classmethod
+    def of(cls, df):
+        return cls(df.columns).update(df)
+
+    def update(self, df):
+        # Add a chunk of rows (same columns as before)
+        if self.n_rows % 8:
+            raise ValueError("Only the last chunk may have a row count that isn't a multiple of 8")
+        n = len(df)
+        packed = np.empty((len(self.columns), -(-n // 8)), dtype=np.uint8)
+        codes = np.zeros((n, self.words), dtype=np.uint64)
+        for j, col in enumerate(self.columns):
+            mask = df[col].isna().to_numpy()
+            packed[j] = np.packbits(mask)
+            codes[:, j // 64] |= mask.astype(np.uint64) << np.uint64(j % 64)
+        self.packed.append(packed)
+        self.n_rows += n
+
+        # Up to 64 columns a row's pattern is one integer; wider, the row's words are one opaque value,
+        # so unique is still a flat sort rather than a row-wise one
+        if self.words == 1:
+            patterns, counts = np.unique(codes[:, 0], return_counts=True)
+        else:
+            patterns, counts = np.unique(codes.view(np.dtype((np.void, 8 * self.words))).ravel(),
+                                         return_counts=True)
+        patterns = np.frombuffer(patterns.tobytes(), dtype=np.uint64).reshape(-1, self.words)
+        for pattern, count in zip(map(tuple, patterns.tolist()), counts.tolist()):
+            self.pattern_counts[pattern] = self.pattern_counts.get(pattern, 0) + count
+        return self
+
+    def _masks(self):
+        return np.concatenate(self.packed, axis=1) if len(self.packed) > 1 else self.packed[0]
+
+    # Summaries ----------------------------------------------------------------------------------------
+    @property
+    def counts(self):
+        per_column = np.bitwise_count(self._masks()).sum(axis=1, dtype=np.int64)
+        return pd.Series(per_column, index=self.columns)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def size(self):
+        return self.n_rows * len(self.columns)
+
+    def _pattern_matrix(self):
+        # (patterns x columns) booleans and the row count of each pattern
+        codes = np.array(list(self.pattern_counts), dtype=np.uint64).reshape(-1, self.words)
+        j = np.arange(len(self.columns))
+        bits = (codes[:, j // 64] >> (j % 64).astype(np.uint64)) & np.uint64(1)
+        return bits.astype(bool), np.array(list(self.pattern_counts.values()), dtype=np.int64)
+
+    def patterns(self, top=None):
+        # Distinct sets of missing columns, most common first
+        bits, counts = self._pattern_matrix()
+        table = pd.DataFrame({
+            'missing': [tuple(c for c, b in zip(self.columns, row) if b) for row in bits],
+            'n_missing': bits.sum(axis=1),
+            'rows': counts,
+        }).sort_values(['rows', 'n_missing'], ascending=[False, True], ignore_index=True)
+        return table.head(top) if top else table
+
+    def co_missing(self):
+        # [a, b] = rows where a and b are both missing (diagonal: counts)
+        bits, counts = self._pattern_matrix()
+        weighted = bits.T.astype(np.int64) * counts
+        return pd.DataFrame(weighted @ bits.astype(np.int64), index=self.columns, columns=self.columns)
+
+    def density(self, buckets=DENSITY_BUCKETS):
+        # Fraction of rows missing per column within consecutive row bands. Bands are whole bytes of
+        # the packed masks, except for short files, which get one band per row.
+        masks = self._masks()
+        if self.n_rows <= buckets:
+            bits = np.unpackbits(masks, axis=1, count=self.n_rows)
+            return pd.DataFrame(bits.T.astype(np.float64), columns=self.columns)
+
+        band_bytes = -(-self.n_rows // (buckets * 8))
+        n_bands = -(-masks.shape[1] // band_bytes)
+        padded = np.zeros((len(self.columns), n_bands * band_bytes), dtype=np.uint8)
+        padded[:, :masks.shape[1]] = masks
+        missing = np.bitwise_count(padded.reshape(len(self.columns), n_bands, band_bytes)).sum(axis=2)
+        starts = np.arange(n_bands) * band_bytes * 8
+        rows = np.minimum(starts + band_bytes * 8, self.n_rows) - starts
+        return pd.DataFrame((missing / rows).T, columns=self.columns,
+                            index=pd.Index(starts, name='first row'))
+
+
+def profile_csv(path, chunksize=100_000, **read_csv_kwargs):
+    # One streamed read; chunksize is rounded to whole bytes of the packed masks
+    chunksize = -(-chunksize // 8) * 8
+    profile = None
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+        profile = (profile or MissingProfile(chunk.columns)).update(chunk)
+    return profile
+
+
+def heatmap_layer(profile, buckets=DENSITY_BUCKETS, **kwargs):
+    # Heatmap of density(): 0 = nothing missing in the band, 1 = all of it
+    options = {'cmap': 'viridis', 'vmin': 0, 'vmax': 1, 'cbar': profile.n_rows > buckets}
+    return layer('heatmap', profile.density(buckets), **{**options, **kwargs})
+
+
+# Check against df.isnull(), then profile a wide file and a long one -----------------------------------
+if __name__ == "__main__":
+    import os
+    import time
+
+    import datasets
+
+    for name, df in [('retail_sales', datasets.load('retail_sales')),
+                     ('MentalHQ2020', pd.read_csv(os.path.join(datasets.DATA_DIR, 'MentalHQ2020.csv')))]:
+        profile = MissingProfile.of(df)
+        nulls = df.isnull()
+        assert (profile.counts == nulls.sum()).all() and profile.total == nulls.sum().sum()
+        both = nulls.T.astype(int) @ nulls.astype(int)
+        assert (profile.co_missing().values == both.values).all()
+        assert profile.patterns()['rows'].sum() == len(df)
+        assert np.allclose(profile.density(len(df)).values, nulls.values)
+        print(f"{name} ({len(df)} x {df.shape[1]}): {profile.total:,} of {profile.size:,} cells missing, "
+              f"{len(profile.pattern_counts)} distinct row patterns - matches df.isnull()")
+
+    mental = profile_csv(os.path.join(datasets.DATA_DIR, 'MentalHQ2020.csv'), chunksize=100)
+    print("\nMost common missing-column sets in MentalHQ2020:")
+    for row in mental.patterns(top=5).itertuples():
+        print(f"  {row.rows:4d} rows missing {row.n_missing} columns")
+
+    # 2M rows x 60 columns with blocks of missing values
+    rng = np.random.default_rng(0)
+    n, p = 2_000_000, 60
+    wide = pd.DataFrame(rng.normal(size=(n, p)), columns=[f"c{i}" for i in range(p)])
+    for i in range(0, p, 3):
+        start = rng.integers(n)
+        wide.iloc[start:start + n // 10, i] = np.nan
+    wide.iloc[rng.random(n) < 0.02, p - 1] = np.nan
+
+    start = time.perf_counter()
+    profile = MissingProfile.of(wide)
+    counts, density = profile.counts, profile.density()
+    elapsed = time.perf_counter() - start
+    assert (counts == wide.isnull().sum()).all()
+    print(f"\n{n:,} x {p}: profile in {elapsed:.2f}s, heatmap {density.shape[0]} x {density.shape[1]} cells "
+          f"instead of {n * p:,}; masks take {profile._masks().nbytes / 1e6:.0f} MB")
@@ -0,0 +1,402 @@
+# ONLINE PURCHASE CLASSIFIER ---------------------------------------------------------------------------
+# Week4.3's StandardScaler + LogisticRegression, updated one mini-batch of events at a time instead of
+# refitted on the full history:
+#
+#   model = OnlineClassifier(['Age', 'EstimatedSalary'], 'Purchased', checkpoint='artifacts/ads.npz')
+#   model.fit_stream(events)                       # any iterable of dict records (or DataFrames)
+#   model.update(batch)                            # or one batch at a time
+#   model.metrics.classification_report()          # everything seen so far
+#   model.metrics.classification_report(rolling=True)      # the last `window` events only
+#   model = OnlineClassifier.load('artifacts/ads.npz')     # carry on from the last checkpoint
+#
+#   - RunningScaler keeps n, the means and the summed squared deviations, merged chunk by chunk
+#     (Chan's update, as in regression.py), so its transform matches StandardScaler on everything seen.
+#   - OnlineLogisticRegression takes one gradient step per batch, with AdaGrad's per-feature step sizes
+#     and an L2 penalty.
+#   - Metrics are prequential: each batch is predicted before the model learns from it, and only the
+#     confusion matrices are kept - cumulative, plus one per batch for the rolling window.
+#   - Every checkpoint_every events the whole state (scaler, weights, metrics) is written to one .npz,
+#     via a temporary file and os.replace, so a crash never leaves half a checkpoint.
+# ------------------------------------------------------------------------------------------------------
+import itertools
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from tracing import annotate, span
+
+BATCH_SIZE = 256
+WINDOW = 10_000
+CHECKPOINT_EVERY = 100_000
+
+
+def _label_codes(y, classes):
+    # Position of each label in classes; anything else would be silently miscounted, so it's refused
+    y = np.asarray(y)
+    try:
+        codes = np.searchsorted(classes, y)
+        known = classes[np.minimum(codes, len(classes) - 1)] == y
+    except TypeError:                            # e.g. text labels against numeric classes
+        known = np.zeros(len(y), dtype=bool)
+    if not np.all(known):
+        raise ValueError(f"labels {np.unique(y[~known].astype(str)).tolist()} not in classes {classes.tolist()}")
+    return codes
+
+
+# Scaler -----------------------------------------------------------------------------------------------
+class RunningScaler:
+    def __init__(self):
+        self.n = 0
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n_b = len(X)
+        if not n_b:
+            return self
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        if self.n == 0:
+            self.n, self.mean_, self.m2 = n_b, mean_b, m2_b
+        else:
+            n = self.n + n_b
+            delta = mean_b - self.mean_
+            self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / n
+            self.mean_ = self.mean_ + delta * n_b / n
+            self.n = n
+        return self
+
+    @property
+    def var_(self):
+        return self.m2 / self.n
+
+    @property
+    def scale_(self):
+        scale = np.sqrt(self.var_)
+        return np.where(scale == 0, 1.0, scale)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+# Model ------------------------------------------------------------------------------------------------
+def _sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))          # no overflow warnings for large |z|
+
+
+class OnlineLogisticRegression:
+    def __init__(self, learning_rate=0.5, alpha=1e-4, eps=1e-8):
+        self.learning_rate = learning_rate
+        self.alpha = alpha
+        self.eps = eps
+        self.classes_ = np.array([0, 1])
+        self.n_steps_ = 0
+
+    def _start(self, p):
+        self.coef_ = np.zeros(p)
+        self.intercept_ = 0.0
+        self._g2 = np.zeros(p + 1)               # AdaGrad: summed squared gradients, intercept last
+
+    def partial_fit(self, X, y):
+        _label_codes(y, self.classes_)
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not hasattr(self, 'coef_'):
+            self._start(X.shape[1])
+        error = _sigmoid(X @ self.coef_ + self.intercept_) - y
+        grad = np.append(X.T @ error / len(y) + self.alpha * self.coef_, error.mean())
+        self._g2 += grad ** 2
+        step = self.learning_rate * grad / (np.sqrt(self._g2) + self.eps)
+        self.coef_ -= step[:-1]
+        self.intercept_ -= step[-1]
+        self.n_steps_ += 1
+        return self
+
+    def predict_proba(self, X):
+        p = _sigmoid(np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_)
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(np.intp)]
+
+
+# Metrics ----------------------------------------------------------------------------------------------
+class StreamMetrics:
+    def __init__(self, classes=(0, 1), window=WINDOW):
+        self.classes = np.asarray(classes)
+        self.window = window
+        k = len(self.classes)
+        self.confusion = np.zeros((k, k), dtype=np.int64)
+        self.recent = deque()                    # (events, confusion matrix) per batch, newest last
+        self.recent_events = 0                   # events in self.recent, kept as batches come and go
+        self.recent_confusion = np.zeros((k, k), dtype=np.int64)
+        self.log_loss_sum = 0.0
+
+    def update(self, y_true, y_pred, proba=None):
+        k = len(self.classes)
+        actual = _label_codes(y_true, self.classes)
+        predicted = _label_codes(y_pred, self.classes)
+        batch = np.bincount(actual * k + predicted, minlength=k * k).reshape(k, k)
+        self.confusion += batch
+        self.recent.append((len(actual), batch))
+        self.recent_events += len(actual)
+        self.recent_confusion += batch
+        # Whole batches drop out of the window, as long as what's left still covers it
+        while self.recent and self.recent_events - self.recent[0][0] >= self.window:
+            n, matrix = self.recent.popleft()
+            self.recent_events -= n
+            self.recent_confusion -= matrix
+        if proba is not None:
+            p = np.clip(proba[np.arange(len(actual)), actual], 1e-15, 1)
+            self.log_loss_sum -= np.log(p).sum()
+
+    def confusion_matrix(self, rolling=False):
+        return (self.recent_confusion if rolling else self.confusion).copy()
+
+    @property
+    def events(self):
+        return int(self.confusion.sum())
+
+    def log_loss(self):
+        return self.log_loss_sum / self.events if self.events else np.nan
+
+    def report(self, rolling=False):
+        # Per-class precision / recall / F1 / support, like classification_report(output_dict=True)
+        cm = self.confusion_matrix(rolling).astype(np.float64)
+        tp = np.diag(cm)
+        support = cm.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.nan_to_num(tp / cm.sum(axis=0))
+            recall = np.nan_to_num(tp / support)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        table = pd.DataFrame({'precision': precision, 'recall': recall, 'f1-score': f1,
+                              'support': support.astype(np.int64)}, index=[str(c) for c in self.classes])
+        total = support.sum()
+        accuracy = tp.sum() / total if total else 0.0
+        averages = pd.DataFrame({
+            'macro avg': [*table[['precision', 'recall', 'f1-score']].mean(), int(total)],
+            'weighted avg': [*(table[['precision', 'recall', 'f1-score']].T @ support / (total or 1)), int(total)],
+        }, index=table.columns).T
+        return table, accuracy, averages
+
+    def classification_report(self, rolling=False, digits=2):
+        # Same layout as sklearn.metrics.classification_report
+        table, accuracy, averages = self.report(rolling)
+        width = max(len('weighted avg'), *(len(name) for name in table.index), digits)
+        headers = ['precision', 'recall', 'f1-score', 'support']
+        row = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+        text = ("{:>{width}s} " + " {:>9}" * 4).format('', *headers, width=width) + "\n\n"
+        for name, values in table.iterrows():
+            text += row.format(name, *values[:3], int(values['support']), width=width, digits=digits)
+        total = int(table['support'].sum())
+        text += "\n" + ("{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n").format(
+            'accuracy', '', '', accuracy, total, width=width, digits=digits)
+        for name, values in averages.iterrows():
+            text += row.format(name, *values[:3], int(values['support']), width=width, digits=digits)
+        return text
+
+    # Checkpoint state ---------------------------------------------------------------------------------
+    def state(self):
+        return {'metrics_confusion': self.confusion, 'metrics_log_loss': self.log_loss_sum,
+                'metrics_window': self.window, 'metrics_classes': self.classes,
+                'metrics_recent_total': self.recent_events,
+                'metrics_recent_events': np.array([n for n, _ in self.recent], dtype=np.int64),
+                'metrics_recent': np.array([m for _, m in self.recent], dtype=np.int64).reshape(-1, *self.confusion.shape)}
+
+    @classmethod
+    def from_state(cls, data):
+        metrics = cls(data['metrics_classes'], int(data['metrics_window']))
+        metrics.confusion = data['metrics_confusion'].copy()
+        metrics.log_loss_sum = float(data['metrics_log_loss'])
+        for n, matrix in zip(data['metrics_recent_events'], data['metrics_recent']):
+            metrics.recent.append((int(n), matrix.copy()))
+            metrics.recent_confusion += matrix
+        metrics.recent_events = int(data['metrics_recent_total'])
+        return metrics
+
+
+# Streaming classifier ---------------------------------------------------------------------------------
+def _batches(records, batch_size):
+    # DataFrames pass straight through; dict records are grouped batch_size at a time
+    records = iter(records)
+    while True:
+        first = next(records, None)
+        if first is None:
+            return
+        if isinstance(first, pd.DataFrame):
+            yield first
+            continue
+        yield pd.DataFrame.from_records([first, *itertools.islice(records, batch_size - 1)])
+
+
+class OnlineClassifier:
+    def __init__(self, features, target, batch_size=BATCH_SIZE, window=WINDOW, checkpoint=None,
+                 checkpoint_every=CHECKPOINT_EVERY, **model_options):
+        self.features = list(features)
+        self.target = target
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.scaler = RunningScaler()
+        self.model = OnlineLogisticRegression(**model_options)
+        self.metrics = StreamMetrics(self.model.classes_, window)
+        self.events = 0
+        self._next_checkpoint = checkpoint_every
+
+    def update(self, batch):
+        # Predict the batch (for the metrics), then learn from it
+        X = batch[self.features].to_numpy(dtype=np.float64)
+        y = batch[self.target].to_numpy()
+        _label_codes(y, self.model.classes_)            # before any state changes
+        self.scaler.partial_fit(X)
+        X = self.scaler.transform(X)
+        if self.model.n_steps_:
+            proba = self.model.predict_proba(X)
+            self.metrics.update(y, self.model.classes_[(proba[:, 1] >= 0.5).astype(np.intp)], proba)
+        self.model.partial_fit(X, y)
+        self.events += len(y)
+        if self.checkpoint and self.events >= self._next_checkpoint:
+            self.save(self.checkpoint)
+            self._next_checkpoint = (self.events // self.checkpoint_every + 1) * self.checkpoint_every
+        return self
+
+    def fit_stream(self, records):
+        with span('online_fit', batch_size=self.batch_size):
+            start = self.events
+            for batch in _batches(records, self.batch_size):
+                self.update(batch)
+            annotate(rows=self.events - start)
+        return self
+
+    def predict_proba(self, X):
+        X = X[self.features] if isinstance(X, pd.DataFrame) else X
+        return self.model.predict_proba(self.scaler.transform(X))
+
+    def predict(self, X):
+        return self.model.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(np.intp)]
+
+    # Checkpoints --------------------------------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        m = self.model
+        np.savez(tmp, features=np.array(self.features), target=np.array(self.target), events=self.events,
+                 batch_size=self.batch_size, checkpoint_every=self.checkpoint_every,
+                 scaler_n=self.scaler.n, scaler_mean=getattr(self.scaler, 'mean_', np.zeros(0)),
+                 scaler_m2=getattr(self.scaler, 'm2', np.zeros(0)),
+                 learning_rate=m.learning_rate, alpha=m.alpha, eps=m.eps, n_steps=m.n_steps_,
+                 coef=getattr(m, 'coef_', np.zeros(0)), intercept=getattr(m, 'intercept_', 0.0),
+                 g2=getattr(m, '_g2', np.zeros(0)), **self.metrics.state())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path, checkpoint=None):
+        # Resumes writing checkpoints to `path` unless told otherwise
+        with np.load(path) as data:
+            return cls._from_checkpoint(data, checkpoint or path)
+
+    @classmethod
+    def _from_checkpoint(cls, data, checkpoint):
+        model = cls(data['features'].tolist(), data['target'].item(), batch_size=int(data['batch_size']),
+                    checkpoint=checkpoint, checkpoint_every=int(data['checkpoint_every']),
+                    learning_rate=float(data['learning_rate']), alpha=float(data['alpha']), eps=float(data['eps']))
+        model.events = int(data['events'])
+        model._next_checkpoint = (model.events // model.checkpoint_every + 1) * model.checkpoint_every
+        if int(data['scaler_n']):
+            model.scaler.n, model.scaler.mean_, model.scaler.m2 = int(data['scaler_n']), data['scaler_mean'], data['scaler_m2']
+        if int(data['n_steps']):
+            model.model.n_steps_ = int(data['n_steps'])
+            model.model.coef_, model.model.intercept_ = data['coef'].copy(), float(data['intercept'])
+            model.model._g2 = data['g2'].copy()
+        model.metrics = StreamMetrics.from_state(data)
+        return model
+
+
+# Against Week4.3's batch model, then throughput against refitting -------------------------------------
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report, confusion_matrix
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    import datasets
+
+    features, target = ['Age', 'EstimatedSalary'], 'Purchased'
+    ads = datasets.load('social_ads', columns=[*features, target])
+    train, test = train_test_split(ads, test_size=0.25, random_state=42)
+
+    # Week4.3, batch
+    scaler = StandardScaler().fit(train[features])
+    batch = LogisticRegression().fit(scaler.transform(train[features]), train[target])
+    batch_pred = batch.predict(scaler.transform(test[features]))
+
+    # The same training rows as a stream of events, a few passes in shuffled order
+    rng = np.random.default_rng(0)
+    events = (record for _ in range(20) for record in train.iloc[rng.permutation(len(train))].to_dict('records'))
+    online = OnlineClassifier(features, target, batch_size=32).fit_stream(events)
+    online_pred = online.predict(test)
+    assert np.allclose(online.scaler.mean_, scaler.mean_) and np.allclose(online.scaler.scale_, scaler.scale_)
+
+    metrics = StreamMetrics()
+    metrics.update(test[target].to_numpy(), online_pred)
+    assert metrics.classification_report() == classification_report(test[target], online_pred)
+    assert (metrics.confusion_matrix() == confusion_matrix(test[target], online_pred)).all()
+    print(f"Test accuracy: batch (Week4.3) {np.mean(batch_pred == test[target]):.3f}, "
+          f"online after {online.events:,} events {np.mean(online_pred == test[target]):.3f}; "
+          f"predictions agree on {np.mean(batch_pred == online_pred):.1%} of test rows")
+    print("Online model on the test rows (report matches sklearn's classification_report):")
+    print(metrics.classification_report())
+
+    # A long stream: Week4.3's customers resampled with jitter, checkpointed as it goes
+    n = 1_000_000
+    rows = rng.integers(len(train), size=n)
+    stream = pd.DataFrame({'Age': train['Age'].to_numpy()[rows] + rng.normal(0, 2, n),
+                           'EstimatedSalary': train['EstimatedSalary'].to_numpy()[rows] + rng.normal(0, 3000, n),
+                           'Purchased': train['Purchased'].to_numpy()[rows]})
+    records = stream.to_dict('records')
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, 'social_ads_online.npz')
+        online = OnlineClassifier(features, target, batch_size=256, checkpoint=checkpoint)
+        start = time.perf_counter()
+        online.fit_stream(records)
+        online_rate = n / (time.perf_counter() - start)
+
+        resumed = OnlineClassifier.load(checkpoint)
+        assert resumed.events == n and np.allclose(resumed.model.coef_, online.model.coef_)
+        assert (resumed.metrics.confusion_matrix(rolling=True) == online.metrics.confusion_matrix(rolling=True)).all()
+        assert resumed.metrics.recent_events == online.metrics.recent_events
+
+    print(f"{n:,} events: online updates {online_rate:,.0f} events/sec (from dict records, "
+          f"{n // online.checkpoint_every} checkpoints); test accuracy {np.mean(online.predict(test) == test[target]):.3f}")
+    print(f"Prequential log loss {online.metrics.log_loss():.3f}; last {online.metrics.window:,} events:")
+    print(online.metrics.classification_report(rolling=True))
+
+    # Per-event metrics cost the same whatever the window holds; labels outside classes_ are refused
+    labels = stream['Purchased'].to_numpy()
+    per_event = StreamMetrics()
+    start = time.perf_counter()
+    for i in range(100_000):
+        per_event.update(labels[i:i + 1], labels[i:i + 1])
+    print(f"StreamMetrics.update one event at a time: {100_000 / (time.perf_counter() - start):,.0f} events/sec")
+    for bad in (stream.head(3).assign(Purchased=[0, 1, 2]), stream.head(3).assign(Purchased=['no', 'yes', 'no'])):
+        try:
+            online.update(bad)
+            raise AssertionError("unknown labels were accepted")
+        except ValueError:
+            pass
+
+    # Refitting Week4.3's model on the whole history after every batch of 256
+    seen, start = 0, time.perf_counter()
+    while time.perf_counter() - start < 5:
+        seen += 256
+        history = stream.iloc[:seen]
+        refit_scaler = StandardScaler().fit(history[features])
+        LogisticRegression().fit(refit_scaler.transform(history[features]), history[target])
+    refit_rate = seen / (time.perf_counter() - start)
+    print(f"Batch refit per 256-event batch: {refit_rate:,.0f} events/sec over the first {seen:,} events "
+          f"(and falling as the history grows) - online is {online_rate / refit_rate:,.0f}x faster")
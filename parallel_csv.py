@@ -0,0 +1,428 @@
+# PARALLEL CSV READER ----------------------------------------------------------------------------------
+# One big CSV parsed on every core, with the column types worked out up front:
+#
+#   df = read_csv_parallel('Data/Global-Power-Plant.csv')            # dtypes inferred from a sample
+#   df = read_csv_parallel(path, dtypes={'Date': 'datetime64[ns]'}, dates={'Date': ['%d/%m/%Y']})
+#   df = read_csv_parallel(path, usecols=['Country', 'Latitude'])    # only these columns are parsed
+#   dtypes, dates = infer_schema(path)                               # just the inferred schema
+#
+# Other keyword arguments go to every read_csv call (sep=, encoding=, na_values=, ...). The reader
+# supplies header=, names= and dtype= itself, so those are refused: use dtypes= for the types.
+#
+# The file is cut into byte ranges that each start at a record boundary. Boundaries are quote-aware:
+# a newline only ends a record when the number of '"' before it is even, so multi-line quoted fields
+# (the addresses in USA_Housing.csv) never get split. Counting quotes is a vectorised pass over the
+# memory-mapped file; the parsing, which is what costs, is done by read_csv on each range in a process
+# pool.
+#
+# Types come from a sample taken at the start of ranges spread over the whole file, not from each
+# range on its own, so every range agrees on them:
+#   - numbers: the column's text coerced with pd.to_numeric; it's numeric if almost all of it parses
+#     (stray text becomes NaN). Ints that turn out to have blanks become float, and each column ends
+#     up as the smallest int that holds its range, or float32 when that's exact. Every range counts
+#     the values it coerced: if, over the file, more than the sample allowed didn't parse, the column
+#     is read again as text, and whatever was coerced is listed in df.attrs['coerced'].
+#   - dates: quotes and a trailing "GMT+1" style zone stripped, then a few formats tried, most
+#     matches first, each on the values the previous ones missed - so dirtydata.csv's '2020/12/01'
+#     and 20201226 are both dates, and MentalHQ2020's dob reads as dd/mm/yyyy.
+#   - text: category when values repeat (at most half are distinct), object otherwise.
+#
+# Each worker returns finished columns; they're copied once into arrays allocated for the full row
+# count, with no pd.concat of the range frames. Categories are merged with union_categoricals.
+# ------------------------------------------------------------------------------------------------------
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from tracing import annotate, span
+
+QUOTE = ord('"')
+NEWLINE = ord('\n')
+SCAN_BLOCK = 1 << 20
+MIN_RANGE_BYTES = 8 << 20
+SAMPLE_BYTES = 1 << 20
+SAMPLE_RANGES = 8
+NUMERIC_SHARE = 0.95             # of non-blank values that must parse as numbers
+DATE_SHARE = 0.9                 # ... or as dates
+DATE_PROBE = 50
+CATEGORY_SHARE = 0.5             # distinct / non-blank at most this for category
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%Y%m%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y-%m',
+                '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %I:%M:%S %p', '%d/%m/%Y %H:%M',
+                '%m/%d/%Y %H:%M']
+ZONE_SUFFIX = r'\s*(?:GMT|UTC)[+-]?\d*$'
+TEXT_DTYPES = ('object', 'category', 'datetime64[ns]')
+
+
+# Record boundaries ------------------------------------------------------------------------------------
+def _count_quotes(view, start, stop):
+    return sum(int(np.count_nonzero(view[i:min(i + SCAN_BLOCK, stop)] == QUOTE))
+               for i in range(start, stop, SCAN_BLOCK))
+
+
+def _record_end(view, pos, quotes=0):
+    # First offset after pos that ends a record, given the quotes seen since the last boundary
+    while pos < len(view):
+        block = view[pos:pos + SCAN_BLOCK]
+        quote_at = np.flatnonzero(block == QUOTE)
+        newline_at = np.flatnonzero(block == NEWLINE)
+        outside = (quotes + np.searchsorted(quote_at, newline_at)) % 2 == 0
+        if outside.any():
+            return pos + int(newline_at[outside.argmax()]) + 1
+        quotes += len(quote_at)
+        pos += len(block)
+    return len(view)
+
+
+def record_ranges(path, parts):
+    # (header end, [(start, stop), ...]) with every range starting on a record
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            size = len(view)
+            header_end = _record_end(view, 0)
+            bounds = [header_end]
+            for target in np.linspace(header_end, size, parts + 1)[1:-1].astype(np.int64):
+                if target <= bounds[-1]:
+                    continue
+                quotes = _count_quotes(view, bounds[-1], target)
+                bounds.append(_record_end(view, int(target), quotes))
+            if bounds[-1] < size:
+                bounds.append(size)
+        finally:
+            del view                      # the mmap can't close while a view of it exists
+    return header_end, [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _read_bytes(path, start, stop):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+# Coercion ---------------------------------------------------------------------------------------------
+def _clean_text(values):
+    return pd.Series(values, dtype=object).str.strip().str.strip('\'"')
+
+
+def to_dates(values, formats):
+    # Each format on the distinct values the earlier ones didn't parse
+    codes, uniques = pd.factorize(_clean_text(values).str.replace(ZONE_SUFFIX, '', regex=True))
+    text = pd.Series(uniques, dtype=object)
+    dates = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    todo = text != ''
+    for fmt in formats:
+        if not todo.any():
+            break
+        parsed = pd.to_datetime(text[todo], format=fmt, errors='coerce')
+        dates[parsed.index] = parsed
+        todo &= dates.isna()
+    result = dates.to_numpy()[codes]
+    result[codes < 0] = np.datetime64('NaT')
+    return result
+
+
+def _date_formats(values, weights):
+    # Greedy: the format that parses most of what's left (by row count), until none adds anything
+    formats, todo = [], np.ones(len(values), dtype=bool)
+    while todo.any():
+        parsed = {fmt: pd.to_datetime(values[todo], format=fmt, errors='coerce').notna() for fmt in DATE_FORMATS}
+        best = max(parsed, key=lambda fmt: weights[todo][parsed[fmt]].sum())
+        if not parsed[best].any():
+            break
+        formats.append(best)
+        todo[np.flatnonzero(todo)[parsed[best]]] = False
+    return formats, 1 - weights[todo].sum() / weights.sum()
+
+
+def _infer_column(values):
+    # (dtype, date formats or None) for one column of sampled text. Each distinct value is tried once.
+    text = _clean_text(values)
+    counts = text[text.notna() & (text != '')].value_counts(sort=False)
+    if not len(counts):
+        return 'float64', None
+    uniques, weights = counts.index.to_numpy(dtype=object), counts.to_numpy()
+    numbers = pd.to_numeric(pd.Series(uniques), errors='coerce').to_numpy()
+    if weights[~np.isnan(numbers)].sum() >= NUMERIC_SHARE * weights.sum():
+        whole = not np.isnan(numbers).any() and weights.sum() == len(values) and (numbers % 1 == 0).all()
+        return ('int64' if whole else 'float64'), None
+    # Text that isn't dates mostly fails on the first few values, so try those before the rest
+    undated = pd.Series(uniques).str.replace(ZONE_SUFFIX, '', regex=True).to_numpy(dtype=object)
+    if _date_formats(undated[:DATE_PROBE], weights[:DATE_PROBE])[1] >= DATE_SHARE:
+        formats, share = _date_formats(undated, weights)
+        if share >= DATE_SHARE:
+            return 'datetime64[ns]', formats
+    return ('category' if len(uniques) <= CATEGORY_SHARE * weights.sum() else 'object'), None
+
+
+def _check_kwargs(read_csv_kwargs):
+    given = [key for key in ('header', 'names', 'dtype') if key in read_csv_kwargs]
+    if given:
+        raise ValueError(f"read_csv_parallel sets {', '.join(given)} itself; pass column types as dtypes= "
+                         f"and the columns to read as usecols=")
+
+
+def _columns(path, usecols, read_csv_kwargs):
+    # (every column in the file, the ones to read in file order) - usecols by name or position
+    names = pd.read_csv(path, nrows=0, **read_csv_kwargs).columns.tolist()
+    if usecols is None:
+        return names, names
+    wanted = {names[c] if isinstance(c, (int, np.integer)) and not isinstance(c, bool) else c for c in usecols}
+    unknown = wanted - set(names)
+    if unknown:
+        raise ValueError(f"usecols {sorted(map(str, unknown))} not in {path} (columns: {names})")
+    return names, [col for col in names if col in wanted]
+
+
+def infer_schema(path, sample_bytes=SAMPLE_BYTES, ranges=None, usecols=None, **read_csv_kwargs):
+    # ({column: dtype}, {column: [date formats]}) from records at the start of ranges spread evenly
+    # from the first to the last
+    _check_kwargs(read_csv_kwargs)
+    if ranges is None:
+        _, ranges = record_ranges(path, SAMPLE_RANGES)
+    names, columns = _columns(path, usecols, read_csv_kwargs)
+    picked = np.unique(np.linspace(0, len(ranges) - 1, min(SAMPLE_RANGES, len(ranges))).round().astype(int))
+    per_range = max(1, sample_bytes // max(1, len(picked)))
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            pieces = []
+            for start, stop in (ranges[i] for i in picked):
+                end = stop if stop - start <= per_range else min(stop, _record_end(view, start + per_range,
+                                                                                   _count_quotes(view, start, start + per_range)))
+                pieces.append(bytes(mm[start:end]))
+        finally:
+            del view
+    sample = pd.read_csv(io.BytesIO(b''.join(pieces)), header=None, names=names, usecols=columns, dtype=str,
+                         **read_csv_kwargs)
+
+    dtypes, dates = {}, {}
+    for col in columns:
+        dtypes[col], formats = _infer_column(sample[col].to_numpy())
+        if formats:
+            dates[col] = formats
+    return dtypes, dates
+
+
+def _finish_column(values, dtype, formats):
+    # (array or Categorical, facts the merge needs, (values coerced to NaN, non-blank values))
+    if dtype == 'datetime64[ns]':
+        return to_dates(values, formats), None, None
+    if dtype == 'category':
+        return pd.Categorical(values), None, None
+    if dtype == 'object':
+        return values.to_numpy(dtype=object), None, None
+
+    present = int(values.notna().sum())
+    coerced = 0
+    if values.dtype == object:                          # stray text in a numeric column
+        text = _clean_text(values)
+        values = pd.to_numeric(text, errors='coerce')
+        present = int((text.notna() & (text != '')).sum())
+        coerced = present - int(values.notna().sum())
+    array = values.to_numpy()
+    if array.dtype.kind in 'iu':
+        return array, ((int(array.min()), int(array.max())) if len(array) else None), (coerced, present)
+    array = array.astype(np.float64, copy=False)
+    return array, bool(np.array_equal(array.astype(np.float32), array, equal_nan=True)), (coerced, present)
+
+
+def _parse_range(path, start, stop, names, columns, dtypes, dates, read_csv_kwargs):
+    read_types = {col: str for col in columns if dtypes[col] in TEXT_DTYPES}
+    df = pd.read_csv(io.BytesIO(_read_bytes(path, start, stop)), header=None, names=names, usecols=columns,
+                     dtype=read_types, **read_csv_kwargs)
+    return len(df), {col: _finish_column(df[col], dtypes[col], dates.get(col)) for col in columns}
+
+
+def _parse_all(jobs, workers):
+    if workers == 1 or len(jobs) == 1:
+        return [_parse_range(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_parse_range, *zip(*jobs)))
+
+
+# Merging ----------------------------------------------------------------------------------------------
+def _smallest_int(lo, hi):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def _merged_dtype(pieces):
+    kinds = {values.dtype.kind for values, _, _ in pieces}
+    if 'O' in kinds:
+        return object
+    if 'M' in kinds:
+        return 'datetime64[ns]'
+    ranges = [facts for values, facts, _ in pieces if values.dtype.kind in 'iu' and facts]
+    if kinds <= {'i', 'u'}:
+        return _smallest_int(min(lo for lo, _ in ranges), max(hi for _, hi in ranges)) if ranges else np.int8
+    # Floats: float32 only if every range's values, and any int range's bounds, survive it exactly
+    exact = all(facts for values, facts, _ in pieces if values.dtype.kind == 'f')
+    exact = exact and all(-2 ** 24 <= lo and hi <= 2 ** 24 for lo, hi in ranges)
+    return np.float32 if exact else np.float64
+
+
+def _merge(results, names, dtypes):
+    n = sum(rows for rows, _ in results)
+    columns = {}
+    for col in names:
+        pieces = [columns_[col] for _, columns_ in results]
+        if dtypes[col] == 'category':
+            columns[col] = union_categoricals([values for values, _, _ in pieces])
+        else:
+            out = np.empty(n, dtype=_merged_dtype(pieces))
+            offset = 0
+            for values, _, _ in pieces:
+                out[offset:offset + len(values)] = values
+                offset += len(values)
+            columns[col] = out
+        for _, columns_ in results:
+            columns_[col] = None          # let each range's copy go as soon as it's merged
+    return pd.DataFrame(columns, columns=names, copy=False)
+
+
+# Read -------------------------------------------------------------------------------------------------
+def read_csv_parallel(path, workers=None, parts=None, dtypes=None, dates=None, sample_bytes=SAMPLE_BYTES,
+                      usecols=None, **read_csv_kwargs):
+    # Like pd.read_csv(path) for files with a header row and '"' quoting. dtypes / dates override
+    # (or skip) inference for the columns they name.
+    _check_kwargs(read_csv_kwargs)
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    parts = parts or max(1, min(4 * workers, size // MIN_RANGE_BYTES))
+    with span('read_csv_parallel', file=os.path.basename(path), bytes=size, workers=workers):
+        _, ranges = record_ranges(path, parts)
+        names, columns = _columns(path, usecols, read_csv_kwargs)
+        given_dtypes, given_dates = dtypes or {}, dates or {}
+        if not ranges:
+            return pd.DataFrame(columns=columns)
+        inferred, inferred_dates = ({}, {}) if set(given_dtypes) >= set(columns) else \
+            infer_schema(path, sample_bytes, ranges, columns, **read_csv_kwargs)
+        dtypes = {col: str(given_dtypes.get(col, inferred.get(col))) for col in columns}
+        dates = {col: given_dates.get(col, inferred_dates.get(col, DATE_FORMATS))
+                 for col in columns if dtypes[col] == 'datetime64[ns]'}
+
+        results = _parse_all([(path, start, stop, names, columns, dtypes, dates, read_csv_kwargs)
+                              for start, stop in ranges], workers)
+
+        # Numeric columns with more unparsable text than the sample allowed are read again as text
+        coerced, text = {}, []
+        for col in columns:
+            counts = [columns_[col][2] for _, columns_ in results if columns_[col][2] is not None]
+            lost, present = sum(c for c, _ in counts), sum(p for _, p in counts)
+            if lost > (1 - NUMERIC_SHARE) * present:
+                text.append(col)
+            elif lost:
+                coerced[col] = lost
+        if text:
+            dtypes.update((col, 'object') for col in text)
+            again = _parse_all([(path, start, stop, names, text, dtypes, dates, read_csv_kwargs)
+                                for start, stop in ranges], workers)
+            for (_, columns_), (_, redone) in zip(results, again):
+                columns_.update(redone)
+
+        df = _merge(results, columns, dtypes)
+        df.attrs['coerced'] = coerced
+        annotate(rows=len(df), ranges=len(ranges), coerced=sum(coerced.values()), reread=len(text))
+        return df
+
+
+# Check against read_csv, then time a large file -------------------------------------------------------
+if __name__ == "__main__":
+    import shutil
+    import sys
+    import tempfile
+    import time
+
+    import datasets
+
+    def same(a, b):
+        # Same values, whatever the dtype each side chose
+        if isinstance(a.dtype, pd.CategoricalDtype) or a.dtype == object:
+            return a.astype(object).where(a.notna(), None).equals(b.astype(object).where(b.notna(), None))
+        return np.allclose(a.to_numpy(np.float64), b.to_numpy(np.float64), equal_nan=True, rtol=1e-12, atol=0)
+
+    # Small ranges on purpose, so boundaries land inside quoted multi-line fields
+    for name in ('Global-Power-Plant.csv', 'USA_Housing.csv', 'london_bike_sharing.csv'):
+        file = os.path.join(datasets.DATA_DIR, name)
+        expected = pd.read_csv(file)
+        df = read_csv_parallel(file, workers=2, parts=16)
+        for col in expected.columns:
+            if df[col].dtype.kind != 'M':
+                assert same(df[col], expected[col]), (name, col)
+        saved = expected.memory_usage(deep=True).sum() / df.memory_usage(deep=True).sum()
+        print(f"{name}: {len(df):,} rows match read_csv, {saved:.1f}x smaller "
+              f"({', '.join(f'{c}: {t}' for c, t in df.dtypes.astype(str).items())})")
+
+    # Only some columns, by name or position, in file order as read_csv gives them
+    plants_file = os.path.join(datasets.DATA_DIR, 'Global-Power-Plant.csv')
+    for usecols in (['Latitude', 'Country'], [4, 0]):
+        subset = read_csv_parallel(plants_file, workers=2, parts=16, usecols=usecols)
+        expected = pd.read_csv(plants_file, usecols=usecols)
+        assert list(subset.columns) == list(expected.columns)
+        assert all(same(subset[col], expected[col]) for col in expected.columns)
+    for bad in ({'header': None}, {'names': ['a']}, {'dtype': str}):
+        try:
+            read_csv_parallel(plants_file, **bad)
+            raise AssertionError(f"{bad} was accepted")
+        except ValueError:
+            pass
+    print(f"usecols {list(subset.columns)}: matches read_csv; header= / names= / dtype= refused")
+
+    dirty = read_csv_parallel(os.path.join(datasets.DATA_DIR, 'dirtydata.csv'), workers=1)
+    print(f"\ndirtydata.csv: Date {dirty['Date'].dtype}, {dirty['Date'].notna().sum()} of {len(dirty)} parsed "
+          f"(row 26: {dirty['Date'][26].date()}), Calories {dirty['Calories'].dtype}")
+    mental = read_csv_parallel(os.path.join(datasets.DATA_DIR, 'MentalHQ2020.csv'), workers=1)
+    _, mental_dates = infer_schema(os.path.join(datasets.DATA_DIR, 'MentalHQ2020.csv'))
+    print(f"MentalHQ2020.csv: date columns {mental_dates}; "
+          f"{(mental.dtypes == 'category').sum()} category columns of {mental.shape[1]}")
+
+    # Text that only turns up late in a numeric-looking column is kept, not coerced to NaN: in the
+    # last quarter the sample sees it; in the middle of ranges only the ranges' coerced counts do
+    with tempfile.TemporaryDirectory() as tmp:
+        n = 400_000
+        row = np.arange(n)
+        for name, text_rows, sample_bytes in [('last quarter', row >= 3 * n // 4, SAMPLE_BYTES),
+                                              ('mid-range', row % 25_000 >= 12_000, 4096)]:
+            codes = row.astype(str).astype(object)
+            codes[text_rows] = [f"X{i}" for i in range(text_rows.sum())]
+            file = os.path.join(tmp, 'codes.csv')
+            pd.DataFrame({'id': row, 'code': codes}).to_csv(file, index=False)
+            df = read_csv_parallel(file, workers=2, parts=16, sample_bytes=sample_bytes)
+            assert df['code'].dtype == object and (df['code'].astype(str) == codes.astype(str)).all()
+            print(f"{name} text: {text_rows.sum():,} non-numeric codes kept as text "
+                  f"(coerced: {df.attrs['coerced'] or 'none'})")
+
+    # Global-Power-Plant scaled up (size in MB on the command line, 1 GB by default)
+    target = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 1_000_000_000
+    source = os.path.join(datasets.DATA_DIR, 'Global-Power-Plant.csv')
+    tmp = tempfile.mkdtemp()
+    try:
+        big = os.path.join(tmp, 'power_plants_big.csv')
+        with open(source, 'rb') as f:
+            header = f.readline()
+            body = f.read()
+        with open(big, 'wb') as f:
+            f.write(header)
+            for _ in range(max(1, target // len(body))):
+                f.write(body)
+
+        start = time.perf_counter()
+        expected = pd.read_csv(big)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        df = read_csv_parallel(big)
+        parallel = time.perf_counter() - start
+        assert len(df) == len(expected) and all(same(df[c], expected[c]) for c in expected.columns)
+        print(f"\n{os.path.getsize(big) / 1e6:,.0f} MB, {len(df):,} rows: read_csv {single:.1f}s, "
+              f"read_csv_parallel {parallel:.1f}s on {os.cpu_count()} cores ({single / parallel:.2f}x); "
+              f"{expected.memory_usage(deep=True).sum() / 1e9:.2f} GB -> {df.memory_usage(deep=True).sum() / 1e9:.2f} GB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
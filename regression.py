@@ -0,0 +1,230 @@
+# INCREMENTAL LEAST-SQUARES REGRESSION -----------------------------------------------------------------
+# Ordinary least squares fitted from running sufficient statistics instead of the full data matrix.
+# The model keeps n, the column means and the centred cross-products (XᵀX, Xᵀy, yᵀy about the mean),
+# so:
+#   - partial_fit(X, y) folds in a new chunk in O(rows * p²) without touching older rows
+#   - merge(other) combines models fitted on different chunks / in different worker processes
+#   - coefficients are re-solved from the p x p statistics only when they're asked for
+#   - save()/load() keep the statistics on disk so tomorrow's rows can be added to today's fit
+#
+# Coefficients, predictions, MSE and R² agree with sklearn's LinearRegression to rounding error.
+# Keeping the statistics centred (Chan's parallel update) avoids the cancellation you get from
+# accumulating raw XᵀX on data like house prices.
+# ------------------------------------------------------------------------------------------------------
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+
+def _as_2d(X):
+    X = np.asarray(X, dtype=np.float64)
+    return X.reshape(-1, 1) if X.ndim == 1 else X
+
+
+def chunk_stats(X, y):
+    # Sufficient statistics for a single chunk (module-level so worker processes can run it)
+    X = _as_2d(X)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    mean_x = X.mean(axis=0)
+    mean_y = y.mean()
+    Xc = X - mean_x
+    yc = y - mean_y
+    return len(y), mean_x, mean_y, Xc.T @ Xc, Xc.T @ yc, yc @ yc
+
+
+class IncrementalLinearRegression:
+    def __init__(self, fit_intercept=True):
+        self.fit_intercept = fit_intercept
+        self.n = 0
+        self._coef = None
+
+    # Accumulating -------------------------------------------------------------------------------------
+    def _add(self, n_b, mean_x_b, mean_y_b, sxx_b, sxy_b, syy_b):
+        if n_b == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean_x, self.mean_y = n_b, mean_x_b.copy(), mean_y_b
+            self.sxx, self.sxy, self.syy = sxx_b.copy(), sxy_b.copy(), syy_b
+        else:
+            n = self.n + n_b
+            f = self.n * n_b / n
+            dx = mean_x_b - self.mean_x
+            dy = mean_y_b - self.mean_y
+            self.sxx = self.sxx + sxx_b + f * np.outer(dx, dx)
+            self.sxy = self.sxy + sxy_b + f * dx * dy
+            self.syy = self.syy + syy_b + f * dy * dy
+            self.mean_x = self.mean_x + dx * n_b / n
+            self.mean_y = self.mean_y + dy * n_b / n
+            self.n = n
+        self._coef = None
+        return self
+
+    def partial_fit(self, X, y):
+        if len(y) == 0:
+            return self
+        return self._add(*chunk_stats(X, y))
+
+    def fit(self, X, y):
+        self.n = 0
+        return self.partial_fit(X, y)
+
+    def merge(self, other):
+        if other.n:
+            self._add(other.n, other.mean_x, other.mean_y, other.sxx, other.sxy, other.syy)
+        return self
+
+    # Solving ------------------------------------------------------------------------------------------
+    def _solve(self):
+        if self.fit_intercept:
+            sxx, sxy = self.sxx, self.sxy
+        else:
+            # Without an intercept we need raw (uncentred) cross-products
+            sxx = self.sxx + self.n * np.outer(self.mean_x, self.mean_x)
+            sxy = self.sxy + self.n * self.mean_x * self.mean_y
+
+        # Solve on the correlation scale - features in the 1e0..1e6 range otherwise make XᵀX ill-conditioned
+        d = np.sqrt(np.diag(sxx))
+        d[d == 0] = 1.0
+        a = sxx / np.outer(d, d)
+        b = sxy / d
+        try:
+            coef = np.linalg.solve(a, b)
+        except np.linalg.LinAlgError:
+            coef = np.linalg.lstsq(a, b, rcond=None)[0]
+        self._coef = coef / d
+
+    @property
+    def coef_(self):
+        if self.n == 0:
+            raise ValueError("Model has not been fitted yet")
+        if self._coef is None:
+            self._solve()
+        return self._coef
+
+    @property
+    def intercept_(self):
+        if not self.fit_intercept:
+            return 0.0
+        return self.mean_y - self.mean_x @ self.coef_
+
+    def predict(self, X):
+        return _as_2d(X) @ self.coef_ + self.intercept_
+
+    # Metrics ------------------------------------------------------------------------------------------
+    def score(self, X, y):
+        y = np.asarray(y, dtype=np.float64).ravel()
+        residual = y - self.predict(X)
+        total = y - y.mean()
+        return 1.0 - (residual @ residual) / (total @ total)
+
+    def mse(self, X, y):
+        residual = np.asarray(y, dtype=np.float64).ravel() - self.predict(X)
+        return residual @ residual / len(residual)
+
+    def training_sse(self):
+        # Residual sum of squares on everything seen so far, from the statistics alone
+        coef = self.coef_
+        sse = self.syy - 2 * coef @ self.sxy + coef @ self.sxx @ coef
+        if not self.fit_intercept:
+            sse += self.n * (self.mean_y - self.mean_x @ coef) ** 2
+        return max(sse, 0.0)
+
+    def training_mse(self):
+        return self.training_sse() / self.n
+
+    def training_r2(self):
+        return 1.0 - self.training_sse() / self.syy
+
+    # Persistence --------------------------------------------------------------------------------------
+    def save(self, path):
+        np.savez(path, n=self.n, mean_x=self.mean_x, mean_y=self.mean_y,
+                 sxx=self.sxx, sxy=self.sxy, syy=self.syy, fit_intercept=self.fit_intercept)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        model = cls(fit_intercept=bool(data['fit_intercept']))
+        model._add(int(data['n']), data['mean_x'], float(data['mean_y']),
+                   data['sxx'], data['sxy'], float(data['syy']))
+        return model
+
+
+# Helpers ----------------------------------------------------------------------------------------------
+def fit_chunks_parallel(chunks, n_jobs=None, fit_intercept=True):
+    # chunks: iterable of (X, y), drawn lazily - at most two per worker are in flight, so a generator
+    # over a file bigger than memory stays that way. Each worker reduces its chunk to p x p statistics,
+    # which are merged here; empty chunks are skipped.
+    model = IncrementalLinearRegression(fit_intercept=fit_intercept)
+    workers = n_jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for X, y in chunks:
+            if not len(y):
+                continue
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model._add(*future.result())
+            pending.add(pool.submit(chunk_stats, X, y))
+        for future in pending:
+            model._add(*future.result())
+    return model
+
+
+def fit_csv(path, features, target, chunksize=100_000, model=None):
+    model = model or IncrementalLinearRegression()
+    for chunk in pd.read_csv(path, usecols=list(features) + [target], chunksize=chunksize):
+        chunk = chunk.dropna()
+        model.partial_fit(chunk[list(features)].to_numpy(), chunk[target].to_numpy())
+    return model
+
+
+# Check against sklearn --------------------------------------------------------------------------------
+if __name__ == "__main__":
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    housing = pd.read_csv('Data/USA_Housing.csv')
+    cases = {
+        'salary_data.csv': (pd.read_csv('Data/salary_data.csv'), ['YearsExperience'], 'Salary'),
+        'USA_Housing.csv': (housing, ['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms',
+                                      'Avg. Area Number of Bedrooms', 'Area Population'], 'Price'),
+        'cars.csv': (pd.read_csv('Data/cars.csv'), ['Weight', 'Volume'], 'CO2'),
+    }
+
+    for name, (df, features, target) in cases.items():
+        X_train, X_test, y_train, y_test = train_test_split(df[features].to_numpy(), df[target].to_numpy(),
+                                                            test_size=0.2, random_state=42)
+        reference = LinearRegression().fit(X_train, y_train)
+        y_ref = reference.predict(X_test)
+
+        # Fit in three chunks, two of them in parallel workers, then merge
+        thirds = np.array_split(np.arange(len(y_train)), 3)
+        model = fit_chunks_parallel([(X_train[i], y_train[i]) for i in thirds[:2]], n_jobs=2)
+        model.partial_fit(X_train[thirds[2]], y_train[thirds[2]])
+        y_pred = model.predict(X_test)
+
+        assert np.allclose(model.coef_, reference.coef_, rtol=1e-8, atol=1e-10)
+        assert np.isclose(model.intercept_, reference.intercept_, rtol=1e-8)
+        assert np.isclose(model.mse(X_test, y_test), mean_squared_error(y_test, y_ref), rtol=1e-8)
+        assert np.isclose(model.score(X_test, y_test), r2_score(y_test, y_ref), rtol=1e-8)
+        assert np.isclose(model.training_r2(), reference.score(X_train, y_train), rtol=1e-8)
+        print(f"{name}: coefficients, intercept, MSE and R² match sklearn")
+
+    # A lazy stream of chunks, empty ones included, is consumed as workers free up rather than all at once
+    features, target = cases['USA_Housing.csv'][1:]
+    drawn = []
+
+    def housing_chunks():
+        for start in range(0, len(housing), 250):
+            drawn.append(start)
+            yield housing[features].to_numpy()[start:start + 250], housing[target].to_numpy()[start:start + 250]
+            yield np.empty((0, len(features))), np.empty(0)
+
+    model = fit_chunks_parallel(housing_chunks(), n_jobs=2)
+    reference = LinearRegression().fit(housing[features], housing[target])
+    assert len(drawn) == len(housing) // 250 and np.allclose(model.coef_, reference.coef_, rtol=1e-8)
+    print(f"USA_Housing.csv from a generator of {len(drawn)} chunks (and as many empty ones): matches sklearn")
@@ -0,0 +1,194 @@
+# FIGURE REGISTRY AND BATCH RENDERING ------------------------------------------------------------------
+# Scripts describe each chart as a list of layers instead of calling plt.show() themselves:
+#
+#     report = Report('Week2')
+#     report.figure('screen_time_hist',
+#                   layer('histplot', df['Screen_On_Time'], bins=20, kde=True),
+#                   title="Distribution of Screen-On Time", xlabel="Hours per Day")
+#     ...
+#     report.finish()
+#
+# By default every figure is drawn and shown straight away, exactly like before. With the
+# COM624_RENDER environment variable set to 'png' or 'svg' nothing is shown: the figures are queued,
+# rendered to files in a process pool when finish() is called, and collected into one HTML page per
+# script. A figure whose layers, data and options hash the same as last time is not redrawn.
+# COM624_RENDER=none skips figures altogether, and matplotlib / seaborn are never imported.
+#
+# A cmap given as a list of colours becomes a ListedColormap, so scripts don't need matplotlib for it.
+# The binned_* kinds are the aggregated scatter / pairplot layers built by binned.py. Drawing and
+# finish() are 'render' spans when tracing.py is on.
+# ------------------------------------------------------------------------------------------------------
+import hashlib
+import html
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from tracing import annotate, span
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.path.join(ROOT, 'reports')
+
+SEABORN_KINDS = {'histplot', 'boxplot', 'heatmap', 'scatterplot', 'pairplot'}
+PYPLOT_KINDS = {'scatter', 'plot', 'pie', 'contourf', 'fill', 'hexbin', 'imshow'}
+BINNED_KINDS = {'binned_scatter', 'binned_hexbin', 'binned_pairplot'}
+FIGURE_KINDS = {'pairplot', 'binned_pairplot'}            # make their own figure
+
+
+def layer(kind, /, *args, **kwargs):
+    return (kind, args, kwargs)
+
+
+# Drawing ----------------------------------------------------------------------------------------------
+# Module-level so worker processes can import it (the figure specs are pickled, not the scripts)
+def draw(spec):
+    import matplotlib.pyplot as plt
+
+    layers, options = spec['layers'], spec['options']
+    if spec.get('theme'):
+        import seaborn as sns
+        sns.set_theme(**spec['theme'])
+
+    # Figure-level plots (pairplots) make their own figure
+    if layers[0][0] not in FIGURE_KINDS:
+        plt.figure(figsize=options.get('figsize'))
+
+    for kind, args, kwargs in layers:
+        if isinstance(kwargs.get('cmap'), (list, tuple)):
+            from matplotlib.colors import ListedColormap
+            kwargs = {**kwargs, 'cmap': ListedColormap(kwargs['cmap'])}
+        if kind in SEABORN_KINDS:
+            import seaborn as sns
+            getattr(sns, kind)(*args, **kwargs)
+        elif kind in PYPLOT_KINDS:
+            getattr(plt, kind)(*args, **kwargs)
+        elif kind in BINNED_KINDS:
+            import binned
+            getattr(binned, f'draw_{kind}')(*args, **kwargs)
+        elif kind == 'series':
+            # pandas plotting, e.g. layer('series', df['Sales'], kind='hist', bins=20)
+            args[0].plot(*args[1:], **kwargs)
+        else:
+            raise ValueError(f"Unknown layer kind: {kind}")
+
+    if options.get('title'):
+        plt.title(options['title'])
+    if options.get('suptitle'):
+        plt.suptitle(options['suptitle'], y=options.get('suptitle_y', 1.02))
+    if options.get('xlabel'):
+        plt.xlabel(options['xlabel'])
+    if options.get('ylabel'):
+        plt.ylabel(options['ylabel'])
+    if options.get('xlim'):
+        plt.xlim(*options['xlim'])
+    if options.get('ylim'):
+        plt.ylim(*options['ylim'])
+    if options.get('xticks_rotation') is not None:
+        plt.xticks(rotation=options['xticks_rotation'])
+    if options.get('legend'):
+        plt.legend()
+    if options.get('tight_layout'):
+        plt.tight_layout()
+    return plt.gcf()
+
+
+def _render_file(spec, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = draw(spec)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close('all')
+    return path
+
+
+# Report -----------------------------------------------------------------------------------------------
+class Report:
+    def __init__(self, name, fmt=None, out_dir=None, theme=None, workers=None):
+        self.name = name
+        self.fmt = fmt or os.environ.get('COM624_RENDER')    # None means show interactively
+        self.out_dir = out_dir or os.path.join(REPORTS_DIR, name)
+        self.theme = theme
+        self.workers = workers
+        self.figures = []
+
+        if self.fmt == 'none':
+            self.theme = None
+        elif self.fmt is None and theme:
+            import seaborn as sns
+            sns.set_theme(**theme)
+
+    @property
+    def headless(self):
+        return self.fmt is not None
+
+    def figure(self, name, *layers, **options):
+        if self.fmt == 'none':
+            return
+        spec = {'layers': layers, 'options': options, 'theme': self.theme}
+        if not self.headless:
+            import matplotlib.pyplot as plt
+            with span('render', figure=name):
+                draw(spec)
+                plt.show()
+            return
+        self.figures.append((name, spec))
+
+    def _cache_path(self):
+        return os.path.join(self.out_dir, '.render_cache.json')
+
+    def finish(self):
+        if not self.headless or not self.figures:
+            return None
+        with span('render', report=self.name, figures=len(self.figures)):
+            return self._finish()
+
+    def _finish(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        try:
+            with open(self._cache_path(), encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        # Only redraw figures whose content hash changed (or whose file went missing)
+        jobs = {}
+        hashes = {}
+        for name, spec in self.figures:
+            path = os.path.join(self.out_dir, f'{name}.{self.fmt}')
+            digest = hashlib.sha1(pickle.dumps((spec, self.fmt))).hexdigest()
+            hashes[name] = digest
+            if cache.get(name) != digest or not os.path.exists(path):
+                jobs[name] = (spec, path)
+
+        if jobs:
+            workers = min(self.workers or os.cpu_count() or 1, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {name: pool.submit(_render_file, spec, path) for name, (spec, path) in jobs.items()}
+                for future in futures.values():
+                    future.result()
+
+        with open(self._cache_path(), 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, indent=1)
+
+        annotate(rendered=len(jobs))
+        report_path = self._write_html()
+        print(f"📈 {len(jobs)} of {len(self.figures)} figures rendered, report saved as: {report_path}")
+        return report_path
+
+    def _write_html(self):
+        parts = [f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{html.escape(self.name)}</title></head>",
+                 f"<body><h1>{html.escape(self.name)}</h1>"]
+        for name, spec in self.figures:
+            options = spec['options']
+            heading = options.get('title') or options.get('suptitle') or name
+            parts.append(f"<h2>{html.escape(heading)}</h2>")
+            parts.append(f"<img src='{html.escape(name)}.{self.fmt}' alt='{html.escape(heading)}'>")
+        parts.append("</body></html>\n")
+
+        report_path = os.path.join(self.out_dir, f'{self.name}.html')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(parts))
+        return report_path
@@ -0,0 +1,108 @@
+# SHARED ENTRY POINT -----------------------------------------------------------------------------------
+# Runs the Week scripts, one or many per process, so repeated runs (cron) pay for imports once:
+#
+#   python run.py Week2 Week4.3              # by name, or 'all'
+#   python run.py all --no-plots             # statistics only - matplotlib / seaborn are never imported
+#   python run.py Week4.2 --render png       # figures to reports/ instead of windows
+#   python run.py Week2 --import-report      # where the start-up time goes (like python -X importtime)
+#   python run.py all --trace trace.json     # Chrome trace of every script's phases (see tracing.py)
+#
+# Each script runs in its own folder with its own globals, exactly as if it had been started directly.
+# ------------------------------------------------------------------------------------------------------
+import argparse
+import glob
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+import tracing
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PLOTTING_MODULES = ('matplotlib', 'seaborn')
+
+
+def scripts():
+    # {'Week2': '.../Week2/Week2.py', 'Week4.1': ..., ...}
+    paths = sorted(glob.glob(os.path.join(ROOT, 'Week*', 'Week*.py')))
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
+
+
+def run_script(path):
+    cwd, argv = os.getcwd(), sys.argv
+    os.chdir(os.path.dirname(path))
+    sys.argv = [path]
+    try:
+        runpy.run_path(path, run_name='__main__')
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+
+
+# Import-time report -----------------------------------------------------------------------------------
+def import_report(argv, top=15):
+    # Re-run this command under -X importtime and summarise its output
+    proc = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv],
+                          stderr=subprocess.PIPE, text=True)
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            print(line, file=sys.stderr)
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not cumulative_us.strip().isdigit() or name.startswith('  '):
+            continue                       # header, or a submodule already counted in its parent
+        name = name.strip()
+        packages[name] = packages.get(name, 0) + int(cumulative_us)
+
+    total = sum(packages.values())
+    print(f"\n⏱  Import time: {total / 1e6:.2f}s across {len(packages)} top-level imports")
+    for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {us / 1e3:9.1f} ms  {us / total:6.1%}  {name}")
+    return proc.returncode
+
+
+def main(argv=None):
+    available = scripts()
+    parser = argparse.ArgumentParser(description="Run the Week scripts")
+    parser.add_argument('names', nargs='+', choices=[*available, 'all'], metavar='script',
+                        help=f"one or more of {', '.join(available)}, or all")
+    parser.add_argument('--no-plots', action='store_true', help="skip figures; plotting libraries aren't imported")
+    parser.add_argument('--render', choices=['png', 'svg'], help="save figures to reports/ instead of showing them")
+    parser.add_argument('--import-report', action='store_true', help="report where import time goes")
+    parser.add_argument('--trace', metavar='PATH', help="write a Chrome trace of each script's phases to PATH")
+    parser.add_argument('--trace-memory', action='store_true', help="with --trace: peak memory per span")
+    parser.add_argument('--profile', type=float, nargs='?', const=5.0, metavar='MS',
+                        help="with --trace: sample the stack every MS milliseconds (default 5)")
+    args = parser.parse_args(argv)
+
+    if args.import_report:
+        forwarded = [arg for arg in (argv if argv is not None else sys.argv[1:]) if arg != '--import-report']
+        return import_report(forwarded)
+
+    if args.no_plots:
+        os.environ['COM624_RENDER'] = 'none'
+    elif args.render:
+        os.environ['COM624_RENDER'] = args.render
+
+    if args.trace:
+        tracing.enable(args.trace, memory=args.trace_memory, profile_ms=args.profile)
+
+    names = list(available) if 'all' in args.names else args.names
+    for name in names:
+        start = time.perf_counter()
+        with tracing.span(name, cat='script'):
+            run_script(available[name])
+        print(f"⏱  {name} finished in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.no_plots:
+        loaded = [m for m in PLOTTING_MODULES if m in sys.modules]
+        if loaded:
+            print(f"⚠️  --no-plots run still imported {', '.join(loaded)}", file=sys.stderr)
+    tracing.finish()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
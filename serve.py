@@ -0,0 +1,244 @@
+# PREDICTION SERVER ------------------------------------------------------------------------------------
+# Serves the model artifacts in artifacts/ (see artifacts.py) over HTTP or a Unix socket:
+#
+#   python artifacts.py                          # fit and export the Week4 / Week5.1 models
+#   python serve.py --port 8000                  # or --unix /tmp/models.sock
+#   curl -d '{"rows": [[2300, 1300]]}' localhost:8000/predict/co2
+#
+#   GET  /models            names, kinds and feature names
+#   POST /predict/<name>    {"rows": [[...], ...]} or {"rows": [{"Weight": 2300, "Volume": 1300}, ...]}
+#                           -> {"predictions": [...]} (+ "probabilities" for logistic models)
+#   GET  /stats             request count, p50 / p99 latency, batching
+#
+# Requests for the same model that arrive together are micro-batched: all their rows go through one
+# vectorised predict call. While requests are coming in concurrently, each batch also waits up to
+# --max-wait-ms for more to join; a lone request doesn't wait. Only numpy (and pandas for polynomial
+# models) is imported - no sklearn, matplotlib or seaborn.
+#
+#   python serve.py --bench 20000 --concurrency 64    # load test against an in-process server
+# ------------------------------------------------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, load_models
+
+LATENCY_WINDOW = 10_000       # latencies kept for the percentiles
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+# Micro-batching ---------------------------------------------------------------------------------------
+class Batcher:
+    def __init__(self, predictor, max_rows=4096, max_wait=0.002):
+        self.predictor = predictor
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, X):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def run(self):
+        busy = False
+        while True:
+            items = [await self.queue.get()]
+            # Let requests that have already arrived join; under load also wait a little for more
+            await asyncio.sleep(self.max_wait if busy else 0)
+            rows = len(items[0][0])
+            while rows < self.max_rows and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+                rows += len(items[-1][0])
+
+            try:
+                predictions, probabilities = self.predictor.predict_with_proba(np.concatenate([X for X, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += rows
+            busy = len(items) > 1
+
+            start = 0
+            for X, future in items:
+                stop = start + len(X)
+                result = {'predictions': predictions[start:stop].tolist()}
+                if probabilities is not None:
+                    result['probabilities'] = probabilities[start:stop].tolist()
+                # A client that gave up (timeout, disconnect) has cancelled its future already
+                if not future.done():
+                    future.set_result(result)
+                start = stop
+
+
+# Server -----------------------------------------------------------------------------------------------
+class PredictionServer:
+    def __init__(self, models, max_rows=4096, max_wait=0.002):
+        self.models = models
+        self.batchers = {name: Batcher(predictor, max_rows, max_wait) for name, predictor in models.items()}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.tasks = []
+
+    def start_batchers(self):
+        self.tasks = [asyncio.create_task(batcher.run()) for batcher in self.batchers.values()]
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'batches': {name: {'calls': b.batches, 'mean_rows': b.rows / b.batches if b.batches else 0.0}
+                        for name, b in self.batchers.items()},
+        }
+
+    def _rows(self, predictor, body):
+        rows = json.loads(body)['rows']
+        if rows and isinstance(rows[0], dict):
+            if not predictor.features:
+                raise ValueError("This model has no feature names - send rows as lists")
+            rows = [[row[f] for f in predictor.features] for row in rows]
+        X = np.asarray(rows, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != predictor.n_features:
+            raise ValueError(f"Expected rows of {predictor.n_features} values")
+        return X
+
+    async def route(self, method, target, body):
+        if target == '/models' and method == 'GET':
+            return 200, {name: {'kind': p.kind, 'features': p.features} for name, p in self.models.items()}
+        if target == '/stats' and method == 'GET':
+            return 200, self.stats()
+        if target.startswith('/predict/'):
+            name = target[len('/predict/'):]
+            if name not in self.models:
+                return 404, {'error': f"Unknown model {name!r}"}
+            if method != 'POST':
+                return 405, {'error': "Use POST"}
+            try:
+                X = self._rows(self.models[name], body)
+            except (ValueError, KeyError, TypeError, IndexError) as e:
+                return 400, {'error': f"Bad request body: {e}"}
+            return 200, await self.batchers[name].predict(X)
+        return 404, {'error': f"No route for {method} {target}"}
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 with keep-alive - just enough for JSON requests
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                method, target, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (header := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    key, _, value = header.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self.route(method, target, body)
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                data = json.dumps(payload).encode()
+                close = headers.get('connection', '').lower() == 'close'
+                writer.write(f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'close' if close else 'keep-alive'}"
+                             f"\r\n\r\n".encode() + data)
+                await writer.drain()
+                if target.startswith('/predict/'):
+                    self.requests += 1
+                    self.latencies.append(time.perf_counter() - start)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def listen(self, host='127.0.0.1', port=8000, unix=None):
+        self.start_batchers()
+        if unix:
+            return await asyncio.start_unix_server(self.handle, path=unix)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+# Load test --------------------------------------------------------------------------------------------
+async def _client(host, port, model, row, count, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps({'rows': [row]}).encode()
+    request = (f"POST /predict/{model} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        length = 0
+        while (header := await reader.readline()) not in (b'\r\n', b''):
+            if header.lower().startswith(b'content-length:'):
+                length = int(header.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def bench(server, requests, concurrency, model='co2', row=(2300, 1300)):
+    tcp = await server.listen('127.0.0.1', 0)
+    port = tcp.sockets[0].getsockname()[1]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_client('127.0.0.1', port, model, list(row), requests // concurrency, latencies)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    tcp.close()
+
+    client = np.array(latencies) * 1000
+    print(f"{len(latencies):,} requests, {concurrency} connections: {len(latencies) / elapsed:,.0f} req/s, "
+          f"client p50 {np.percentile(client, 50):.2f} ms, p99 {np.percentile(client, 99):.2f} ms")
+    print("Server:", json.dumps(server.stats()))
+
+
+async def main(args):
+    models = load_models(args.artifacts)
+    server = PredictionServer(models, args.max_batch, args.max_wait_ms / 1000)
+    if args.bench:
+        await bench(server, args.bench, args.concurrency)
+        return
+
+    listener = await server.listen(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving {', '.join(models)} on {where}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        print("Latency:", json.dumps(server.stats()))
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the exported models")
+    parser.add_argument('--artifacts', default=ARTIFACT_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=4096, help="most rows per predict call")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="how long a batch waits for company")
+    parser.add_argument('--bench', type=int, default=0, help="run a load test with this many requests")
+    parser.add_argument('--concurrency', type=int, default=64)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,196 @@
+# SINGLE-PASS DESCRIPTIVE STATISTICS -------------------------------------------------------------------
+# Works out count, mean, std, min, max, quartiles, median, mode and range for every numeric column
+# in one go, instead of calling .mean(), .median(), .mode(), .std(), .max(), .min() and .describe()
+# one after another (each of which scans the data again).
+#
+# Each chunk is reduced to a per-column value-count table (one sort), and count, moments, min, max,
+# quantiles and mode are all read off that table. Moments are merged chunk by chunk (Welford / Chan),
+# so the same object can be fed a CSV in pieces with describe_csv(). The table is exact while the
+# number of distinct values stays under max_bins and becomes an approximate sketch after that.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+DESCRIBE_ROWS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+# Value-count sketch -----------------------------------------------------------------------------------
+def _merge_counts(values, weights, new_values, new_weights):
+    values = np.concatenate([values, new_values])
+    weights = np.concatenate([weights, new_weights])
+    values, inverse = np.unique(values, return_inverse=True)
+    return values, np.bincount(inverse, weights=weights)
+
+
+def _compress(values, weights, max_bins):
+    # Squash neighbouring values into max_bins // 2 buckets of roughly equal weight
+    n_buckets = max(max_bins // 2, 1)
+    cum = np.cumsum(weights)
+    bucket = np.minimum((cum - weights) * n_buckets // cum[-1], n_buckets - 1).astype(np.int64)
+    bucket_weights = np.bincount(bucket, weights=weights)
+    centres = np.bincount(bucket, weights=values * weights) / np.where(bucket_weights > 0, bucket_weights, 1)
+    keep = bucket_weights > 0
+    return centres[keep], bucket_weights[keep]
+
+
+def _quantile(values, weights, q):
+    # Same linear interpolation pandas/numpy use, but on (value, count) pairs
+    n = weights.sum()
+    pos = q * (n - 1)
+    lo = np.floor(pos)
+    cum = np.cumsum(weights)
+    v_lo = values[np.searchsorted(cum, lo, side='right')]
+    v_hi = values[np.searchsorted(cum, min(lo + 1, n - 1), side='right')]
+    return v_lo + (v_hi - v_lo) * (pos - lo)
+
+
+# Stats accumulator ------------------------------------------------------------------------------------
+class DescriptiveStats:
+    def __init__(self, quantiles=(0.25, 0.5, 0.75), max_bins=None):
+        self.quantiles = tuple(quantiles)
+        self.max_bins = max_bins          # None keeps every distinct value (exact)
+        self.columns = None
+        self.exact = True
+
+    def _start(self, columns):
+        p = len(columns)
+        self.columns = list(columns)
+        self.n = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.nan)
+        self.max = np.full(p, np.nan)
+        self.counts = [(np.empty(0), np.empty(0)) for _ in range(p)]
+
+    def _merge_moments(self, n_b, mean_b, m2_b, min_b, max_b):
+        n_a = self.n
+        n = n_a + n_b
+        safe_n = np.where(n > 0, n, 1)
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / safe_n
+        self.m2 = self.m2 + m2_b + delta ** 2 * n_a * n_b / safe_n
+        self.n = n
+        self.min = np.fmin(self.min, min_b)
+        self.max = np.fmax(self.max, max_b)
+
+    def _add_counts(self, i, values, weights):
+        old_values, old_weights = self.counts[i]
+        if len(old_values):
+            values, weights = _merge_counts(old_values, old_weights, values, weights)
+        if self.max_bins is not None and len(values) > self.max_bins:
+            values, weights = _compress(values, weights, self.max_bins)
+            self.exact = False
+        self.counts[i] = (values, weights)
+
+    def update(self, data):
+        if isinstance(data, pd.DataFrame):
+            # Numeric columns are chosen on the first chunk; later chunks are narrowed to the same ones
+            data = data.select_dtypes(include='number') if self.columns is None else data[self.columns]
+            columns = list(data.columns)
+            arrays = [pd.to_numeric(data[name], errors='coerce').to_numpy(dtype=np.float64) for name in columns]
+        else:
+            x = np.asarray(data, dtype=np.float64)
+            if x.ndim == 1:
+                x = x[:, None]
+            columns = list(range(x.shape[1]))
+            arrays = [x[:, i] for i in range(x.shape[1])]
+
+        if self.columns is None:
+            self._start(columns)
+
+        # One sort per column gives the value-count table; everything else is read off that table,
+        # which is tiny next to the column itself unless every value is distinct
+        p = len(columns)
+        n_b, mean_b, m2_b = np.zeros(p), np.zeros(p), np.zeros(p)
+        min_b, max_b = np.full(p, np.nan), np.full(p, np.nan)
+        for i, col in enumerate(arrays):
+            values, counts = np.unique(col, return_counts=True)
+            if len(values) and np.isnan(values[-1]):
+                values, counts = values[:-1], counts[:-1]
+            if not len(values):
+                continue
+            weights = counts.astype(np.float64)
+            n_b[i] = weights.sum()
+            mean_b[i] = np.dot(values, weights) / n_b[i]
+            m2_b[i] = np.dot((values - mean_b[i]) ** 2, weights)
+            min_b[i], max_b[i] = values[0], values[-1]
+            self._add_counts(i, values, weights)
+
+        self._merge_moments(n_b, mean_b, m2_b, min_b, max_b)
+        return self
+
+    def merge(self, other):
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._start(other.columns)
+        self._merge_moments(other.n, other.mean, other.m2, other.min, other.max)
+        for i, (values, weights) in enumerate(other.counts):
+            self._add_counts(i, values, weights)
+        self.exact = self.exact and other.exact
+        return self
+
+    def result(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.n - 1))
+        rows = {'count': self.n, 'mean': np.where(self.n > 0, self.mean, np.nan), 'std': std, 'min': self.min}
+
+        quantiles = {f'{q * 100:g}%': [] for q in self.quantiles}
+        modes = []
+        for values, weights in self.counts:
+            for q in self.quantiles:
+                quantiles[f'{q * 100:g}%'].append(_quantile(values, weights, q) if len(values) else np.nan)
+            # argmax picks the smallest of tied values, same as Series.mode()[0]
+            modes.append(values[np.argmax(weights)] if len(values) else np.nan)
+
+        rows.update(quantiles)
+        rows['max'] = self.max
+        rows['median'] = [_quantile(v, w, 0.5) if len(v) else np.nan for v, w in self.counts]
+        rows['mode'] = modes
+        rows['range'] = self.max - self.min
+        return pd.DataFrame(rows, index=self.columns).T
+
+
+def describe(df, quantiles=(0.25, 0.5, 0.75)):
+    return DescriptiveStats(quantiles).update(df).result()
+
+
+def describe_csv(path, chunksize=100_000, usecols=None, max_bins=10_000, **read_csv_kwargs):
+    stats = DescriptiveStats(max_bins=max_bins)
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols, **read_csv_kwargs):
+        stats.update(chunk)
+    return stats.result()
+
+
+# Benchmark --------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+
+    df = pd.read_csv('Data/user_behavior_dataset.csv')
+    big = pd.concat([df] * 1000, ignore_index=True)
+    print(f"user_behavior_dataset.csv x1000: {len(big):,} rows")
+
+    def old_way(frame):
+        # What Week2.py does now: five separate scans of one column, then describe()
+        col = frame['Screen_On_Time']
+        col.mean(), col.median(), col.mode()[0], col.std(), col.max() - col.min()
+        frame.describe()
+
+    def new_way(frame):
+        describe(frame)
+
+    for name, fn in [('separate scans + describe()', old_way), ('stats.describe()', new_way)]:
+        start = time.perf_counter()
+        for _ in range(3):
+            fn(big)
+        print(f"{name:30s} {(time.perf_counter() - start) / 3 * 1000:8.1f} ms")
+
+    summary = describe(big)
+    expected = big.describe()
+    assert np.allclose(summary.loc[DESCRIBE_ROWS].to_numpy(), expected.to_numpy())
+    print("Results match DataFrame.describe()")
+
+    # Out of core: many chunks of a file with text columns
+    chunked = describe_csv('Data/user_behavior_dataset.csv', chunksize=100)
+    assert np.allclose(chunked.loc[DESCRIBE_ROWS].to_numpy(), df.describe().to_numpy())
+    print("describe_csv in chunks of 100 rows matches DataFrame.describe()")
@@ -0,0 +1,251 @@
+# CROSS-VALIDATED PARAMETER SWEEPS ---------------------------------------------------------------------
+# k-fold / repeated k-fold over a parameter grid, run in a process pool:
+#
+#   results = sweep(logistic_regression, {'C': [0.01, 0.1, 1, 10]}, X, y,
+#                   cv=RepeatedStratifiedKFold(n_splits=5, n_repeats=3, random_state=42))
+#
+# build(**params) returns a fresh estimator for each configuration. A 'features' parameter is handled
+# by the runner instead - it picks the columns of X (by name or position) that the model sees.
+#
+#   - X and y are copied into shared memory once; workers map them rather than receiving a pickled
+#     copy with every task. Workers only get (configuration, fold) numbers.
+#   - Every fold score is cached on disk under cache_dir, keyed by the data, the model, its parameters
+#     and the fold's train / test indices, so re-running a sweep (or widening its grid) only fits what's new.
+#     A splitter that shuffles without a random_state gives new folds, and so a fresh cache, every run.
+#   - Folds run in rounds. Once a configuration has min_folds scores and its mean + z standard errors
+#     is still below the best mean so far, it's clearly losing and gets no more folds.
+#
+# Scores are "greater is better" (estimator.score, or an sklearn scorer name such as
+# 'neg_mean_squared_error').
+# ------------------------------------------------------------------------------------------------------
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, ParameterGrid, RepeatedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+CACHE_DIR = '.sweep_cache'
+
+
+# Model builders (module-level so worker processes can use them) ---------------------------------------
+def linear_regression():
+    return LinearRegression()
+
+
+def polynomial_regression(degree=2):
+    return make_pipeline(PolynomialFeatures(degree=degree, include_bias=False), LinearRegression())
+
+
+def logistic_regression(C=1.0):
+    return make_pipeline(StandardScaler(), LogisticRegression(C=C))
+
+
+# Shared memory ----------------------------------------------------------------------------------------
+def _share(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+# Worker -----------------------------------------------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(x_spec, y_spec, build, configs, splits, scoring):
+    x_shm, X = _attach(x_spec)
+    y_shm, y = _attach(y_spec)
+    _worker.update(shm=(x_shm, y_shm), X=X, y=y, build=build, configs=configs,
+                   folds=splits, scorer=get_scorer(scoring) if scoring else None)
+
+
+def _run_fold(config, fold):
+    params = dict(_worker['configs'][config])
+    features = params.pop('features', None)
+    X, y = _worker['X'], _worker['y']
+    if features is not None:
+        X = X[:, list(features)]
+    train, test = _worker['folds'][fold]
+
+    model = _worker['build'](**params).fit(X[train], y[train])
+    scorer = _worker['scorer']
+    score = scorer(model, X[test], y[test]) if scorer else model.score(X[test], y[test])
+    return config, fold, float(score)
+
+
+# Fold cache -------------------------------------------------------------------------------------------
+def _fingerprint(X, y, build, splits, scoring):
+    # The folds' own indices rather than repr(splitter), which is the same for every unseeded shuffle
+    h = hashlib.sha1()
+    for array in (X, y, *(indices for fold in splits for indices in fold)):
+        h.update(repr((array.shape, array.dtype.str)).encode())
+        h.update(np.ascontiguousarray(array).data)
+    h.update(f"{build.__module__}.{build.__qualname__}|{scoring}".encode())
+    return h.hexdigest()[:16]
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+# Runner -----------------------------------------------------------------------------------------------
+def _splitter(cv, repeats, random_state):
+    if not isinstance(cv, int):
+        return cv
+    if repeats > 1:
+        return RepeatedKFold(n_splits=cv, n_repeats=repeats, random_state=random_state)
+    return KFold(n_splits=cv, shuffle=True, random_state=random_state)
+
+
+def _resolve_features(configs, columns):
+    # Feature names -> column positions, so workers only ever index the shared array
+    for params in configs:
+        if 'features' in params:
+            params['features'] = tuple(columns.index(f) if isinstance(f, str) else f for f in params['features'])
+    return configs
+
+
+def _losing(scores, best_mean, min_folds, z):
+    if len(scores) < min_folds:
+        return False
+    se = np.std(scores, ddof=1) / np.sqrt(len(scores))
+    return np.mean(scores) + z * se < best_mean
+
+
+def sweep(build, grid, X, y, cv=5, repeats=1, scoring=None, n_jobs=None, early_stop=True,
+          min_folds=3, z=2.0, cache_dir=CACHE_DIR, random_state=42):
+    columns = list(X.columns) if isinstance(X, pd.DataFrame) else None
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y)
+    # Split once here so every worker and the cache key see the same folds
+    splits = list(_splitter(cv, repeats, random_state).split(X, y))
+    n_folds = len(splits)
+
+    labels = list(ParameterGrid(grid))                       # as given, for the results table
+    configs = _resolve_features([dict(params) for params in labels], columns or [])
+    keys = [json.dumps(params, sort_keys=True, default=str) for params in configs]
+
+    cache_path = cache_dir and os.path.join(cache_dir, _fingerprint(X, y, build, splits, scoring) + '.json')
+    cache = _load_cache(cache_path) if cache_path else {}
+    scores = [[] for _ in configs]
+    stopped = [False] * len(configs)
+    workers = n_jobs or os.cpu_count() or 1
+
+    x_shm, x_spec = _share(X)
+    y_shm, y_spec = _share(y)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(x_spec, y_spec, build, configs, splits, scoring)) as pool:
+            next_fold = 0
+            while next_fold < n_folds:
+                alive = [c for c in range(len(configs)) if not stopped[c]]
+                if not alive:
+                    break
+                # Enough folds per round to keep every worker busy, and at least min_folds to start with
+                per_round = max(1, -(-workers // len(alive)))
+                if next_fold == 0 and early_stop:
+                    per_round = max(per_round, min_folds)
+                folds = range(next_fold, min(n_folds, next_fold + per_round))
+                next_fold = folds.stop
+
+                tasks = []
+                for c in alive:
+                    for fold in folds:
+                        cached = cache.get(f"{keys[c]}|{fold}")
+                        if cached is None:
+                            tasks.append((c, fold))
+                        else:
+                            scores[c].append(cached)
+                for c, fold, score in pool.map(_run_fold, *zip(*tasks)) if tasks else []:
+                    scores[c].append(score)
+                    cache[f"{keys[c]}|{fold}"] = score
+                if tasks and cache_path:
+                    _save_cache(cache_path, cache)
+
+                if early_stop and next_fold < n_folds:
+                    best = max(np.mean(scores[c]) for c in alive)
+                    for c in alive:
+                        stopped[c] = _losing(scores[c], best, min_folds, z)
+    finally:
+        for shm in (x_shm, y_shm):
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame([
+        {**params, 'mean_score': np.mean(s), 'std_score': np.std(s, ddof=1) if len(s) > 1 else np.nan,
+         'folds': len(s), 'stopped_early': stop}
+        for params, s, stop in zip(labels, scores, stopped)
+    ])
+    return results.sort_values('mean_score', ascending=False, ignore_index=True)
+
+
+# Sweeps for the Week4 / Week5.1 models ----------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+    from itertools import combinations
+
+    from sklearn.model_selection import RepeatedStratifiedKFold
+
+    import datasets
+
+    pd.set_option('display.width', 150)
+
+    ads = datasets.load('social_ads', columns=['Age', 'EstimatedSalary', 'Purchased'])
+    cars = datasets.load('cars', columns=['Weight', 'Volume', 'CO2'])
+    housing = datasets.load('usa_housing')
+    housing_features = ['Avg. Area Income', 'Avg. Area House Age', 'Avg. Area Number of Rooms',
+                        'Avg. Area Number of Bedrooms', 'Area Population']
+
+    sweeps = {
+        'Week4.3 logistic regression C': (
+            logistic_regression, {'C': [0.001, 0.01, 0.1, 1, 10, 100]},
+            ads[['Age', 'EstimatedSalary']], ads['Purchased'],
+            {'cv': RepeatedStratifiedKFold(n_splits=5, n_repeats=4, random_state=42)}),
+        'Week5.1 polynomial degree (cars)': (
+            polynomial_regression, {'degree': [1, 2, 3, 4]},
+            cars[['Weight', 'Volume']], cars['CO2'], {'cv': 6, 'repeats': 5}),
+        'Week4.2 feature subsets (USA_Housing)': (
+            linear_regression, {'features': [list(c) for k in (3, 4, 5) for c in combinations(housing_features, k)]},
+            housing[housing_features], housing['Price'], {'cv': 5, 'repeats': 2}),
+    }
+    for name, (build, grid, X, y, options) in sweeps.items():
+        for attempt in ('cold', 'cached'):
+            start = time.perf_counter()
+            results = sweep(build, grid, X, y, **options)
+            print(f"{name} ({attempt}): {time.perf_counter() - start:.2f}s")
+        print(results.head(5).to_string(), "\n")
+
+    # A shuffling splitter without a seed makes different folds each run, so it must not hit the cache
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(2):
+            sweep(polynomial_regression, {'degree': [1, 2]}, cars[['Weight', 'Volume']], cars['CO2'],
+                  cv=KFold(5, shuffle=True), cache_dir=tmp)
+        assert len(os.listdir(tmp)) == 2
+    print("Unseeded shuffled folds: a new cache entry each run")
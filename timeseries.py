@@ -0,0 +1,306 @@
+# TIME SERIES ------------------------------------------------------------------------------------------
+# Rolling statistics, resampling and lag features that work on a whole series or on new rows as they
+# arrive, carrying just enough state between calls:
+#
+#   RollingStats(window)   - rolling mean / std / min / max. Sums come from block-local cumulative
+#                            sums and min / max from van Herk-Gil-Werman block scans, so every step is O(1)
+#                            and vectorised. update(new_values) continues where the last call ended.
+#   Resampler(freq)        - downsampling to fixed bins (hourly -> daily, ...) with ufunc.reduceat
+#                            over the original array - the rows are never copied or regrouped. Bins
+#                            still open at the end of a chunk are carried into the next update().
+#   downsample_regular()   - same for evenly spaced data, as a reshape view.
+#   LagFeatures(lags)      - (X, y) for autoregressive models: X holds values at t - lag (plus any
+#                            other columns at t), y the value at t. Feeds sklearn's LinearRegression,
+#                            or regression.IncrementalLinearRegression chunk by chunk.
+#
+# Results match pandas rolling(window).mean/std/min/max (std with ddof=1, windows needing
+# min_periods valid values) and resample(freq).mean/sum/min/max/count.
+# ------------------------------------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+AGGREGATIONS = ('mean', 'sum', 'min', 'max', 'count')
+
+
+# Rolling windows --------------------------------------------------------------------------------------
+def window_extrema(x, window, op):
+    # op over every length-window slice of x (np.maximum or np.minimum), in O(1) per position:
+    # split x into blocks of `window`; any window is the suffix of one block plus the prefix of the next
+    n = len(x)
+    if n < window:
+        return np.empty(0, dtype=x.dtype)
+    blocks = -(-n // window)
+    identity = -np.inf if op is np.maximum else np.inf
+    padded = np.full(blocks * window, identity)
+    padded[:n] = x
+    padded = padded.reshape(blocks, window)
+    prefix = op.accumulate(padded, axis=1).ravel()
+    suffix = op.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return op(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+class RollingStats:
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.tail = np.full(window - 1, np.nan)       # the last window-1 values seen
+
+    def update(self, values):
+        # Rolling stats for each of the new values, using the tail of earlier ones
+        w = self.window
+        buf = np.concatenate([self.tail, np.asarray(values, dtype=np.float64)])
+        self.tail = buf[len(buf) - (w - 1):].copy()
+
+        valid = ~np.isnan(buf)
+        count, total, squares, ref = _window_sums(buf, valid, w)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            var = np.maximum(squares - total * mean, 0.0) / (count - 1)
+        enough = count >= max(self.min_periods, 1)
+        return {
+            'mean': np.where(enough, mean + ref, np.nan),
+            'std': np.where(enough & (count > 1), np.sqrt(var), np.nan),
+            'min': np.where(enough, window_extrema(np.where(valid, buf, np.inf), w, np.minimum), np.nan),
+            'max': np.where(enough, window_extrema(np.where(valid, buf, -np.inf), w, np.maximum), np.nan),
+        }
+
+
+def _window_sums(x, valid, window):
+    # Count, sum and sum of squares over every length-window slice of x, in O(1) per position. Cumulative
+    # sums run within blocks of `window` only, each block centred on its own mean, so a long drifting
+    # series doesn't lose the variance to cancellation. A window is the suffix of block k plus the prefix
+    # of block k+1; the prefix is shifted onto block k's centre. Sums are returned about that centre, ref.
+    n = len(x)
+    blocks = -(-n // window)
+    padded = np.zeros((blocks + 1) * window)
+    padded[:n] = np.where(valid, x, 0.0)
+    weight = np.zeros((blocks + 1) * window)
+    weight[:n] = valid
+    padded, weight = padded.reshape(-1, window), weight.reshape(-1, window)
+
+    # Each block's mean, or the nearest earlier (else later) block's when it has no valid values
+    filled = weight.sum(axis=1)
+    centre = padded.sum(axis=1) / np.where(filled > 0, filled, 1)
+    has = np.flatnonzero(filled > 0)
+    if len(has):
+        nearest = np.maximum.accumulate(np.where(filled > 0, np.arange(len(filled)), -1))
+        centre = centre[np.where(nearest >= 0, nearest, has[0])]
+    centred = (padded - centre[:, None]) * weight
+
+    def prefix(a):
+        return np.concatenate([np.zeros((len(a), 1)), np.cumsum(a, axis=1)], axis=1)
+    c0, c1, c2 = prefix(weight), prefix(centred), prefix(centred * centred)
+
+    start = np.arange(max(n - window + 1, 0))
+    k, j = start // window, start % window
+    d = centre[k + 1] - centre[k]
+    m0, m1, m2 = c0[k + 1, j], c1[k + 1, j], c2[k + 1, j]
+    count = c0[k, window] - c0[k, j] + m0
+    total = c1[k, window] - c1[k, j] + m1 + m0 * d
+    squares = c2[k, window] - c2[k, j] + m2 + 2 * d * m1 + m0 * d * d
+    return count, total, squares, centre[k]
+
+
+def rolling(values, window, min_periods=None):
+    return pd.DataFrame(RollingStats(window, min_periods).update(values),
+                        index=values.index if isinstance(values, pd.Series) else None)
+
+
+# Resampling -------------------------------------------------------------------------------------------
+def _reduce(values, starts):
+    # Per-bin sum / count / min / max of the runs of rows beginning at `starts` (none empty)
+    return {'sum': np.add.reduceat(values, starts, dtype=np.float64),
+            'count': np.diff(np.append(starts, len(values))),
+            'min': np.minimum.reduceat(values, starts).astype(np.float64),
+            'max': np.maximum.reduceat(values, starts).astype(np.float64)}
+
+
+def _finish(parts, how):
+    if how == 'mean':
+        return parts['sum'] / parts['count']
+    return parts[how]
+
+
+class Resampler:
+    def __init__(self, freq, how='mean'):
+        if how not in AGGREGATIONS:
+            raise ValueError(f"how must be one of {AGGREGATIONS}")
+        self.freq = pd.tseries.frequencies.to_offset(freq)
+        try:
+            self.freq.nanos
+        except ValueError:
+            raise ValueError(f"{freq!r} isn't a fixed frequency - use e.g. 'min', 'h' or 'D'") from None
+        self.how = how
+        self.pending = None                               # (open bin start, its sum / count / min / max)
+
+    def update(self, times, values):
+        # (bin starts, aggregates) for the bins these rows complete. times must be sorted and carry on
+        # from the previous call; the last bin stays open until a later row (or flush()) closes it.
+        times = pd.DatetimeIndex(times)
+        values = np.asarray(values)
+        if not len(times):
+            return pd.DatetimeIndex([]), np.empty(0)
+
+        bins = times.floor(self.freq)
+        keys = bins.asi8
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        parts = _reduce(values, starts)
+        labels = bins[starts]
+
+        if self.pending is not None:
+            label, old = self.pending
+            if label == labels[0]:
+                parts['sum'][0] += old['sum']
+                parts['count'][0] += old['count']
+                parts['min'][0] = min(parts['min'][0], old['min'])
+                parts['max'][0] = max(parts['max'][0], old['max'])
+            else:
+                labels = labels.insert(0, label)
+                parts = {k: np.concatenate([[old[k]], v]) for k, v in parts.items()}
+
+        self.pending = (labels[-1], {k: v[-1] for k, v in parts.items()})
+        return self._fill(labels[:-1], _finish({k: v[:-1] for k, v in parts.items()}, self.how))
+
+    def flush(self):
+        # The bin left open, as if no more rows are coming
+        if self.pending is None:
+            return pd.DatetimeIndex([]), np.empty(0)
+        label, part = self.pending
+        self.pending = None
+        return pd.DatetimeIndex([label]), np.array([_finish(part, self.how)], dtype=np.float64)
+
+    def _fill(self, labels, values):
+        # Bins no row fell into get NaN (0 for sums and counts), like pandas resample
+        if not len(labels):
+            return labels, np.empty(0)
+        full = pd.date_range(labels[0], labels[-1], freq=self.freq)
+        result = np.full(len(full), 0.0 if self.how in ('sum', 'count') else np.nan)
+        result[full.get_indexer(labels)] = values
+        return full, result
+
+
+def resample(times, values, freq, how='mean'):
+    resampler = Resampler(freq, how)
+    labels, result = resampler.update(times, values)
+    last_label, last = resampler.flush()
+    return resampler._fill(labels.append(last_label), np.concatenate([result, last]))
+
+
+def downsample_regular(values, factor, how='mean'):
+    # Evenly spaced rows: consecutive groups of `factor` as a (n // factor, factor) view, one reduction
+    values = np.asarray(values)
+    groups = values[:len(values) // factor * factor].reshape(-1, factor)
+    if how == 'count':
+        return np.full(len(groups), factor)
+    return getattr(groups, how)(axis=1, dtype=np.float64 if how in ('mean', 'sum') else None)
+
+
+# Lag features -----------------------------------------------------------------------------------------
+class LagFeatures:
+    def __init__(self, lags):
+        self.lags = sorted(lags) if not isinstance(lags, int) else list(range(1, lags + 1))
+        self.max_lag = self.lags[-1]
+        self.tail = np.empty(0)                           # the last max_lag values seen
+
+    def feature_names(self, name='y', exog_names=()):
+        return [f"{name}_lag{lag}" for lag in self.lags] + list(exog_names)
+
+    def transform(self, values, exog=None):
+        # (X, y) for the rows that have all their lags: X[:, j] = value at t - lags[j], then the exog
+        # columns at t; y = value at t. The first max_lag rows ever seen have no complete history.
+        values = np.asarray(values, dtype=np.float64)
+        buf = np.concatenate([self.tail, values])
+        self.tail = buf[max(len(buf) - self.max_lag, 0):].copy()
+        n = len(buf) - self.max_lag
+        if n <= 0:
+            width = len(self.lags) + (np.shape(exog)[1] if exog is not None and np.ndim(exog) == 2 else 0)
+            return np.empty((0, width)), np.empty(0)
+
+        # windows[i, k] = buf[i + k]: row i's history ends at column max_lag (the target itself)
+        windows = sliding_window_view(buf, self.max_lag + 1)
+        X = windows[:, [self.max_lag - lag for lag in self.lags]]
+        if exog is not None:
+            exog = np.asarray(exog, dtype=np.float64).reshape(len(values), -1)
+            X = np.hstack([X, exog[len(values) - n:]])
+        return X, windows[:, self.max_lag]
+
+
+def lag_features(values, lags, exog=None):
+    return LagFeatures(lags).transform(values, exog)
+
+
+# Check against pandas on the bike-sharing data, then lag regressions ----------------------------------
+if __name__ == "__main__":
+    from sklearn.linear_model import LinearRegression
+
+    import datasets
+    from regression import IncrementalLinearRegression
+
+    bikes = datasets.load('bike_sharing')
+    counts = bikes.set_index('timestamp')['cnt']
+
+    # Rolling 24-hour stats, whole series and in 1,000-row chunks as if rows were arriving
+    expected = counts.astype(np.float64).rolling(24).agg(['mean', 'std', 'min', 'max'])
+    whole = rolling(counts, 24)
+    stream = RollingStats(24)
+    chunks = pd.DataFrame([row for start in range(0, len(counts), 1000)
+                           for row in zip(*stream.update(counts.values[start:start + 1000]).values())],
+                          columns=whole.columns, index=counts.index)
+    for result in (whole, chunks):
+        assert np.allclose(result, expected, rtol=1e-9, atol=1e-6, equal_nan=True)
+    print(f"Rolling 24h mean / std / min / max over {len(counts):,} rows: matches pandas (whole and streamed)")
+
+    # A long drifting series: the window's variance is tiny next to the level, so sums over the whole
+    # series would cancel it away
+    rng = np.random.default_rng(0)
+    drift = pd.Series(np.linspace(0, 1e5, 2_000_000) + rng.normal(0, 0.01, 2_000_000))
+    drift[rng.choice(len(drift), 1000, replace=False)] = np.nan
+    result = rolling(drift, 60, min_periods=30)['std']
+    assert np.allclose(result, drift.rolling(60, min_periods=30).std(), rtol=1e-4, equal_nan=True)
+    # pandas' add/remove updates drift by ~1e-5 here; the windows themselves are exact to ~1e-15
+    exact = np.nanstd(sliding_window_view(drift.to_numpy(), 60), axis=1, ddof=1)
+    assert np.allclose(result[59:], exact, rtol=1e-9)
+    print(f"Rolling std of a drifting {len(drift):,}-point series: matches pandas")
+
+    # Daily totals and means
+    for how in ('sum', 'mean', 'max', 'count'):
+        labels, result = resample(counts.index, counts.values, 'D', how)
+        reference = getattr(counts.resample('D'), how)()
+        assert (labels == reference.index).all() and np.allclose(result, reference, equal_nan=True)
+    resampler = Resampler('D', 'sum')
+    pieces = [resampler.update(counts.index[s:s + 500], counts.values[s:s + 500]) for s in range(0, len(counts), 500)]
+    pieces.append(resampler.flush())
+    streamed = pd.Series(np.concatenate([p[1] for p in pieces]), pd.DatetimeIndex(np.concatenate([p[0] for p in pieces])))
+    assert np.allclose(streamed.reindex(reference.index).values, counts.resample('D').sum().values)
+    print(f"Daily resample to {len(labels):,} days: matches pandas (whole and streamed)")
+
+    # Next hour's rentals from the previous 1-3 hours, the same hour yesterday and the weather now.
+    # Fitted on the first 80% in time order, tested on the rest.
+    features = LagFeatures([1, 2, 3, 24])
+    exog = ['t1', 'hum', 'wind_speed', 'is_weekend']
+    X, y = features.transform(bikes['cnt'], bikes[exog])
+    split = int(len(X) * 0.8)
+    model = LinearRegression().fit(X[:split], y[:split])
+    print(f"\nHourly rentals ({', '.join(features.feature_names('cnt', exog))}):")
+    print(f"  test R² {model.score(X[split:], y[split:]):.3f}")
+
+    # Same model, fitted incrementally as rows arrive in 1,000-row chunks
+    features = LagFeatures([1, 2, 3, 24])
+    incremental = IncrementalLinearRegression()
+    train = bikes.iloc[:split + features.max_lag]
+    for start in range(0, len(train), 1000):
+        chunk = train.iloc[start:start + 1000]
+        X_chunk, y_chunk = features.transform(chunk['cnt'], chunk[exog])
+        if len(y_chunk):
+            incremental.partial_fit(X_chunk, y_chunk)
+    assert np.allclose(incremental.coef_, model.coef_, rtol=1e-6)
+    print("  incremental fit over 1,000-row chunks: same coefficients")
+
+    # Monthly air passengers from the previous month and the same month last year
+    air = datasets.load('air_passengers')
+    X, y = lag_features(air['#Passengers'], [1, 12])
+    split = len(X) - 24
+    model = LinearRegression().fit(X[:split], y[:split])
+    print(f"\nAir passengers, last two years from lags 1 and 12: test R² {model.score(X[split:], y[split:]):.3f}")
@@ -0,0 +1,296 @@
+# TRACING ----------------------------------------------------------------------------------------------
+# Where a run spends its time and memory, written as a Chrome trace (open it in chrome://tracing or
+# https://ui.perfetto.dev):
+#
+#   python run.py all --trace trace.json                  # every Week script, one trace
+#   python run.py Week4.2 --trace t.json --trace-memory   # + peak memory per span (tracemalloc)
+#   python run.py Week3 --trace t.json --profile 5        # + stack samples every 5 ms
+#   COM624_TRACE=t.json python Week4.2.py                 # a script on its own (COM624_TRACE_MEMORY,
+#                                                         # COM624_PROFILE likewise)
+#
+# Scripts mark their phases in order - each phase() ends the one before:
+#
+#   phase('load')
+#   df = datasets.load('salary')
+#   phase('fit', rows=len(X_train))
+#
+# and library code uses spans, which nest:
+#
+#   with span('dedupe', rows=n):  ...        @traced('fix_csv')        annotate(rows=rows)
+#
+# Every span records wall time, CPU time and the arguments given (rows processed, ...); with memory
+# tracing on, also the peak memory it allocated above what was in use when it started. Stack samples
+# go into the same file as Chrome "samples", attributed to whatever was running.
+#
+# Switched off (the default) phase(), span(), annotate() and @traced check one global and return: no
+# clock reads, no allocation. A summary table goes to stderr when a traced run ends.
+# ------------------------------------------------------------------------------------------------------
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+TRACE_ENV = 'COM624_TRACE'
+MEMORY_ENV = 'COM624_TRACE_MEMORY'
+PROFILE_ENV = 'COM624_PROFILE'
+MAX_STACK_DEPTH = 64
+
+_tracer = None
+
+
+# Spans ------------------------------------------------------------------------------------------------
+class Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start', 'cpu', 'memory', 'peak')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.tracer.enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.exit(self)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+# Stack sampling ---------------------------------------------------------------------------------------
+class Sampler(threading.Thread):
+    def __init__(self, interval, thread_id, clock_origin):
+        super().__init__(name='tracing-sampler', daemon=True)
+        self.interval = interval
+        self.thread_id = thread_id
+        self.origin = clock_origin
+        self.samples = []            # (ns since origin, ((file, line, function), ... outermost first))
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_filename, frame.f_lineno, code.co_qualname))
+                frame = frame.f_back
+            self.samples.append((time.perf_counter_ns() - self.origin, tuple(reversed(stack))))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# Tracer -----------------------------------------------------------------------------------------------
+class Tracer:
+    def __init__(self, path, memory=False, profile_ms=None):
+        self.path = path
+        self.memory = memory
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.events = []
+        self.stack = []
+        self.phase = None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.sampler = None
+        if profile_ms:
+            self.sampler = Sampler(profile_ms / 1000, self.tid, self.origin)
+            self.sampler.start()
+
+    def enter(self, span):
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The parent's peak so far would be lost to the reset below, so it keeps it first
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, peak)
+            span.memory = current
+            span.peak = 0
+            tracemalloc.reset_peak()
+        span.cpu = time.process_time_ns()
+        span.start = time.perf_counter_ns()
+        self.stack.append(span)
+
+    def exit(self, span):
+        end = time.perf_counter_ns()
+        cpu = time.process_time_ns() - span.cpu
+        # Phases opened inside this span end with it
+        while self.stack and self.stack[-1] is not span:
+            self.exit(self.stack[-1])
+        if self.stack:
+            self.stack.pop()
+        if span is self.phase:
+            self.phase = None
+
+        args = dict(span.args, cpu_ms=round(cpu / 1e6, 3))
+        if self.memory:
+            # tracemalloc keeps one peak, reset by every span that starts, so children pass theirs up
+            peak = max(tracemalloc.get_traced_memory()[1], span.peak)
+            args['peak_mb'] = round((peak - span.memory) / 1e6, 3)
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, peak)
+        self.events.append({'name': span.name, 'cat': span.cat, 'ph': 'X', 'pid': self.pid, 'tid': self.tid,
+                            'ts': (span.start - self.origin) / 1000, 'dur': (end - span.start) / 1000,
+                            'args': args})
+
+    def start_phase(self, name, args):
+        if self.phase is not None:
+            self.exit(self.phase)
+        self.phase = Span(self, name, 'phase', args)
+        self.enter(self.phase)
+
+    # Output -------------------------------------------------------------------------------------------
+    def _samples(self):
+        # Chrome's format: each distinct frame once, with its parent, and samples pointing at the leaf
+        frames, ids, samples = {}, {}, []
+        for ts, stack in self.sampler.samples if self.sampler else []:
+            parent = None
+            for filename, line, function in stack:
+                key = (parent, filename, line, function)
+                if key not in ids:
+                    ids[key] = str(len(ids))
+                    frames[ids[key]] = {'name': f"{function} ({os.path.basename(filename)}:{line})",
+                                        'category': os.path.basename(filename)}
+                    if parent is not None:
+                        frames[ids[key]]['parent'] = parent
+                parent = ids[key]
+            if parent is not None:
+                samples.append({'cpu': 0, 'tid': self.tid, 'ts': ts / 1000, 'sf': parent, 'weight': 1})
+        return frames, samples
+
+    def save(self):
+        while self.stack:
+            self.exit(self.stack[-1])
+        if self.sampler:
+            self.sampler.stop()
+        frames, samples = self._samples()
+        trace = {'traceEvents': sorted(self.events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms',
+                 'stackFrames': frames, 'samples': samples,
+                 'otherData': {'argv': sys.argv, 'python': sys.version.split()[0], 'memory': self.memory}}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        return self.path
+
+    def summary(self, top=10):
+        # Totals per span name, then the functions the samples most often landed in
+        totals = {}
+        for event in self.events:
+            t = totals.setdefault((event['cat'], event['name']), {'count': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0,
+                                                                  'peak_mb': None, 'rows': 0})
+            t['count'] += 1
+            t['wall_ms'] += event['dur'] / 1000
+            t['cpu_ms'] += event['args']['cpu_ms']
+            if 'peak_mb' in event['args']:
+                t['peak_mb'] = max(t['peak_mb'] or 0.0, event['args']['peak_mb'])
+            rows = event['args'].get('rows')
+            t['rows'] += rows if isinstance(rows, int) else 0
+
+        lines = [f"{'span':<28} {'count':>5} {'wall ms':>10} {'cpu ms':>10} {'peak MB':>8} {'rows':>12}"]
+        for (cat, name), t in sorted(totals.items(), key=lambda item: -item[1]['wall_ms']):
+            peak = f"{t['peak_mb']:8.1f}" if t['peak_mb'] is not None else f"{'':>8}"
+            lines.append(f"{cat + ':' + name:<28} {t['count']:>5} {t['wall_ms']:>10.1f} {t['cpu_ms']:>10.1f} "
+                         f"{peak} {t['rows'] or '':>12}")
+
+        if self.sampler and self.sampler.samples:
+            leaves = {}
+            for _, stack in self.sampler.samples:
+                if stack:
+                    filename, _, function = stack[-1]
+                    leaf = f"{function} ({os.path.basename(filename)})"
+                    leaves[leaf] = leaves.get(leaf, 0) + 1
+            n = len(self.sampler.samples)
+            lines.append(f"\nHottest functions ({n:,} samples):")
+            for leaf, count in sorted(leaves.items(), key=lambda item: -item[1])[:top]:
+                lines.append(f"  {count / n:6.1%}  {leaf}")
+        return '\n'.join(lines)
+
+
+# Module API -------------------------------------------------------------------------------------------
+def enable(path, memory=False, profile_ms=None):
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path, memory, profile_ms)
+        atexit.register(finish)
+    return _tracer
+
+
+def finish():
+    # Write the trace and print the summary; tracing is off afterwards
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    path = tracer.save()
+    print(f"\n🔎 Trace saved as: {path}\n{tracer.summary()}", file=sys.stderr)
+    return path
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, cat='span', **args):
+    if _tracer is None:
+        return NULL_SPAN
+    return Span(_tracer, name, cat, args)
+
+
+def phase(name, **args):
+    if _tracer is not None:
+        _tracer.start_phase(name, args)
+
+
+def end_phase():
+    if _tracer is not None and _tracer.phase is not None:
+        _tracer.exit(_tracer.phase)
+
+
+def annotate(**args):
+    # Add arguments (rows=..., ...) to the innermost open span
+    if _tracer is not None and _tracer.stack:
+        _tracer.stack[-1].args.update(args)
+
+
+def traced(name=None, cat='function'):
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with Span(_tracer, label, cat, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV], memory=os.environ.get(MEMORY_ENV, '') not in ('', '0'),
+           profile_ms=float(os.environ[PROFILE_ENV]) if os.environ.get(PROFILE_ENV) else None)